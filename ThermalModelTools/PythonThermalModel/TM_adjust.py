@@ -14,7 +14,7 @@ sys.path.append(os.path.join(root_path))
 from stage_calc import get_all_powers, optimize_tm, get_sum_variance
 import argparse
 
-def main(exp_path):
+def main(exp_path, method="grid", num_points=10, tol=0.01, max_evals=10000, workers=1):
         
     # Define the path to the thermal model json file
     file = os.path.join(exp_path, "input_configs", "thermal_model.json")  # Replace with the actual path to your thermal model JSON file
@@ -40,7 +40,7 @@ def main(exp_path):
 
 
     # Run the thermal model optimization
-    updated_details, output_data, heatmap = optimize_tm(components, stage_details, num_points = 10)
+    updated_details, output_data, heatmap = optimize_tm(components, stage_details, num_points = num_points, method = method, tol = tol, max_evals = max_evals, workers = workers)
     # print(output_data["total_power"])
 
     # Estimate Hold Time
@@ -76,7 +76,7 @@ def main(exp_path):
                     # print("Updated Power: ", stage_dict[stage_translation[stage]][filter_stack].value)
                     components_dict[component_name]['Power per Part (W)'] = stage_dict[stage_translation[stage]].value
 
-    updated_details, output_data, heatmap = optimize_tm(components, stage_details, num_points = 10)
+    updated_details, output_data, heatmap = optimize_tm(components, stage_details, num_points = num_points, method = method, tol = tol, max_evals = max_evals, workers = workers)
     print(output_data["total_power"])
     sum_variance_value, balloon_estimates = get_sum_variance(output_data)
     hold_time_result = balloon_estimates["Cryo Hold Time"]
@@ -98,8 +98,13 @@ def main(exp_path):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Adjust the thermal model based on filter transfer model outputs.")
     parser.add_argument("experiment_path", type=str, help="Path to the experiment directory.")
+    parser.add_argument("--method", choices=["grid", "adaptive", "minimize"], default="grid", help="VCS temperature optimizer.")
+    parser.add_argument("--num-points", type=int, default=10, help="Number of points per axis of the (first) VCS temperature grid.")
+    parser.add_argument("--tol", type=float, default=0.01, help="Convergence tolerance on the VCS temperatures [K] (adaptive and minimize).")
+    parser.add_argument("--max-evals", type=int, default=10000, help="Budget of model evaluations (adaptive and minimize).")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes evaluating the VCS temperature grids.")
     args = parser.parse_args()
     experiment_path = args.experiment_path
     if not os.path.exists(experiment_path):
         raise FileNotFoundError(f"The specified experiment path does not exist: {experiment_path}")
-    main(experiment_path)
+    main(experiment_path, method=args.method, num_points=args.num_points, tol=args.tol, max_evals=args.max_evals, workers=args.workers)
@@ -0,0 +1,252 @@
+# Columnar storage of the components of a thermal model
+#
+# Thermal models are saved as {"components": {stage: {component: details}}, "stage_details": ..., "total_power": ...}
+# with the details keyed by display strings ("OD (m)", "Power per Part (W)"). A ComponentTable holds the same
+# components as one row each of a NumPy structured array (stage index, type, materials, geometry, count and
+# powers), so that powers, stage totals and the vapor-providing load are computed as array operations. The
+# original details dictionaries are kept alongside the array so that models convert back to JSON unchanged.
+
+import numpy as np
+
+from stage_calc import calculate_integral, STANDARD_TYPES, VAPOR_STAGES
+
+# Component type codes of the "type" column. Any other type is treated as a fixed power per part.
+COMPONENT_TYPES = ("Power per Part", "A/L", "Coax") + STANDARD_TYPES
+FIXED, A_L, COAX = 0, 1, 2
+
+# Geometry columns and the details keys they are read from
+GEOMETRY_KEYS = {
+    "OD": "OD (m)",
+    "ID": "ID (m)",
+    "length": "Length (m)",
+    "A_L": "A/L (m)",
+    "case_OD": "Case OD (m)",
+    "insulator_OD": "Insulator OD (m)",
+    "core_OD": "Core OD (m)",
+}
+
+# Material, fit choice and interpolate keys of the layers of each component type
+LAYER_KEYS = {
+    "standard": [("Material", "Fit Choice", "Interpolate")],
+    "Coax": [
+        ("Casing Material", "Casing Fit Choice", "Casing Interpolate"),
+        ("Insulator Material", "Insulator Fit Choice", "Insulator Interpolate"),
+        ("Core Material", "Core Fit Choice", "Core Interpolate"),
+    ],
+}
+
+N_LAYERS = 3
+
+COMPONENT_DTYPE = np.dtype(
+    [("stage", "i4"), ("type", "i4"), ("material", "i4", (N_LAYERS,)), ("source", "i4", (N_LAYERS,))]
+    + [(column, "f8") for column in GEOMETRY_KEYS]
+    + [("number", "f8"), ("power_per_part", "f8"), ("power_total", "f8"), ("providing_vapor", "?")]
+)
+
+
+def _float(value):
+    return np.nan if value is None else float(value)
+
+
+class ComponentTable:
+    """A columnar table of the components of a thermal model.
+
+    Attributes:
+        stages (list): Stage names, indexed by the "stage" column.
+        names (list): Component name of each row.
+        details (list): The details dictionary of each row (shared with the model dictionaries it was built from).
+        materials (list): Material names, indexed by the "material" columns (-1 for no material).
+        sources (list): (material, fit choice, interpolate) of every integrated conductivity, indexed by the
+            "source" columns (-1 for no layer).
+        data (np.ndarray): The structured array (COMPONENT_DTYPE), one row per component.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self.names, self.details = [], []
+        self.materials, self.sources = [], []
+        self._material_ids, self._source_ids, self._rows = {}, {}, {}
+        self.data = np.zeros(0, dtype=COMPONENT_DTYPE)
+
+    @classmethod
+    def from_components(cls, components):
+        """Build a table from a {stage: {component: details}} dictionary.
+
+        Args:
+            components (dict): The component details.
+
+        Returns:
+            table (ComponentTable): The table, with rows in stage then component order.
+        """
+        table = cls(components.keys())
+        rows = [(stage, name, details) for stage, comps in components.items() for name, details in comps.items()]
+        table.data = np.zeros(len(rows), dtype=COMPONENT_DTYPE)
+        for row, (stage, name, details) in enumerate(rows):
+            table.names.append(name)
+            table.details.append(details)
+            table._rows[(stage, name)] = row
+            table.set_row(row, details, stage)
+        return table
+
+    @classmethod
+    def from_json(cls, output_data):
+        """Build a table from a thermal model JSON dictionary (with a "components" entry)."""
+        return cls.from_components(output_data["components"])
+
+    def _id(self, ids, values, value):
+        if value not in ids:
+            ids[value] = len(values)
+            values.append(value)
+        return ids[value]
+
+    def set_row(self, row, details, stage=None):
+        """(Re)fill the columns of a row from a details dictionary.
+
+        Args:
+            row (int): The row index.
+            details (dict): The details of the component.
+            stage (str, optional): The stage of the component. Defaults to None (unchanged).
+        """
+        record = self.data[row]
+        if stage is not None:
+            record["stage"] = self.stages.index(stage)
+        comp_type = details.get("Type")
+        record["type"] = COMPONENT_TYPES.index(comp_type) if comp_type in COMPONENT_TYPES else FIXED
+        layers = LAYER_KEYS["Coax"] if comp_type == "Coax" else LAYER_KEYS["standard"] if record["type"] != FIXED else []
+        record["material"] = -1
+        record["source"] = -1
+        for layer, (mat_key, fit_key, interp_key) in enumerate(layers):
+            material = details[mat_key]
+            interpolate = bool(details.get(interp_key))
+            record["material"][layer] = self._id(self._material_ids, self.materials, material)
+            source = (material, None if interpolate else details.get(fit_key), interpolate)
+            record["source"][layer] = self._id(self._source_ids, self.sources, source)
+        for column, key in GEOMETRY_KEYS.items():
+            record[column] = _float(details.get(key))
+        record["number"] = float(details["Number"])
+        record["power_per_part"] = _float(details.get("Power per Part (W)"))
+        record["power_total"] = _float(details.get("Power Total (W)"))
+        record["providing_vapor"] = bool(details.get("Providing Vapor", False))
+        return
+
+    def keys(self):
+        """Returns:
+            keys (list): The (stage, component) pair of each row, in row order.
+        """
+        return list(self._rows)
+
+    def row(self, stage, name):
+        """Returns:
+            row (int): The row index of a component.
+        """
+        return self._rows[(stage, name)]
+
+    def stage_rows(self, stage):
+        """Returns:
+            rows (np.ndarray): The row indices of the components of a stage.
+        """
+        return np.flatnonzero(self.data["stage"] == self.stages.index(stage))
+
+    def compute_powers(self, stage_details, rows=None):
+        """Compute the powers per part and total powers of (a subset of) the rows.
+
+        Each distinct (material, fit, stage) conductivity integral is computed once (see stage_calc.calculate_integral)
+        and the powers follow as array operations. The values are identical to those of stage_calc.get_all_powers.
+
+        Args:
+            stage_details (dict): The stage temperature details.
+            rows (array-like, optional): The rows to compute. Defaults to None (every row).
+        """
+        rows = np.arange(self.data.size) if rows is None else np.asarray(rows, dtype=int)
+        if rows.size == 0:
+            return
+        sub = self.data[rows]
+        n_stages = len(self.stages)
+
+        # One integral per distinct (source, stage)
+        keys = sub["source"]*n_stages + sub["stage"][:, None]
+        used = sub["source"] >= 0
+        integral = np.zeros(keys.shape)
+        unique_keys, inverse = np.unique(keys[used], return_inverse=True)
+        values = np.empty(unique_keys.size)
+        for i, key in enumerate(unique_keys):
+            material, fit_choice, interpolate = self.sources[key // n_stages]
+            temps = stage_details[self.stages[key % n_stages]]
+            values[i] = calculate_integral(material, fit_choice, interpolate, temps["lowT"], temps["highT"])
+        integral[used] = values[inverse]
+
+        # Conductance (A/L) of each layer, then powers per part
+        comp_type = sub["type"]
+        power_per_part = sub["power_per_part"].copy()
+        with np.errstate(all="ignore"):
+            standard = comp_type >= len(COMPONENT_TYPES) - len(STANDARD_TYPES)
+            area = np.pi*(0.5*(sub["OD"]))**2 - np.pi*(0.5*(sub["ID"]))**2
+            power_per_part[standard] = (area/sub["length"]*integral[:, 0])[standard]
+            a_l = comp_type == A_L
+            power_per_part[a_l] = (sub["A_L"]*integral[:, 0])[a_l]
+            coax = comp_type == COAX
+            diameters = [(sub["case_OD"], sub["insulator_OD"]), (sub["insulator_OD"], sub["core_OD"]), (sub["core_OD"], 0.0)]
+            layer_powers = [(np.pi*(0.5*(OD))**2 - np.pi*(0.5*(ID))**2)/sub["length"]*integral[:, layer]
+                            for layer, (OD, ID) in enumerate(diameters)]
+            power_per_part[coax] = (layer_powers[0] + layer_powers[1] + layer_powers[2])[coax]
+        self.data["power_per_part"][rows] = power_per_part
+        self.data["power_total"][rows] = power_per_part*sub["number"]
+        return
+
+    def stage_totals(self):
+        """Returns:
+            totals (dict): {stage: total power [W]}, summed in row order.
+        """
+        totals = np.bincount(self.data["stage"], weights=self.data["power_total"], minlength=len(self.stages))
+        return {stage: float(total) for stage, total in zip(self.stages, totals)}
+
+    def vapor_load(self, stages=VAPOR_STAGES):
+        """Returns:
+            load (float): The total power [W] of the vapor-providing components of the given stages.
+        """
+        stage_ids = [self.stages.index(stage) for stage in stages if stage in self.stages]
+        mask = self.data["providing_vapor"] & np.isin(self.data["stage"], stage_ids)
+        return float(np.sum(self.data["power_total"][mask]))
+
+    def write_back(self, rows=None):
+        """Copy the powers of (a subset of) the rows into their details dictionaries.
+
+        Args:
+            rows (array-like, optional): The rows to copy. Defaults to None (every row).
+        """
+        rows = range(self.data.size) if rows is None else rows
+        for row in rows:
+            record = self.data[row]
+            details = self.details[row]
+            if record["type"] != FIXED:
+                details["Power per Part (W)"] = float(record["power_per_part"])
+            details["Power Total (W)"] = float(record["power_total"])
+        return
+
+    def to_components(self):
+        """Returns:
+            components (dict): {stage: {component: details}} of the table rows.
+        """
+        components = {stage: {} for stage in self.stages}
+        for row, (name, details) in enumerate(zip(self.names, self.details)):
+            components[self.stages[self.data["stage"][row]]][name] = details
+        return components
+
+    def to_json(self, stage_details):
+        """Args:
+            stage_details (dict): The stage temperature details.
+        Returns:
+            output_data (dict): The thermal model JSON dictionary (components, stage details and total power),
+                like stage_calc.save_to_json_manual.
+        """
+        return {
+            "components": self.to_components(),
+            "stage_details": stage_details,
+            "total_power": self.stage_totals(),
+        }
+
+    def __len__(self):
+        return self.data.size
+
+    def __repr__(self):
+        return f"ComponentTable({len(self)} components, {len(self.stages)} stages, {len(self.sources)} conductivity sources)"
@@ -3,14 +3,15 @@
 # Last Updated: 28 June 2024
 
 import numpy as np
-import sys, os, csv, json
+import sys, os, csv, json, copy, contextlib
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib.pyplot as plt
-import pickle
 
 this_path = os.path.abspath(__file__)
 this_dir = os.path.dirname(this_path)
 cmr_path = this_dir.split("ThermalModelTools")[0]
-path_to_mat_lib = os.path.join(cmr_path, "thermal_conductivity", "lib")
+path_to_tc = os.path.join(cmr_path, "thermal_conductivity")
+path_to_mat_lib = os.path.join(path_to_tc, "lib")
 
 from astropy import units as u
 
@@ -18,31 +19,107 @@ if cmr_path not in sys.path:
     sys.path.append(cmr_path)
 if path_to_mat_lib not in sys.path:
     sys.path.append(path_to_mat_lib)
+if path_to_tc not in sys.path:
+    sys.path.append(path_to_tc)
 
 # from thermal_conductivity.tc_tools import *
 from thermal_conductivity.tc_utils import *
 from thermal_conductivity.fit_types import *
+from material_registry import LRUCache
 
-def calculate_power_function(details, stage_temps, A_L = False):
+# Component types whose power is computed from a material and a geometry (the GUI calls them "Standard")
+STANDARD_TYPES = ("Component", "Standard")
+
+# Layers of a coax : (material key, fit choice key, interpolate key, OD key, ID key). ID key None means a solid core.
+COAX_LAYERS = [
+    ("Casing Material", "Casing Fit Choice", "Casing Interpolate", "Case OD (m)", "Insulator OD (m)"),
+    ("Insulator Material", "Insulator Fit Choice", "Insulator Interpolate", "Insulator OD (m)", "Core OD (m)"),
+    ("Core Material", "Core Fit Choice", "Core Interpolate", "Core OD (m)", None),
+]
+
+# Stages whose vapor-providing components cool the VCS stages (see get_sum_variance)
+VAPOR_STAGES = ("4K - LHe", "4K - Transient")
+
+# Search ranges of the VCS temperatures [K] and the available optimizers (see optimize_vcs)
+VCS2_RANGE = (100.0, 260.0)
+VCS1_RANGE = (5.0, 100.0)
+OPTIMIZE_METHODS = ("grid", "adaptive", "minimize")
+
+# Fields identifying the power per part of each component type (with the stage temperatures), see calculate_part_power
+_LAYER_FIELDS = [key for layer in COAX_LAYERS for key in layer if key is not None]
+POWER_KEY_FIELDS = {
+    "Coax": _LAYER_FIELDS + ["Length (m)"],
+    "A/L": ["Material", "Fit Choice", "Interpolate", "A/L (m)"],
+}
+POWER_KEY_FIELDS.update({comp_type: ["Material", "Fit Choice", "Interpolate", "OD (m)", "ID (m)", "Length (m)"] for comp_type in STANDARD_TYPES})
+
+# Bounded caches of conductivity integrals and powers per part (see calculate_integral and calculate_part_power)
+INTEGRAL_CACHE_SIZE = 4096
+POWER_CACHE_SIZE = 4096
+_integral_cache = LRUCache(maxsize=INTEGRAL_CACHE_SIZE)
+_power_cache = LRUCache(maxsize=POWER_CACHE_SIZE)
+
+# Rows of VCS 2 temperatures per grid tile. Grids are always evaluated tile by tile so that the results don't
+# depend on the number of workers.
+GRID_TILE_ROWS = 16
+
+
+def calculate_integral(material, fit_choice, interpolate, lowT, highT, use_cache=True):
+    """Calculate the conductivity integral of a material between two temperatures.
+
+    Results are memoized on (material, fit choice, interpolate, lowT, highT); a cached value is only reused
+    while the material loaded from the library is unchanged.
+
+    Args:
+        material (str): The material name.
+        fit_choice (str): The name of the fit to integrate (ignored if interpolate is True).
+        interpolate (bool): Whether to use the material's interpolation (or its first fit outside of the
+            interpolation range).
+        lowT (float): The lower temperature [K].
+        highT (float): The upper temperature [K].
+        use_cache (bool, optional): Whether to use the integral cache. Defaults to True.
+
+    Returns:
+        integral (float): The conductivity integral [W/m].
+    """
+    interpolate = bool(interpolate)
+    key = (material, None if interpolate else fit_choice, interpolate, float(lowT), float(highT))
+    mat_obj = get_material(material)
+    if use_cache:
+        cached = _integral_cache.get(key, is_valid=lambda entry: entry[0] is mat_obj)
+        if cached is not None:
+            return cached[1]
+
+    if interpolate:
+        interp_exists, valid_range, interp_func = find_interpolation(material) # Check if interpolation file exists
+        if lowT < valid_range[0] or highT > valid_range[1]:
+            print(f"ERROR: Interpolation range for {material} is {valid_range}, but requested range is {lowT} to {highT}. Using default material fit instead.")
+            fits_obj = get_material_fits(material)
+            first_fit = fits_obj[0]
+            ConIntQuad = first_fit.integrate(lowT, highT)[0]
+        else:
+            ConIntQuad = get_interpolation_integral(lowT, highT, material)
+    else:
+        fit_obj = get_fit_by_name(material, fit_choice)
+        ConIntQuad = fit_obj.integrate(lowT, highT)[0]
+    integral = float(ConIntQuad)
+
+    if use_cache:
+        _integral_cache.put(key, (mat_obj, integral))
+    return integral
+
+def calculate_power_function(details, stage_temps, A_L = False, use_cache=True):
     """Calculate the power function for a given component.
 
     Args:
         details (dict): The details of the component.
         stage_temps (dict): The temperature details of the stage.
         A_L (bool, optional): Whether to use the A/L value. Defaults to False.
+        use_cache (bool, optional): Whether to use the integral cache. Defaults to True.
 
     Returns:
         ppu (float): The calculated power per unit.
     """
-
-    # lowT, highT = stage_temps["lowT"], stage_temps["highT"]
-    # mat = details["Material"]
-    # print(mat)
-    # if not A_L:
-    #     OD, ID = float(details["OD (m)"]), float(details["ID (m)"])
-    #     area = np.pi*(0.5*(OD))**2 - np.pi*(0.5*(ID))**2
-    #     length = details["Length (m)"]
-
     lowT, highT = stage_temps["lowT"], stage_temps["highT"]
     mat = details["Material"]
     if not A_L:
@@ -53,52 +130,132 @@ def calculate_power_function(details, stage_temps, A_L = False):
     else:
         A_L_val = details["A/L (m)"]
 
-    if "Interpolate" in details and details["Interpolate"]:
-        interp_exists, valid_range, interp_func = find_interpolation(mat) # Check if interpolation file exists
-        if lowT < valid_range[0] or highT > valid_range[1]:
-            print(f"ERROR: Interpolation range for {mat} is {valid_range}, but requested range is {lowT} to {highT}. Using default material fit instead.")
-            fits_obj = get_material_fits(mat)
-            first_fit = fits_obj[0]
-            ConIntQuad = first_fit.tc_integral(lowT*u.K, highT*u.K)[0].value
-        else:
-            ConIntQuad = get_interpolation_integral(lowT, highT, mat)
-    else:
-        fit_obj = get_fit_by_name(mat, details["Fit Choice"])
-        ConIntQuad = fit_obj.tc_integral(lowT*u.K, highT*u.K)[0].value
-    print(ConIntQuad)
-    
+    interpolate = "Interpolate" in details and details["Interpolate"]
+    ConIntQuad = calculate_integral(mat, details.get("Fit Choice"), interpolate, lowT, highT, use_cache=use_cache)
+
     ppu = A_L_val*ConIntQuad
 
     return float(ppu)
 
-def get_all_powers(components, stage_details):
+def calculate_part_power(details, stage_temps, use_cache=True):
+    """Calculate the power per part of a Standard, A/L or Coax component.
+
+    Results are memoized on the component type, materials, fits, geometry and stage temperatures; a cached
+    value is only reused while the materials loaded from the library are unchanged.
+
+    Args:
+        details (dict): The details of the component.
+        stage_temps (dict): The temperature details of the stage.
+        use_cache (bool, optional): Whether to use the power and integral caches. Defaults to True.
+
+    Returns:
+        power_per_part (float): The power per part [W].
+    """
+    comp_type = details.get("Type")
+    key = (comp_type,) + tuple(details.get(field) for field in POWER_KEY_FIELDS[comp_type]) + (float(stage_temps["lowT"]), float(stage_temps["highT"]))
+    mat_objs = [get_material(material) for material, _, _ in component_materials(details)]
+    def is_valid(entry):
+        return all(cached is current for cached, current in zip(entry[0], mat_objs))
+    if use_cache:
+        cached = _power_cache.get(key, is_valid=is_valid)
+        if cached is not None:
+            return cached[1]
+
+    if comp_type == "Coax":
+        power_per_part = calculate_coax_power(details, stage_temps, use_cache=use_cache)
+    else:
+        power_per_part = calculate_power_function(details, stage_temps, A_L=(comp_type == "A/L"), use_cache=use_cache)
+
+    if use_cache:
+        _power_cache.put(key, (mat_objs, power_per_part))
+    return power_per_part
+
+def component_signature(stage, details):
+    """The signature identifying components with the same power per part.
+
+    Args:
+        stage (str): The stage of the component.
+        details (dict): The details of the component.
+
+    Returns:
+        signature (tuple): (stage, type, materials, fits and geometry) for Standard, A/L and Coax components,
+            (stage, "Power per Part", power per part) for the others.
+    """
+    comp_type = details.get("Type")
+    if comp_type not in POWER_KEY_FIELDS:
+        return (stage, "Power per Part", float(details["Power per Part (W)"]))
+    comp_type = "Standard" if comp_type in STANDARD_TYPES else comp_type
+    return (stage, comp_type) + tuple(details.get(field) for field in POWER_KEY_FIELDS[details.get("Type")])
+
+def group_components(components):
+    """Group the components of a model that have the same stage, materials, fits and geometry.
+
+    The power per part of a group only has to be computed once; its total is the power per part times the
+    aggregate number of parts of its members.
+
+    Args:
+        components (dict): The component details.
+
+    Returns:
+        groups (list): One dictionary per group, in model order, with "stage", "details" (of the first member),
+            "members" (component names), "numbers" (number of parts of each member), "number" (aggregate number
+            of parts) and "vapor_number" (aggregate number of parts providing vapor).
+    """
+    groups = {}
+    for stage, comps in components.items():
+        for comp, details in comps.items():
+            signature = component_signature(stage, details)
+            if signature not in groups:
+                groups[signature] = {"stage": stage, "details": details, "members": [], "numbers": [], "number": 0.0, "vapor_number": 0.0}
+            group = groups[signature]
+            num = float(details["Number"])
+            group["members"].append(comp)
+            group["numbers"].append(num)
+            group["number"] += num
+            if details.get("Providing Vapor", False):
+                group["vapor_number"] += num
+    return list(groups.values())
+
+def report_groups(groups):
+    """Summarize the reduction obtained by grouping identical components.
+
+    Args:
+        groups (list): The groups returned by group_components.
+
+    Returns:
+        summary (dict): "components" and "groups" counts, and {stage: (components, groups)} under "stages".
+    """
+    stages = {}
+    for group in groups:
+        n_components, n_groups = stages.get(group["stage"], (0, 0))
+        stages[group["stage"]] = (n_components + len(group["members"]), n_groups + 1)
+    return {
+        "components": sum(len(group["members"]) for group in groups),
+        "groups": len(groups),
+        "stages": stages,
+    }
+
+def get_all_powers(components, stage_details, use_cache=True):
     """Calculate the total power for all components in each stage.
 
     Args:
         components (dict): The component details.
         stage_details (dict): The stage temperature details.
+        use_cache (bool, optional): Whether to use the power and integral caches. Defaults to True.
 
     Returns:
         components (dict): The updated component details with power calculations.
     """
-    print("CH1")
-    for stage, comps in components.items(): 
-        for comp, details in comps.items():
-            num = float(details["Number"])
-            if details.get("Type") == "Coax":
-                power_per_part = calculate_coax_power(details, stage_details[stage])
-                details["Power per Part (W)"] = power_per_part
+    # Identical components (see component_signature) share one power per part
+    group_powers = {}
     for stage, comps in components.items(): 
         for comp, details in comps.items():
             num = float(details["Number"])
-            if details.get("Type") == "Coax":
-                power_per_part = calculate_coax_power(details, stage_details[stage])
-                details["Power per Part (W)"] = power_per_part
-            elif details.get("Type") == "A/L":
-                power_per_part = calculate_power_function(details, stage_details[stage], A_L=True)
-                details["Power per Part (W)"] = power_per_part
-            elif details.get("Type") == "Component":
-                power_per_part = calculate_power_function(details, stage_details[stage])
+            if details.get("Type") in POWER_KEY_FIELDS:
+                signature = component_signature(stage, details)
+                if signature not in group_powers:
+                    group_powers[signature] = calculate_part_power(details, stage_details[stage], use_cache=use_cache)
+                power_per_part = group_powers[signature]
                 details["Power per Part (W)"] = power_per_part
             else:
                 power_per_part = float(details["Power per Part (W)"])
@@ -107,33 +264,25 @@ def get_all_powers(components, stage_details):
     return components
 
 
-def calculate_coax_power(details, stage_temp):
+def calculate_coax_power(details, stage_temp, use_cache=True):
     """Calculate the power for coaxial components.
 
     Args:
         details (dict): The details of the coaxial component.
         stage_temp (dict): The temperature details of the stage.
+        use_cache (bool, optional): Whether to use the integral cache. Defaults to True.
 
     Returns:
         power_per_part (float): The calculated power per part for the coaxial component.
     """
-    # Implement the power calculation logic for Coax components here
-    # Example placeholder logic:
-    case_details = {"Material" : details["Casing Material"], "OD (m)" : details["Case OD (m)"], "ID (m)" : details["Insulator OD (m)"], "Length (m)" : details["Length (m)"], "Fit Choice": details["Casing Fit Choice"], "Interpolate": details["Casing Interpolate"]}
-    case_ppp = calculate_power_function(case_details, stage_temp)
-
-    insulator_details = {"Material" : details["Insulator Material"], "OD (m)" : details["Insulator OD (m)"], "ID (m)" : details["Core OD (m)"], "Length (m)" : details["Length (m)"], "Fit Choice": details["Insulator Fit Choice"], "Interpolate": details["Insulator Interpolate"]}
-    insulator_ppp = calculate_power_function(insulator_details, stage_temp)
-    # Implement the power calculation logic for Coax components here
-    # Example placeholder logic:
     case_details = {"Material" : details["Casing Material"], "OD (m)" : details["Case OD (m)"], "ID (m)" : details["Insulator OD (m)"], "Length (m)" : details["Length (m)"], "Fit Choice": details["Casing Fit Choice"], "Interpolate": details["Casing Interpolate"]}
-    case_ppp = calculate_power_function(case_details, stage_temp)
+    case_ppp = calculate_power_function(case_details, stage_temp, use_cache=use_cache)
 
     insulator_details = {"Material" : details["Insulator Material"], "OD (m)" : details["Insulator OD (m)"], "ID (m)" : details["Core OD (m)"], "Length (m)" : details["Length (m)"], "Fit Choice": details["Insulator Fit Choice"], "Interpolate": details["Insulator Interpolate"]}
-    insulator_ppp = calculate_power_function(insulator_details, stage_temp)
+    insulator_ppp = calculate_power_function(insulator_details, stage_temp, use_cache=use_cache)
 
     core_details = {"Material" : details["Core Material"], "OD (m)" : details["Core OD (m)"], "ID (m)" : 0, "Length (m)" : details["Length (m)"], "Fit Choice": details["Core Fit Choice"], "Interpolate": details["Core Interpolate"]}
-    core_ppp = calculate_power_function(core_details, stage_temp)
+    core_ppp = calculate_power_function(core_details, stage_temp, use_cache=use_cache)
 
     power_per_part = case_ppp + insulator_ppp + core_ppp
 
@@ -141,11 +290,187 @@ def calculate_coax_power(details, stage_temp):
     return power_per_part
 
 
-def get_sum_variance(output_data):
+def get_cache_stats():
+    """Statistics of the integral and power caches.
+
+    Returns:
+        stats (dict): {"integrals": stats, "powers": stats}, see material_registry.LRUCache.stats.
+    """
+    return {"integrals": _integral_cache.stats(), "powers": _power_cache.stats()}
+
+def clear_caches():
+    """Empty the integral and power caches and reset their statistics."""
+    for cache in (_integral_cache, _power_cache):
+        cache.clear()
+        cache.reset_stats()
+    return
+
+
+def cumulative_fit_integrals(fit_obj, lowT, highT):
+    """Integrate a fit over arrays of temperature pairs through a cumulative lookup.
+
+    When the pairs share temperatures (e.g. a grid of stage temperatures) the fit is only integrated between
+    consecutive distinct temperatures, and each pair is the difference of the cumulative sums of those segments.
+
+    Args:
+        fit_obj (Fit): The fit to integrate.
+        lowT (np.ndarray): The lower temperatures [K].
+        highT (np.ndarray): The upper temperatures [K], with the same shape as lowT.
+
+    Returns:
+        integral (np.ndarray): The conductivity integrals [W/m], with the shape of lowT.
+    """
+    temps, index = np.unique(np.concatenate([lowT.ravel(), highT.ravel()]), return_inverse=True)
+    if temps.size >= index.size:
+        return np.asarray(fit_obj.integrate(lowT, highT)[0], dtype=float)
+    segments = fit_obj.integrate(temps[:-1], temps[1:])[0]
+    cumulative = np.concatenate([[0.0], np.cumsum(segments)])
+    low_index, high_index = index[:lowT.size], index[lowT.size:]
+    return (cumulative[high_index] - cumulative[low_index]).reshape(lowT.shape)
+
+def calculate_integral_batch(material, fit_choice, interpolate, lowT, highT):
+    """Calculate the conductivity integrals of a material for arrays of temperatures.
+
+    Args:
+        material (str): The material name.
+        fit_choice (str): The name of the fit to integrate (ignored if interpolate is True).
+        interpolate (bool): Whether to use the material's interpolation. Temperature pairs outside of the
+            interpolation range use the first fit of the material instead, like calculate_power_function.
+        lowT (float or array-like): The lower temperature(s) [K].
+        highT (float or array-like): The upper temperature(s) [K], broadcast against lowT.
+
+    Returns:
+        integral (np.ndarray): The conductivity integrals [W/m], with the broadcast shape of lowT and highT.
+    """
+    lowT, highT = np.broadcast_arrays(np.asarray(lowT, dtype=float), np.asarray(highT, dtype=float))
+    if not interpolate:
+        fit_obj = get_fit_by_name(material, fit_choice)
+        return cumulative_fit_integrals(fit_obj, lowT, highT)
+
+    interp_exists, valid_range, interp_func = find_interpolation(material) # Check if interpolation file exists
+    in_range = (lowT >= valid_range[0]) & (highT <= valid_range[1])
+    integral = np.empty(lowT.shape)
+    if np.any(in_range):
+        integral[in_range] = get_interpolation_integral(lowT[in_range], highT[in_range], material)
+    if not np.all(in_range):
+        print(f"ERROR: Interpolation range for {material} is {valid_range}, but {np.count_nonzero(~in_range)} requested ranges fall outside of it. Using default material fit for those instead.")
+        first_fit = get_material_fits(material)[0]
+        integral[~in_range] = first_fit.integrate(lowT[~in_range], highT[~in_range])[0]
+    return integral
+
+def calculate_power_batch(details, lowT, highT, geometry=None):
+    """Calculate the power of a component for arrays of stage temperatures and geometries.
+
+    Every array is broadcast against the others, so a whole parameter sweep is a single call, e.g.
+    calculate_power_batch(details, 4.0, highT[:, None], geometry={"Length (m)": lengths[None, :]}).
+
+    Args:
+        details (dict): The details of the component (any type handled by get_all_powers).
+        lowT (float or array-like): The lower stage temperature(s) [K].
+        highT (float or array-like): The upper stage temperature(s) [K].
+        geometry (dict, optional): Values (or arrays) overriding entries of details, keyed like details,
+            e.g. "OD (m)", "ID (m)", "Length (m)", "A/L (m)", "Number", "Case OD (m)" or "Power per Part (W)".
+            Defaults to None.
+
+    Returns:
+        power_per_part (np.ndarray): The power per part [W].
+        power_total (np.ndarray): The total power of the component [W].
+    """
+    geometry = {} if geometry is None else geometry
+    def value(key, default=None):
+        return np.asarray(geometry.get(key, details.get(key, default)), dtype=float)
+
+    comp_type = details.get("Type")
+    if comp_type == "Coax":
+        length = value("Length (m)")
+        power_per_part = 0.0
+        for mat_key, fit_key, interp_key, OD_key, ID_key in COAX_LAYERS:
+            OD = value(OD_key)
+            ID = 0.0 if ID_key is None else value(ID_key)
+            area = np.pi*(0.5*(OD))**2 - np.pi*(0.5*(ID))**2
+            integral = calculate_integral_batch(details[mat_key], details.get(fit_key), details.get(interp_key), lowT, highT)
+            power_per_part = power_per_part + area/length*integral
+    elif comp_type == "A/L" or comp_type in STANDARD_TYPES:
+        if comp_type == "A/L":
+            A_L_val = value("A/L (m)")
+        else:
+            OD, ID = value("OD (m)"), value("ID (m)")
+            area = np.pi*(0.5*(OD))**2 - np.pi*(0.5*(ID))**2
+            A_L_val = area/value("Length (m)")
+        integral = calculate_integral_batch(details["Material"], details.get("Fit Choice"), details.get("Interpolate"), lowT, highT)
+        power_per_part = A_L_val*integral
+    else:
+        power_per_part = value("Power per Part (W)")
+        # Constant power, only broadcast against the temperatures
+        power_per_part = power_per_part + 0.0*np.asarray(lowT, dtype=float) + 0.0*np.asarray(highT, dtype=float)
+    power_total = power_per_part*value("Number")
+    return np.broadcast_arrays(power_per_part, power_total)
+
+def get_group_powers_batch(groups, stage_details):
+    """Calculate the powers per part of groups of identical components for arrays of stage temperatures.
+
+    Args:
+        groups (list): The groups returned by group_components.
+        stage_details (dict): The stage temperature details ("lowT" and "highT" may be arrays).
+
+    Returns:
+        group_powers (list): The power per part array of each group [W].
+        stage_total_power (dict): {stage: total power array} [W], each group counting its aggregate number of parts.
+    """
+    group_powers = []
+    stage_total_power = {stage: 0.0 for stage in stage_details}
+    for group in groups:
+        temps = stage_details[group["stage"]]
+        power_per_part = calculate_power_batch(group["details"], temps["lowT"], temps["highT"])[0]
+        group_powers.append(power_per_part)
+        stage_total_power[group["stage"]] = stage_total_power[group["stage"]] + power_per_part*group["number"]
+    return group_powers, stage_total_power
+
+def get_all_powers_batch(components, stage_details, geometry=None):
+    """Calculate the powers of all components for arrays of stage temperatures.
+
+    Unlike get_all_powers, the component dictionaries are left untouched. Identical components (see
+    group_components) are only computed once.
+
+    Args:
+        components (dict): The component details.
+        stage_details (dict): The stage temperature details. "lowT" and "highT" may be arrays (broadcast
+            against each other across all stages).
+        geometry (dict, optional): Per-component geometry overrides, {stage: {component: geometry}}, see
+            calculate_power_batch. Defaults to None.
+
+    Returns:
+        powers (dict): {stage: {component: (power_per_part, power_total)}} arrays [W].
+        stage_total_power (dict): {stage: total power array} [W].
+    """
+    geometry = {} if geometry is None else geometry
+    # Components with geometry overrides are computed on their own
+    overridden = {stage: {comp: details for comp, details in comps.items() if comp in geometry.get(stage, {})} for stage, comps in components.items()}
+    shared = {stage: {comp: details for comp, details in comps.items() if comp not in overridden[stage]} for stage, comps in components.items()}
+    groups = group_components(shared)
+    group_powers, stage_total_power = get_group_powers_batch(groups, stage_details)
+    powers = {stage: {} for stage in components}
+    for group, power_per_part in zip(groups, group_powers):
+        for comp, num in zip(group["members"], group["numbers"]):
+            powers[group["stage"]][comp] = np.broadcast_arrays(power_per_part, power_per_part*num)
+    for stage, comps in overridden.items():
+        lowT, highT = stage_details[stage]["lowT"], stage_details[stage]["highT"]
+        for comp, details in comps.items():
+            powers[stage][comp] = calculate_power_batch(details, lowT, highT, geometry[stage][comp])
+            stage_total_power[stage] = stage_total_power[stage] + powers[stage][comp][1]
+    # Keep the model order of the components
+    powers = {stage: {comp: powers[stage][comp] for comp in comps} for stage, comps in components.items()}
+    stage_total_power = {stage: np.asarray(stage_total_power[stage], dtype=float) for stage in components}
+    return powers, stage_total_power
+
+
+def get_sum_variance(output_data, load_providing_vapor=None):
     """Calculate the sum variance for the output data.
 
     Args:
         output_data (dict): The output data containing stage details and total power.
+        load_providing_vapor (float, optional): The total power of the vapor-providing 4K components, if already
+            known (e.g. from ComponentTable.vapor_load). Defaults to None (summed from output_data).
 
     Returns:
         SumVariance: The calculated sum variance for each stage.
@@ -189,15 +514,18 @@ def get_sum_variance(output_data):
     # else:
     #     loadProvidingVapor = output_data["total_power"]["4K - LHe"] + output_data["total_power"]["4K - Transient"]
 
-    loadProvidingVapor = 0.0
-    for comp_name, comp_details in output_data["components"]["4K - LHe"].items():
-        if "Providing Vapor" in comp_details and comp_details["Providing Vapor"]:
-            if comp_details.get("Providing Vapor", False):
-                loadProvidingVapor += comp_details.get("Power Total (W)", 0.0)
-    for comp_name, comp_details in output_data["components"]["4K - Transient"].items():
-        if "Providing Vapor" in comp_details and comp_details["Providing Vapor"]:
-            if comp_details.get("Providing Vapor", False):
-                loadProvidingVapor += comp_details.get("Power Total (W)", 0.0)
+    if load_providing_vapor is not None:
+        loadProvidingVapor = load_providing_vapor
+    else:
+        loadProvidingVapor = 0.0
+        for comp_name, comp_details in output_data["components"]["4K - LHe"].items():
+            if "Providing Vapor" in comp_details and comp_details["Providing Vapor"]:
+                if comp_details.get("Providing Vapor", False):
+                    loadProvidingVapor += comp_details.get("Power Total (W)", 0.0)
+        for comp_name, comp_details in output_data["components"]["4K - Transient"].items():
+            if "Providing Vapor" in comp_details and comp_details["Providing Vapor"]:
+                if comp_details.get("Providing Vapor", False):
+                    loadProvidingVapor += comp_details.get("Power Total (W)", 0.0)
     print(f"Load Providing Vapor: {loadProvidingVapor} W")
         
     
@@ -250,7 +578,213 @@ def cooling_power(TempOut, TempIn, Power4k, Efficiency):
     CoolingPower = (cp - ci) * Efficiency * Power4k / 21
     return CoolingPower
 
-def optimize_tm(components_input, stage_details_input, num_points=10):
+def set_vcs_temps(stage_details, vcs2temp, vcs1temp):
+    """Set the VCS temperatures of a stage details dictionary (in place).
+
+    The VCS 2 low temperature is also the VCS 1 high temperature, and the VCS 1 low temperature is also the
+    4K - LHe high temperature. The temperatures may be arrays.
+
+    Args:
+        stage_details (dict): The stage temperature details.
+        vcs2temp (float or np.ndarray): The VCS 2 temperature(s) [K].
+        vcs1temp (float or np.ndarray): The VCS 1 temperature(s) [K].
+    """
+    stage_details["VCS 2"]["lowT"] = vcs2temp
+    stage_details["VCS 1"]["highT"] = vcs2temp
+    stage_details["VCS 1"]["lowT"] = vcs1temp
+    stage_details["4K - LHe"]["highT"] = vcs1temp # Update the 4K LHe stage high temp to match VCS1 low temp
+    return
+
+def evaluate_vcs_grid(components, stage_details, VCS2_temps, VCS1_temps, groups=None):
+    """Evaluate the sum variance of a VCS cooled thermal model over a grid of VCS temperatures.
+
+    The whole grid is evaluated as array operations, one power per group of identical components (see
+    get_group_powers_batch); neither the components nor the stage details are modified.
+
+    Args:
+        components (dict): The component details.
+        stage_details (dict): The stage temperature details.
+        VCS2_temps (array-like): The VCS 2 temperatures to sample [K].
+        VCS1_temps (array-like): The VCS 1 temperatures to sample [K].
+        groups (list, optional): The groups of the components (see group_components). Defaults to None (grouped here).
+
+    Returns:
+        SumVarArr (np.ndarray): The sum variance, SumVarArr[i, j] being for (VCS2_temps[i], VCS1_temps[j]).
+    """
+    VCS2_temps = np.asarray(VCS2_temps, dtype=float)
+    VCS1_temps = np.asarray(VCS1_temps, dtype=float)
+    groups = group_components(components) if groups is None else groups
+    grid_details = {stage: dict(temps) for stage, temps in stage_details.items()}
+    set_vcs_temps(grid_details, VCS2_temps[:, None], VCS1_temps[None, :])
+    group_powers, stage_total_power = get_group_powers_batch(groups, grid_details)
+    load_providing_vapor = 0.0
+    for group, power_per_part in zip(groups, group_powers):
+        if group["stage"] in VAPOR_STAGES and group["vapor_number"] > 0:
+            load_providing_vapor = load_providing_vapor + power_per_part*group["vapor_number"]
+    output_data = {
+        "components": components,
+        "stage_details": grid_details,
+        "total_power": stage_total_power
+        }
+    sum_var, cooling_dict = get_sum_variance(output_data, load_providing_vapor=load_providing_vapor)
+    return np.broadcast_to(sum_var, (VCS2_temps.size, VCS1_temps.size)).copy()
+
+def component_materials(details):
+    """List the materials a component is made of.
+
+    Args:
+        details (dict): The details of the component.
+
+    Returns:
+        materials (list): (material, fit choice, interpolate) tuples, empty for Power per Part components.
+    """
+    if details.get("Type") == "Coax":
+        return [(details[mat_key], details.get(fit_key), details.get(interp_key)) for mat_key, fit_key, interp_key, _, _ in COAX_LAYERS]
+    if details.get("Type") == "A/L" or details.get("Type") in STANDARD_TYPES:
+        return [(details["Material"], details.get("Fit Choice"), details.get("Interpolate"))]
+    return []
+
+def preload_materials(components):
+    """Load every material (and integral table) used by a model into the caches of this process.
+
+    Args:
+        components (dict): The component details.
+    """
+    for comps in components.values():
+        for details in comps.values():
+            for material, fit_choice, interpolate in component_materials(details):
+                if interpolate:
+                    get_integral_table(material)
+                else:
+                    get_fit_by_name(material, fit_choice)
+    return
+
+# Model held by each optimize_vcs worker process, set once by _init_worker
+_worker_model = None
+
+def _init_worker(components, stage_details):
+    global _worker_model
+    _worker_model = (components, stage_details, group_components(components))
+    preload_materials(components)
+    return
+
+def _evaluate_tile(VCS2_temps, VCS1_temps):
+    components, stage_details, groups = _worker_model
+    return evaluate_vcs_grid(components, stage_details, VCS2_temps, VCS1_temps, groups)
+
+def _evaluate_grid(components, stage_details, VCS2_temps, VCS1_temps, executor=None, groups=None):
+    # Evaluate the grid in tiles of GRID_TILE_ROWS VCS 2 temperatures, in the worker processes if there are any
+    tiles = [VCS2_temps[i:i + GRID_TILE_ROWS] for i in range(0, VCS2_temps.size, GRID_TILE_ROWS)]
+    if executor is None:
+        rows = [evaluate_vcs_grid(components, stage_details, tile, VCS1_temps, groups) for tile in tiles]
+    else:
+        rows = list(executor.map(_evaluate_tile, tiles, [VCS1_temps]*len(tiles)))
+    return np.vstack(rows)
+
+def _best_grid_point(SumVarArr, VCS2_temps, VCS1_temps):
+    # SumVarArr[i, j] is for (VCS2_temps[i], VCS1_temps[j]); the first minimum in that order wins
+    i, j = np.unravel_index(np.nanargmin(SumVarArr), SumVarArr.shape)
+    return float(VCS2_temps[i]), float(VCS1_temps[j]), float(SumVarArr[i, j])
+
+def optimize_vcs(components, stage_details, method="grid", num_points=10, tol=0.01, ftol=1e-9, max_evals=10000, workers=1):
+    """Find the VCS temperatures minimizing the sum variance of a VCS cooled thermal model.
+
+    Every method starts from a num_points x num_points grid over VCS2_RANGE x VCS1_RANGE (the heatmap):
+        - "grid" stops there.
+        - "adaptive" repeatedly evaluates a num_points x num_points grid over the cells around the current best
+          point until the grid spacing is below tol or the evaluation budget is spent.
+        - "minimize" runs a bounded scipy.optimize.minimize (Nelder-Mead, the objective is not smooth where the
+          sum variance vanishes) from the best grid point, with xatol=tol, fatol=ftol and the remaining budget.
+
+    With more than one worker the grids are evaluated tile by tile (GRID_TILE_ROWS VCS 2 temperatures per tile) in
+    a process pool. Each worker receives its own copy of the model once and loads its materials once; the tiles
+    are the same for any number of workers, so the results are too.
+
+    Args:
+        components (dict): The component details (not modified).
+        stage_details (dict): The stage temperature details (not modified).
+        method (str, optional): "grid", "adaptive" or "minimize". Defaults to "grid".
+        num_points (int, optional): The number of points per axis of the (first) grid. Defaults to 10.
+        tol (float, optional): Convergence tolerance on the VCS temperatures [K]. Defaults to 0.01.
+        ftol (float, optional): Convergence tolerance on the sum variance [W] ("minimize" only). Defaults to 1e-9.
+        max_evals (int, optional): Budget of model evaluations (one per pair of VCS temperatures), including the
+            first grid. The "grid" method always evaluates its whole grid. Defaults to 10000.
+        workers (int, optional): Number of worker processes, None for one per CPU. Defaults to 1 (no pool).
+
+    Returns:
+        result (dict): "VCS 2" and "VCS 1" (the optimal temperatures [K]), "sum_variance", "evaluations",
+            "converged" (bool), "method", "grids" ([VCS2_grid, VCS1_grid, SumVarArr] of the first grid) and "groups"
+            (the component grouping summary, see report_groups).
+    """
+    if method not in OPTIMIZE_METHODS:
+        raise ValueError(f"Unknown optimization method {method}, expected one of {OPTIMIZE_METHODS}.")
+    if method == "adaptive" and num_points < 3:
+        raise ValueError("The adaptive method needs at least 3 points per axis.")
+    if workers is None or workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(components, stage_details))
+    else:
+        pool = contextlib.nullcontext()
+    with pool as executor:
+        return _run_optimizer(components, stage_details, method, num_points, tol, ftol, max_evals, executor)
+
+def _run_optimizer(components, stage_details, method, num_points, tol, ftol, max_evals, executor):
+    groups = group_components(components)
+    VCS2_temps = np.linspace(*VCS2_RANGE, num_points)
+    VCS1_temps = np.linspace(*VCS1_RANGE, num_points)
+    VCS2_grid, VCS1_grid = np.meshgrid(VCS2_temps, VCS1_temps) 
+    SumVarArr = _evaluate_grid(components, stage_details, VCS2_temps, VCS1_temps, executor, groups)
+    evaluations = SumVarArr.size
+    best_vcs2, best_vcs1, best_sum_var = _best_grid_point(SumVarArr, VCS2_temps, VCS1_temps)
+    converged = method == "grid"
+
+    if method == "adaptive":
+        bounds2, bounds1 = VCS2_RANGE, VCS1_RANGE
+        while True:
+            step2 = (bounds2[1] - bounds2[0])/(num_points - 1)
+            step1 = (bounds1[1] - bounds1[0])/(num_points - 1)
+            if max(step2, step1) <= tol:
+                converged = True
+                break
+            if evaluations + num_points**2 > max_evals:
+                break
+            # Zoom on the cells around the best point
+            bounds2 = (max(VCS2_RANGE[0], best_vcs2 - step2), min(VCS2_RANGE[1], best_vcs2 + step2))
+            bounds1 = (max(VCS1_RANGE[0], best_vcs1 - step1), min(VCS1_RANGE[1], best_vcs1 + step1))
+            level_VCS2 = np.linspace(*bounds2, num_points)
+            level_VCS1 = np.linspace(*bounds1, num_points)
+            level_SumVar = _evaluate_grid(components, stage_details, level_VCS2, level_VCS1, executor, groups)
+            evaluations += level_SumVar.size
+            vcs2, vcs1, sum_var = _best_grid_point(level_SumVar, level_VCS2, level_VCS1)
+            if sum_var < best_sum_var:
+                best_vcs2, best_vcs1, best_sum_var = vcs2, vcs1, sum_var
+
+    elif method == "minimize":
+        from scipy.optimize import minimize
+
+        budget = max_evals - evaluations
+        def objective(x):
+            sum_var = evaluate_vcs_grid(components, stage_details, x[:1], x[1:], groups)[0, 0]
+            return sum_var if np.isfinite(sum_var) else np.inf
+        if budget > 0:
+            res = minimize(objective, [best_vcs2, best_vcs1], method="Nelder-Mead", bounds=[VCS2_RANGE, VCS1_RANGE],
+                           options={"xatol": tol, "fatol": ftol, "maxfev": budget})
+            evaluations += res.nfev
+            converged = bool(res.success)
+            if res.fun < best_sum_var:
+                best_vcs2, best_vcs1, best_sum_var = float(res.x[0]), float(res.x[1]), float(res.fun)
+
+    return {
+        "VCS 2": best_vcs2,
+        "VCS 1": best_vcs1,
+        "sum_variance": best_sum_var,
+        "evaluations": evaluations,
+        "converged": converged,
+        "method": method,
+        "grids": [VCS2_grid, VCS1_grid, SumVarArr],
+        "groups": report_groups(groups),
+    }
+
+def optimize_tm(components_input, stage_details_input, num_points=10, method="grid", tol=0.01, ftol=1e-9, max_evals=10000, workers=1):
     """
     Optimizes a VCS cooled thermal model
     Takes in components dictionary and stage details dictionary
@@ -258,52 +792,24 @@ def optimize_tm(components_input, stage_details_input, num_points=10):
         components_input (dict): The input component details.
         stage_details_input (dict): The input stage details.
         num_points (int): The number of points to sample for VCS temperatures.
+        method (str, optional): The optimizer, "grid", "adaptive" or "minimize" (see optimize_vcs). Defaults to "grid".
+        tol (float, optional): Convergence tolerance on the VCS temperatures [K]. Defaults to 0.01.
+        ftol (float, optional): Convergence tolerance on the sum variance [W]. Defaults to 1e-9.
+        max_evals (int, optional): Budget of model evaluations. Defaults to 10000.
+        workers (int, optional): Number of worker processes, None for one per CPU. Defaults to 1.
     Returns:
         details (dict): The updated component details with power calculations.
         output_data (dict): The output data containing stage details and total power.
         grids (list): A list containing the VCS2 grid, VCS1 grid, and SumVarArr.
 
     """
-    # Step one - import data
-    # Step two - calculate power
-    # Step three - change temps
-    # Step four - go back to step 2
-    VCS2_temps = np.linspace(100, 260, num_points)
-    VCS1_temps = np.linspace(5, 100, num_points)
-    VCS2_grid, VCS1_grid = np.meshgrid(VCS2_temps, VCS1_temps) 
-    SumVarArr = np.zeros_like(VCS2_grid)
-    best_sum_var = 1e6
-    # sum_var_dict = {}
-    # hold_time_arr = []
-    stage_details = stage_details_input.copy()
-    components = components_input.copy()
-    i = 0
-    for vcs2temp in VCS2_temps:
-        j = 0
-        stage_details["VCS 2"]["lowT"] = vcs2temp        
-        stage_details["VCS 1"]["highT"] = vcs2temp
-        for vcs1temp in VCS1_temps:
-            stage_details["VCS 1"]["lowT"] = vcs1temp
-            stage_details["4K - LHe"]["highT"] = vcs1temp # Update the 4K LHe stage high temp to match VCS2 low temp
-            details = get_all_powers(components, stage_details)
-            stage_total_power = {stage: sum(details["Power Total (W)"] for details in comps.values()) for stage, comps in details.items()}
-            output_data = {
-            "components": components,
-            "stage_details": stage_details,
-            "total_power": stage_total_power
-            }
-            sum_var, cooling_dict = get_sum_variance(output_data)
-            SumVarArr[i, j] = sum_var
-            # hold_time_arr = np.append(hold_time_arr, cooling_dict["Cryo Hold Time"])
-            if sum_var < best_sum_var:
-                best_sum_var = sum_var
-                optimal_vcs = {"VCS 2":vcs2temp, "VCS 1":vcs1temp}
-            j += 1
-        i += 1
-    stage_details["VCS 2"]["lowT"] = optimal_vcs["VCS 2"]        
-    stage_details["VCS 1"]["highT"] = optimal_vcs["VCS 2"]
-    stage_details["VCS 1"]["lowT"] = optimal_vcs["VCS 1"]
-    stage_details["4K - LHe"]["highT"] = optimal_vcs["VCS 1"] # Update the 4K LHe stage high temp to match VCS2 low temp
+    # Work on deep copies so that the inputs are never modified (and optimize_tm can run concurrently)
+    stage_details = copy.deepcopy(stage_details_input)
+    components = copy.deepcopy(components_input)
+    result = optimize_vcs(components, stage_details, method=method, num_points=num_points, tol=tol, ftol=ftol, max_evals=max_evals, workers=workers)
+    print(f"Optimized {result['groups']['components']} components as {result['groups']['groups']} groups of identical components")
+    # Recalculate the model at the optimal temperatures
+    set_vcs_temps(stage_details, result["VCS 2"], result["VCS 1"])
     details = get_all_powers(components, stage_details)
 
     stage_total_power = {stage: sum(details["Power Total (W)"] for details in comps.values()) for stage, comps in details.items()}
@@ -313,7 +819,7 @@ def optimize_tm(components_input, stage_details_input, num_points=10):
         "total_power": stage_total_power
         }
 
-    return details, output_data, [VCS2_grid, VCS1_grid, SumVarArr]
+    return details, output_data, result["grids"]
 
 
 def save_to_json_manual(components, stage_details):
@@ -342,10 +848,8 @@ def find_interpolation(material):
     Returns:
         bool: True if the interpolation file exists, False otherwise.
     """
-    # Load the material object from the specified path
-    mat_file = os.path.join(path_to_mat_lib, material, "material.pkl")
-    with open(mat_file, 'rb') as f:
-        mat = pickle.load(f)
+    # Load the material object through the shared material registry
+    mat = get_material(material)
     if hasattr(mat, 'interpolate_function'):
         interp_func = mat.interpolate_function
         if interp_func is None:
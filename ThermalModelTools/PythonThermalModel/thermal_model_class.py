@@ -1,17 +1,40 @@
 # Creating classes for easy use of the thermal model
 
-from stage_calc import calculate_power_function, get_all_powers, optimize_tm
+from stage_calc import calculate_part_power, optimize_tm, get_sum_variance
+from component_table import ComponentTable
 from plotting import plot_integral, plot_pie_chart
 
 from stages.stage import Stage
 from astropy import units as u
 
 class ThermalModel:
+    """A thermal model : stage temperatures, the components of each stage and their powers.
+
+    Powers are recomputed incrementally. Changing a stage temperature (set_stage_temp) only marks the components
+    of that stage as dirty, editing a component (update_component) only that component; refresh() recomputes the
+    dirty components and re-sums the totals of their stages.
+
+    The components are also held in a columnar ComponentTable (sharing the details dictionaries), which computes
+    the powers, stage totals and vapor-providing load as array operations. The components dictionary stays the
+    reference : refresh() re-reads the dirty components from it, and rebuilds the table when components were
+    added or removed, so direct edits of the dictionaries are picked up once the components are marked dirty
+    (update_all_powers marks all of them).
+
+    Attributes:
+        components (dict): {stage: {component: details}}.
+        stage_temps (dict): {stage: {"lowT": T, "highT": T}}.
+        total_power (dict): {stage: total power [W]}.
+        stages (list): The stage names.
+        table (ComponentTable): Columnar view of the components.
+    """
     def __init__(self, stages):
         self.components = stages["components"]
         self.stage_temps = stages["stage_details"]
         self.total_power = stages["total_power"]
         self.stages = list(self.components.keys())
+        self.table = ComponentTable.from_components(self.components)
+        # (stage, component) pairs whose powers are out of date
+        self._dirty = set()
 
     def get_stage(self, name):
         """ Returns a Stage object for the specified stage name.
@@ -50,29 +73,147 @@ class ThermalModel:
                         return Component_Inspect(self, component, stage)
         return None
     
+    @property
+    def overall_power(self):
+        """The total power of all stages [W]."""
+        return sum(self.total_power.values())
+
+    def mark_dirty(self, stage=None, component=None):
+        """ Marks component powers as out of date.
+        Args:
+            stage (str, optional): The stage. Defaults to None (every stage).
+            component (str, optional): The component of the stage. Defaults to None (every component of the stage).
+        """
+        stages = list(self.components) if stage is None else [stage]
+        for stage_name in stages:
+            names = self.components[stage_name].keys() if component is None else [component]
+            self._dirty.update((stage_name, name) for name in names)
+
+    def dirty_components(self):
+        """ Returns:
+            list: The (stage, component) pairs whose powers are out of date.
+        """
+        return sorted(self._dirty)
+
+    def refresh(self):
+        """ Recomputes the powers of the dirty components, then the totals of their stages.
+        Returns:
+            int: The number of components recomputed.
+        """
+        stages = self._sync_table()
+        rows = [self.table.row(stage, name) for stage, name in sorted(self._dirty)]
+        self.table.compute_powers(self.stage_temps, rows)
+        self.table.write_back(rows)
+        totals = self.table.stage_totals()
+        for stage in stages | {stage for stage, _ in self._dirty}:
+            self.total_power[stage] = totals[stage]
+        n_recomputed = len(self._dirty)
+        self._dirty.clear()
+        return n_recomputed
+
+    def _sync_table(self):
+        """ Brings the table in line with the components dictionary before a refresh.
+        If components were added or removed, the table is rebuilt and the added components are marked dirty.
+        Otherwise the rows of the dirty components are re-read from their (possibly edited or replaced) details.
+        Returns:
+            set: The stages whose totals must be re-summed besides those of the dirty components.
+        """
+        keys = [(stage, name) for stage, stage_components in self.components.items() for name in stage_components]
+        if keys != self.table.keys():
+            old_keys = set(self.table.keys())
+            self.table = ComponentTable.from_components(self.components)
+            self.stages = list(self.components)
+            self._dirty = (self._dirty & set(keys)) | (set(keys) - old_keys)
+            # Stages that lost a component need new totals too
+            return set(self.stages)
+        for stage, name in self._dirty:
+            row = self.table.row(stage, name)
+            self.table.details[row] = self.components[stage][name]
+            self.table.set_row(row, self.components[stage][name])
+        return set()
+
+    def set_stage_temp(self, stage, lowT=None, highT=None, update=True):
+        """ Changes the temperatures of a stage, marking its components as dirty.
+        Args:
+            stage (str): The stage name.
+            lowT (float, optional): The new low temperature [K]. Defaults to None (unchanged).
+            highT (float, optional): The new high temperature [K]. Defaults to None (unchanged).
+            update (bool, optional): Whether to refresh the powers right away. Defaults to True.
+        """
+        for key, value in (("lowT", lowT), ("highT", highT)):
+            if value is not None and value != self.stage_temps[stage][key]:
+                self.stage_temps[stage][key] = value
+                self.mark_dirty(stage)
+        if update:
+            self.refresh()
+
+    def update_component(self, name, properties, stage=None, update=True):
+        """ Edits the properties of a component (e.g. {"Length (m)": 0.2}), marking it as dirty.
+        Args:
+            name (str): The component name.
+            properties (dict): The properties to change.
+            stage (str, optional): The stage of the component. Defaults to None (the first stage holding it).
+            update (bool, optional): Whether to refresh the powers right away. Defaults to True.
+        """
+        if stage is None:
+            stage = next((stage_name for stage_name in self.stages if name in self.components[stage_name]), None)
+        if stage is None or name not in self.components[stage]:
+            raise KeyError(f"Component {name} not found.")
+        self.components[stage][name].update(properties)
+        self.mark_dirty(stage, name)
+        if update:
+            self.refresh()
+
+    def to_json(self):
+        """ Returns:
+            dict: The thermal model JSON dictionary (components, stage_details and total_power) with up to date powers.
+        """
+        self.refresh()
+        return self.table.to_json(self.stage_temps)
+
+    def get_sum_variance(self):
+        """ Computes the VCS sum variance and cooling details of the model (see stage_calc.get_sum_variance),
+        with the vapor-providing load reduced from the component table.
+        Returns:
+            SumVariance, cooling_details_dict: As returned by stage_calc.get_sum_variance.
+        """
+        output_data = self.to_json()
+        return get_sum_variance(output_data, load_providing_vapor=self.table.vapor_load())
+
     def update_all_powers(self):
         """ Updates the power for all components in the thermal model.
-        This method iterates through all components in each stage and calculates their power based on the current stage temperatures.
+        This method rebuilds the table from the components dictionary (picking up any direct edit), marks every
+        component as dirty and recomputes them based on the current stage temperatures.
         """
-        self.components = get_all_powers(self.components, self.stage_temps)
-        self.total_power = sum(comp.calculate_power() for stage in self.components.values() for comp in stage)
+        self.table = ComponentTable.from_components(self.components)
+        self.stages = list(self.components)
+        self.mark_dirty()
+        self.refresh()
 
-    def optimize(self, optimization_points: int = 10):
+    def optimize(self, optimization_points: int = 10, method: str = "grid", tol: float = 0.01, max_evals: int = 10000, workers: int = 1):
         """
         Optimizes a VCS cooled thermal model
         Takes in components dictionary and stage details dictionary
         Args:
-            components_input (dict): The input component details.
-            stage_details_input (dict): The input stage details.
-            num_points (int): The number of points to sample for VCS temperatures.
+            optimization_points (int): The number of points to sample for VCS temperatures (per axis).
+            method (str, optional): The optimizer, "grid", "adaptive" or "minimize" (see stage_calc.optimize_vcs). Defaults to "grid".
+            tol (float, optional): Convergence tolerance on the VCS temperatures [K]. Defaults to 0.01.
+            max_evals (int, optional): Budget of model evaluations. Defaults to 10000.
+            workers (int, optional): Number of worker processes, None for one per CPU. Defaults to 1.
         Returns:
             details (dict): The updated component details with power calculations.
             output_data (dict): The output data containing stage details and total power.
             grids (list): A list containing the VCS2 grid, VCS1 grid, and SumVarArr.
 
         """
-        # Placeholder for optimization logic
-        optimize_tm(self.components, self.stage_temps, optimization_points)
+        details, output_data, grids = optimize_tm(self.components, self.stage_temps, optimization_points, method=method, tol=tol, max_evals=max_evals, workers=workers)
+        # optimize_tm works on copies, keep the optimized model
+        self.components = details
+        self.stage_temps = output_data["stage_details"]
+        self.total_power = output_data["total_power"]
+        self.table = ComponentTable.from_components(self.components)
+        self._dirty.clear()
+        return details, output_data, grids
 
     def plot_stage(self, stage_name, streamlit=False):
         """
@@ -133,18 +274,18 @@ class Component_Inspect:
         self.total_power = self.calculate_power()
 
     def calculate_power(self):
-        """Calculate the power function for the given component.
+        """Calculate the total power of the given component.
 
         Args:
             self (Component_Inspect): The component object for which to calculate power.
         Returns:
-            float: The calculated power per unit.
+            float: The calculated total power (power per part times the number of parts).
         """
         stage_temps = self.model.stage_temps[self.stage]
         if self.type == "Power per Part":
             return self.power_per_part * self.number
         elif self.type in ["Component", "Standard", "A/L", "Coax"]:
-            return calculate_power_function(self.model.components[self.stage][self.name], stage_temps, A_L=(self.type == "A/L"))
+            return calculate_part_power(self.model.components[self.stage][self.name], stage_temps) * float(self.number)
         else:
             raise ValueError(f"Unknown component type: {self.type}")
 
@@ -5,7 +5,7 @@ import random, os, sys
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.colors as c
-import json, pickle
+import json
 import numpy as np
 from stage_calc import *
 import plotly.express as px
@@ -99,9 +99,8 @@ with tabs[0]:
     # Select the type of component you want to add
     
     def get_material_fit_names(mat_name):
-        # Load the material class from the material pkl file
-        with open(os.path.join(path_to_mat_lib, mat_name, f"material.pkl"), 'rb') as f:
-            material_obj = pickle.load(f)
+        # Load the material class through the shared material registry
+        material_obj = get_material(mat_name)
         fits_list = [fit.name for fit in material_obj.fits]
         all_fits_file = os.path.join(path_to_mat_lib, mat_name, f"{mat_name}_fits.csv")
         
@@ -649,8 +648,8 @@ with tabs[3]:
     
     if quick_pick["Fit Choice"] is not None:
         fit_obj = get_fit_by_name(quick_pick["Material"], quick_pick["Fit Choice"])
-        ConIntQuad = fit_obj.tc_integral(lowT*u.K, highT*u.K)[0].value
-        st.markdown(f"Conductivity Integral (Quad): {ConIntQuad}")
+        ConIntQuad, _, int_method = fit_obj.integrate(lowT, highT)
+        st.markdown(f"Conductivity Integral ({int_method}): {ConIntQuad}")
 
 
     try:
@@ -0,0 +1,77 @@
+"""
+Benchmark of the batched fit evaluation (FitBank) against evaluating the library fits one at a time.
+
+Tabulates every fit of the library on a logarithmic temperature grid both ways, checks that the results agree
+and prints the timings. The bank is timed both within the fit ranges (the default, out-of-range points are not
+evaluated) and with extrapolate=True (every fit at every temperature).
+
+Usage:
+    python benchmark_fit_bank.py [--points 10000] [--runs 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_dir, "thermal_conductivity"))
+
+from tc_utils import get_fit_bank
+from fit_types import get_func_type
+
+
+def evaluate_one_by_one(fits, T):
+    k = np.empty((len(fits), T.size))
+    for i, fit in enumerate(fits):
+        try:
+            k[i] = get_func_type(fit["fit_type"])(T, *fit["parameters"])
+        except Exception:
+            k[i] = np.nan
+    return k
+
+
+def main(points: int = 10000, runs: int = 5):
+    from tc_utils import get_library_index
+
+    fits = get_library_index().all_fits()
+    bank = get_fit_bank()
+    T = np.logspace(-2, 3, points)
+    with np.errstate(all="ignore"):
+        # Warm up (first erf call imports scipy.special)
+        bank.evaluate(T)
+        bank_times, extrapolate_times, loop_times = [], [], []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            k_bank, out_of_range = bank.evaluate(T)
+            bank_times.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            k_extrapolate, _ = bank.evaluate(T, extrapolate=True)
+            extrapolate_times.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            k_loop = evaluate_one_by_one(fits, T)
+            loop_times.append(time.perf_counter() - t0)
+    # Values below ~1e-300 are subnormal and only agree to a few digits
+    normal = np.abs(k_loop) > 1e-300
+    agree = np.allclose(k_extrapolate[normal], k_loop[normal], rtol=1e-10, atol=0) and np.array_equal(
+        np.isnan(k_extrapolate), np.isnan(k_loop)
+    )
+    in_range = ~out_of_range
+    agree &= np.allclose(k_bank[in_range], k_extrapolate[in_range], rtol=1e-12, atol=0, equal_nan=True) and bool(
+        np.isnan(k_bank[out_of_range]).all()
+    )
+    print(f"{bank} on {points} temperatures ({out_of_range.mean()*100:.0f}% of points out of range)")
+    print(f"Fit bank    : best {min(bank_times)*1e3:.1f} ms of {runs} runs (in range)")
+    print(f"Fit bank    : best {min(extrapolate_times)*1e3:.1f} ms of {runs} runs (extrapolate=True)")
+    print(f"One by one  : best {min(loop_times)*1e3:.1f} ms of {runs} runs")
+    print(f"Results agree : {agree}")
+    return agree
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the batched fit evaluation.")
+    parser.add_argument("--points", type=int, default=10000, help="Number of temperatures.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of timed runs.")
+    args = parser.parse_args()
+    sys.exit(0 if main(points=args.points, runs=args.runs) else 1)
@@ -0,0 +1,139 @@
+"""
+Benchmark of the nonlinear data fits of the library materials (fitting.fit_nonlinear).
+
+Refits the data of every library material with a nonlinear fit type (loglog, powerlaw, ...) three ways:
+    - "finite diff" : cold start from the default initial guess with finite-difference Jacobians (the former
+      curve_fit behaviour),
+    - "analytic"    : cold start with the analytic Jacobian of the fit type (fit_types.get_jacobian),
+    - "warm"        : analytic Jacobian, warm started from the material's existing data fit (raw_fit_params),
+    - "multistart"  : the best of the warm start, the default guess and --n-starts seeded loglog starts
+      (fitting.fit_multistart, loglog materials only),
+and reports for each the number of model evaluations (function evaluations, plus n_param per finite-difference
+Jacobian), the run time and the final cost (half the sum of the squared log residuals). The check passes if the
+analytic Jacobian needs fewer model evaluations and less time in total than finite differences, and warm starts
+need fewer evaluations than cold starts, and multi-start fits end at a cost no higher than the cold and warm fits.
+Warm starts only ever lower the cost of the existing fit, so their cost can differ from the cold starts (a
+different, often better, local minimum of the loglog fits).
+
+Usage:
+    python benchmark_fitting.py [--materials Kapton G10_FR4 ...] [--repeat 3] [--n-starts 8] [--seed 0] [--workers 1]
+"""
+
+import os
+import sys
+import time
+import argparse
+import warnings
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+tc_dir = os.path.join(repo_dir, "thermal_conductivity")
+sys.path.insert(0, tc_dir)
+
+from serialization import material_path, load_material_file
+from fitting import fit_arrays, fit_multistart, is_linear_fit_type, supports_multistart
+
+MODES = {
+    "finite diff": dict(warm_start=False, jac="2-point"),
+    "analytic": dict(warm_start=False, jac=None),
+    "warm": dict(warm_start=True, jac=None),
+}
+
+
+def library_materials(names: list = None) -> list:
+    """
+    Returns:
+        materials (list): The library materials with data and a nonlinear fit type.
+    """
+    lib_dir = os.path.join(tc_dir, "lib")
+    names = sorted(os.listdir(lib_dir)) if names is None else names
+    materials = []
+    for name in names:
+        material_file = material_path(os.path.join(lib_dir, name))
+        if material_file is None:
+            continue
+        mat = load_material_file(material_file)
+        if mat.data_classes and mat.fit_type is not None and not is_linear_fit_type(mat.fit_type):
+            materials.append(mat)
+    return materials
+
+
+def run(mat, warm_start: bool, jac, repeat: int = 1, multistart: dict = None) -> dict:
+    inputs = mat.fit_inputs(warm_start=warm_start)
+    if inputs is None:
+        return None
+    x, y, n_param, p0, bounds = inputs
+    if multistart is not None:
+        if not supports_multistart(mat.fit_type):
+            return None
+        extra_starts = [p0, mat.fit_inputs(warm_start=False)[3]]
+    elapsed = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                if multistart is None:
+                    _, _, info = fit_arrays(mat.fit_type, x, y, n_param=n_param, p0=p0, bounds=bounds, jac=jac, full_output=True)
+                else:
+                    _, _, info = fit_multistart(mat.fit_type, x, y, n_param, extra_starts, bounds, full_output=True, **multistart)
+        except (RuntimeError, ValueError):
+            return None
+        elapsed.append(time.perf_counter() - t0)
+    info["time"] = min(elapsed)
+    info["evals"] = info["nfev"] + (info["njev"] * n_param if jac is not None else 0)
+    return info
+
+
+def main(materials: list = None, repeat: int = 3, n_starts: int = 8, seed: int = 0, workers: int = 1) -> bool:
+    mats = library_materials(materials)
+    modes = dict(MODES)
+    if n_starts > 0:
+        modes["multistart"] = dict(warm_start=True, jac=None, multistart=dict(n_starts=n_starts, seed=seed, workers=workers))
+    totals = {mode: {"evals": 0, "njev": 0, "time": 0.0} for mode in modes}
+    print(f"{'material':<28}{'fit type':<10}" + "".join(f"{mode + ' evals/time (ms)/cost':>36}" for mode in modes))
+    n_compared = 0
+    worse = []
+    for mat in mats:
+        results = {mode: run(mat, repeat=repeat, **kwargs) for mode, kwargs in modes.items()}
+        if any(result is None for result in results.values()):
+            print(f"{mat.name:<28}{mat.fit_type:<10} fit failed, skipped")
+            continue
+        n_compared += 1
+        line = f"{mat.name:<28}{mat.fit_type:<10}"
+        for mode, result in results.items():
+            for key in totals[mode]:
+                totals[mode][key] += result[key]
+            line += f"{result['evals']:>12}{result['time']*1e3:>12.1f}{result['cost']:>12.4g}"
+        print(line)
+        if "multistart" in results:
+            best_single = min(results["analytic"]["cost"], results["warm"]["cost"])
+            if results["multistart"]["cost"] > best_single * (1 + 1e-6):
+                worse.append(mat.name)
+
+    print(f"\nTotals over {n_compared} materials:")
+    for mode, total in totals.items():
+        print(f"{mode:<14}{total['evals']:>8} model evaluations{total['njev']:>8} Jacobian evaluations{total['time']:>10.3f} s")
+
+    passed = True
+    if totals["analytic"]["evals"] >= totals["finite diff"]["evals"] or totals["analytic"]["time"] >= totals["finite diff"]["time"]:
+        print("FAIL : the analytic Jacobians are not faster than finite differences")
+        passed = False
+    if totals["warm"]["evals"] >= totals["analytic"]["evals"]:
+        print("FAIL : warm starts don't need fewer model evaluations than cold starts")
+        passed = False
+    if worse:
+        print(f"FAIL : the multi-start fits of {worse} are worse than a single start")
+        passed = False
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the nonlinear data fits of the library materials.")
+    parser.add_argument("--materials", nargs="+", default=None, help="Materials to refit. Defaults to every library material with a nonlinear fit type.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs of each fit (the best is reported).")
+    parser.add_argument("--n-starts", type=int, default=8, help="Number of seeded starts of the multi-start fits (0 to skip them).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the multi-start transition temperatures.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes running the multi-start fits.")
+    args = parser.parse_args()
+    passed = main(materials=args.materials, repeat=args.repeat, n_starts=args.n_starts, seed=args.seed, workers=args.workers)
+    sys.exit(0 if passed else 1)
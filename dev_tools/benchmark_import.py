@@ -0,0 +1,75 @@
+"""
+Startup benchmark for the evaluation-only path of the thermal_conductivity package.
+
+Runs a fresh python interpreter that imports tc_utils, loads one material and evaluates one of its fits,
+then checks that
+    - the whole thing stays within an import-time budget (best of several runs), and
+    - none of the heavy optional modules (plotting, units, fitting, yaml, pandas) were imported.
+Exits with a non-zero status if either check fails.
+
+Usage:
+    python benchmark_import.py [--budget 0.5] [--runs 5] [--material Aluminum] [--fit Aluminum_1100_NIST]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+tc_dir = os.path.join(repo_dir, "thermal_conductivity")
+
+# Modules that must only be imported on first use, never by the evaluation-only path
+HEAVY_MODULES = [
+    "matplotlib",
+    "matplotlib.pyplot",
+    "astropy",
+    "astropy.units",
+    "scipy.optimize",
+    "scipy.integrate",
+    "scipy.interpolate",
+    "yaml",
+    "pandas",
+]
+
+EVALUATION_SCRIPT = """
+import sys, time, json
+t0 = time.perf_counter()
+sys.path.insert(0, {tc_dir!r})
+import tc_utils
+fit = tc_utils.get_fit_by_name({material!r}, {fit!r})
+k = fit.evaluate(10.0)
+elapsed = time.perf_counter() - t0
+print(json.dumps({{"elapsed": elapsed, "k": float(k), "modules": sorted(sys.modules)}}))
+"""
+
+
+def run_once(material: str, fit: str) -> dict:
+    script = EVALUATION_SCRIPT.format(tc_dir=tc_dir, material=material, fit=fit)
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main(budget: float = 0.5, runs: int = 5, material: str = "Aluminum", fit: str = "Aluminum_1100_NIST") -> bool:
+    results = [run_once(material, fit) for _ in range(runs)]
+    best = min(result["elapsed"] for result in results)
+    loaded_heavy = [mod for mod in HEAVY_MODULES if mod in results[0]["modules"]]
+
+    print(f"Evaluation-only startup ({material}, {fit}): best {best*1e3:.1f} ms of {runs} runs, budget {budget*1e3:.0f} ms")
+    if loaded_heavy:
+        print(f"FAIL : heavy modules imported on the evaluation-only path: {loaded_heavy}")
+    if best > budget:
+        print("FAIL : import-time budget exceeded")
+    return best <= budget and not loaded_heavy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of the evaluation-only path.")
+    parser.add_argument("--budget", type=float, default=0.5, help="Import-time budget in seconds.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to time.")
+    parser.add_argument("--material", default="Aluminum", help="Material to load.")
+    parser.add_argument("--fit", default="Aluminum_1100_NIST", help="Fit to evaluate.")
+    args = parser.parse_args()
+    passed = main(budget=args.budget, runs=args.runs, material=args.material, fit=args.fit)
+    sys.exit(0 if passed else 1)
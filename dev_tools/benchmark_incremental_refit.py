@@ -0,0 +1,154 @@
+"""
+Benchmark of the incremental refit of a material after a dataset is added (Material.update_material).
+
+For each material, the RAW csv files are copied to a temporary folder and a new measurement is added to it (the
+largest existing file, with the conductivity scaled by --scale). The material is then updated two ways:
+    - "full"        : every csv file is parsed again, the data fit starts from the default guess and the whole
+      interpolation is rebuilt (update_material(incremental=False), the former behaviour),
+    - "incremental" : only the new file is parsed (the others are matched by checksum), the data fit is warm
+      started from the existing one and the interpolation is only rebuilt over the range of the data fit
+      (update_material(incremental=True)),
+and the run time, the number of parsed files and the final cost of the data fit (half the sum of the squared log
+residuals) are reported. The check passes if the incremental updates take less time in total than the full ones
+and every incremental interpolation matches a complete rebuild from the same fits within --rtol.
+The library files are not modified.
+
+Usage:
+    python benchmark_incremental_refit.py [--materials G10_parent Stainless_Steel] [--repeat 3] [--scale 1.05] [--rtol 1e-3]
+"""
+
+import io
+import os
+import sys
+import copy
+import time
+import shutil
+import argparse
+import tempfile
+import warnings
+import contextlib
+
+import numpy as np
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+tc_dir = os.path.join(repo_dir, "thermal_conductivity")
+sys.path.insert(0, tc_dir)
+
+from serialization import material_path, load_material_file
+from fit_types import get_func_type
+
+NEW_FILE = "benchmark_new_measurement.csv"
+
+
+def add_measurement(data_folder: str, scale: float) -> str:
+    """
+    Description : Writes a new measurement to the data folder : the largest csv file, with its conductivity scaled.
+    Returns:
+        path (str): Path of the new csv file.
+    """
+    files = [f for f in os.listdir(data_folder) if f.endswith(".csv")]
+    source = max(files, key=lambda f: os.path.getsize(os.path.join(data_folder, f)))
+    with open(os.path.join(data_folder, source), "r") as f:
+        lines = f.read().splitlines()
+    rows = []
+    for line in lines[2:]:
+        values = line.split(",")
+        values[1] = repr(float(values[1]) * scale)
+        rows.append(",".join(values))
+    path = os.path.join(data_folder, NEW_FILE)
+    with open(path, "w") as f:
+        f.write("\n".join(lines[:2] + rows) + "\n")
+    return path
+
+
+def data_fit_cost(mat) -> float:
+    inputs = mat.fit_inputs(warm_start=False)
+    fit = mat.fit_by_name(f"{mat.name}_data")
+    if inputs is None or fit is None:
+        return np.nan
+    x, y = inputs[:2]
+    return 0.5 * np.sum((np.log(get_func_type(fit.fit_type)(x, *fit.parameters)) - np.log(y)) ** 2)
+
+
+def run(mat, incremental: bool, repeat: int = 1) -> tuple:
+    elapsed = []
+    for _ in range(repeat):
+        updated = copy.deepcopy(mat)
+        parsed = []
+        read_dataset = updated.read_dataset
+
+        def counting_read(file, checksum=None):
+            parsed.append(file)
+            return read_dataset(file, checksum=checksum)
+
+        updated.read_dataset = counting_read
+        t0 = time.perf_counter()
+        # The material functions print their progress, keep it out of the report
+        with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            updated.update_material(save=False, incremental=incremental)
+        elapsed.append(time.perf_counter() - t0)
+        del updated.read_dataset
+    return updated, {"time": min(elapsed), "parsed": len(parsed), "cost": data_fit_cost(updated)}
+
+
+def interpolation_error(mat) -> float:
+    """
+    Returns:
+        error (float): Largest relative difference between the material's interpolation and a complete rebuild.
+    """
+    full = mat.interpolate(preferred_fit=None)
+    T = np.logspace(np.log10(full.x[0]), np.log10(full.x[-1]), 2000)
+    with np.errstate(all="ignore"):
+        error = np.abs(mat.interpolate_function(T) / full(T) - 1)
+    return float(np.nanmax(error))
+
+
+def main(materials: list = ("G10_parent", "Stainless_Steel"), repeat: int = 3, scale: float = 1.05, rtol: float = 1e-3) -> bool:
+    os.chdir(tc_dir)
+    totals = {"full": 0.0, "incremental": 0.0}
+    print(f"{'material':<20}{'files':>6}" + "".join(f"{mode + ' time (ms)/parsed/cost':>34}" for mode in totals) + f"{'interp error':>14}")
+    passed = True
+    for name in materials:
+        path = material_path(os.path.join("lib", name))
+        mat = None if path is None else load_material_file(path)
+        if mat is None or not os.path.isdir(mat.data_folder):
+            print(f"{name:<20} no RAW data, skipped")
+            continue
+        with tempfile.TemporaryDirectory() as data_folder:
+            for file in os.listdir(mat.data_folder):
+                if file.endswith(".csv"):
+                    shutil.copy(os.path.join(mat.data_folder, file), data_folder)
+            mat.data_folder = data_folder
+            # The stored material, with the checksums of its files as written by the next build
+            mat.data_classes = mat.get_data()[1]
+            add_measurement(data_folder, scale)
+            results = {mode: run(mat, incremental=(mode == "incremental"), repeat=repeat) for mode in totals}
+
+        line = f"{name:<20}{len(mat.data_classes) + 1:>6}"
+        for mode, (_, result) in results.items():
+            totals[mode] += result["time"]
+            line += f"{result['time']*1e3:>14.1f}{result['parsed']:>8}{result['cost']:>12.4g}"
+        error = interpolation_error(results["incremental"][0])
+        print(line + f"{error:>14.2g}")
+        if error > rtol:
+            print(f"FAIL : the incremental interpolation of {name} differs from a complete rebuild by {error:.3g}")
+            passed = False
+
+    print(f"\nTotal : full {totals['full']:.3f} s, incremental {totals['incremental']:.3f} s "
+          f"({totals['incremental'] / max(totals['full'], 1e-12):.0%} of the full time)")
+    if totals["incremental"] >= totals["full"]:
+        print("FAIL : the incremental updates are not faster than the full ones")
+        passed = False
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the incremental refit of a material after a dataset is added.")
+    parser.add_argument("--materials", nargs="+", default=["G10_parent", "Stainless_Steel"], help="Materials to update.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs of each update (the best is reported).")
+    parser.add_argument("--scale", type=float, default=1.05, help="Conductivity scale of the added measurement.")
+    parser.add_argument("--rtol", type=float, default=1e-3, help="Tolerance of the incremental interpolation against a complete rebuild.")
+    args = parser.parse_args()
+    passed = main(materials=args.materials, repeat=args.repeat, scale=args.scale, rtol=args.rtol)
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,102 @@
+"""
+Benchmark of the vectorized lowTextrapolate and NIST5a_3 (TchebyLnT) kernels in fit_types.
+
+Checks the kernels against the original per-temperature implementations (kept below as references) on the
+library fits of these types, then times the kernels from 10^3 to 10^6 temperatures to show linear scaling.
+
+Usage:
+    python benchmark_kernels.py [--max-exponent 6] [--rtol 1e-12]
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_dir, "thermal_conductivity"))
+
+from fit_types import lowTextrapolate, NIST5a_3
+from tc_utils import get_library_index
+
+
+def reference_lowTextrapolate(T, *params):
+    k = []
+    for i in range(len(T)):
+        k_plus = 0
+        if T[i] > params[0]:
+            logtemp = np.log10(T[i])
+            for n in range(1, len(params)):
+                k_plus += params[n - 1] * logtemp ** (n - 1)
+            k = np.append(k, 10 ** (k_plus))
+        elif T[i] > params[1]:
+            k = np.append(k, params[3] * T[i] ** params[2])
+        else:
+            k = np.append(k, -1 * T[i])
+    return k
+
+
+def reference_NIST5a_3(T, *params):
+    lnT = np.log(T)
+    x = ((lnT - params[1]) - (params[2] - lnT)) / (params[2] - params[1])
+    k = 0
+    for i in range(3, 3 + int(params[0])):
+        k = k + params[i] * np.cos((i - 3) * np.arccos(x))
+    return np.exp(k)
+
+
+KERNELS = {
+    "lowTextrapolate": (lowTextrapolate, reference_lowTextrapolate),
+    "TchebyLnT": (NIST5a_3, reference_NIST5a_3),
+}
+
+
+def check(fit_type: str, fits: list, rtol: float) -> bool:
+    kernel, reference = KERNELS[fit_type]
+    T = np.logspace(-2, 3, 2000)
+    agree = True
+    with np.errstate(all="ignore"):
+        for fit in fits:
+            k, k_ref = kernel(T, *fit["parameters"]), reference(T, *fit["parameters"])
+            ok = np.allclose(k, k_ref, rtol=rtol, atol=0, equal_nan=True)
+            # Scalars must still return a float
+            ok &= isinstance(kernel(10.0, *fit["parameters"]), float) or fit_type != "lowTextrapolate"
+            agree &= ok
+            print(f"    {fit['name']:<40s} {'agrees' if ok else 'DIFFERS'}")
+    return agree
+
+
+def time_kernel(fit_type: str, params, max_exponent: int):
+    kernel = KERNELS[fit_type][0]
+    print(f"    {'N':>9s} {'time [ms]':>10s} {'ns / point':>11s}")
+    with np.errstate(all="ignore"):
+        for exponent in range(3, max_exponent + 1):
+            T = np.logspace(-2, 3, 10**exponent)
+            best = np.inf
+            for _ in range(3):
+                t0 = time.perf_counter()
+                kernel(T, *params)
+                best = min(best, time.perf_counter() - t0)
+            print(f"    {T.size:>9d} {best*1e3:>10.3f} {best/T.size*1e9:>11.1f}")
+    return
+
+
+def main(max_exponent: int = 6, rtol: float = 1e-12) -> bool:
+    fits = get_library_index().all_fits()
+    agree = True
+    for fit_type in KERNELS:
+        type_fits = [fit for fit in fits if fit["fit_type"] == fit_type]
+        print(f"{fit_type} ({len(type_fits)} library fits)")
+        agree &= check(fit_type, type_fits, rtol)
+        time_kernel(fit_type, type_fits[0]["parameters"], max_exponent)
+    print(f"All kernels agree with the reference implementations : {agree}")
+    return agree
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized fit kernels.")
+    parser.add_argument("--max-exponent", type=int, default=6, help="Time up to 10**max_exponent temperatures.")
+    parser.add_argument("--rtol", type=float, default=1e-12, help="Relative tolerance against the references.")
+    args = parser.parse_args()
+    sys.exit(0 if main(max_exponent=args.max_exponent, rtol=args.rtol) else 1)
@@ -0,0 +1,138 @@
+"""
+Benchmark of the incremental power updates of the thermal model class (thermal_model_class.ThermalModel).
+
+Builds a ThermalModel from a thermal model and checks that its powers stay identical to a full
+stage_calc.get_all_powers of the same components after each kind of edit :
+    - a stage temperature changed with set_stage_temp,
+    - a component edited with update_component,
+    - a component length and a "Power per Part" load edited directly in tm.components, then update_all_powers,
+    - a component added to and one removed from tm.components, then update_all_powers,
+and reports the time of an incremental refresh (one stage dirty) against update_all_powers. The check passes if
+every total power agrees within --rtol.
+
+The model is read from a thermal model JSON file (components and stage_details, as saved by the GUI), or the
+built-in model of benchmark_vcs_optimizer.py is used.
+
+Usage:
+    python benchmark_thermal_model.py [--model thermal_model.json] [--rtol 1e-12] [--repeat 5]
+"""
+
+import io
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+import contextlib
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_dir, "ThermalModelTools", "PythonThermalModel"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stage_calc
+from thermal_model_class import ThermalModel
+from benchmark_vcs_optimizer import demo_model
+
+
+def reference_powers(tm) -> dict:
+    """
+    Returns:
+        total_power (dict): {stage: total power [W]} of a full get_all_powers of a copy of the model.
+    """
+    components = copy.deepcopy(tm.components)
+    with contextlib.redirect_stdout(io.StringIO()):
+        stage_calc.get_all_powers(components, tm.stage_temps)
+    return {stage: sum(details["Power Total (W)"] for details in stage_components.values())
+            for stage, stage_components in components.items()}
+
+
+def compare(label: str, tm, rtol: float) -> bool:
+    reference = reference_powers(tm)
+    worst = 0.0
+    for stage, power in reference.items():
+        worst = max(worst, abs(tm.total_power[stage] - power) / max(abs(power), 1e-300))
+    passed = worst <= rtol and set(tm.total_power) >= set(reference)
+    print(f"{label:<48}{tm.overall_power:>14.6g}{sum(reference.values()):>14.6g}{worst:>12.2g}  {'ok' if passed else 'FAIL'}")
+    return passed
+
+
+def first_component(tm, comp_type: str) -> tuple:
+    for stage, stage_components in tm.components.items():
+        for name, details in stage_components.items():
+            if details.get("Type") == comp_type:
+                return stage, name
+    return None, None
+
+
+def main(model: str = None, rtol: float = 1e-12, repeat: int = 5) -> bool:
+    if model is None:
+        components, stage_details = demo_model()
+    else:
+        with open(model, "r") as f:
+            data = json.load(f)
+        components, stage_details = data["components"], data["stage_details"]
+    tm = ThermalModel({"components": components, "stage_details": stage_details, "total_power": {}})
+    with contextlib.redirect_stdout(io.StringIO()):
+        tm.update_all_powers()
+
+    print(f"{'edit':<48}{'model (W)':>14}{'reference (W)':>14}{'rel. diff':>12}")
+    passed = compare("initial update_all_powers", tm, rtol)
+
+    stage = tm.stages[0]
+    with contextlib.redirect_stdout(io.StringIO()):
+        tm.set_stage_temp(stage, lowT=stage_details[stage]["lowT"] * 1.1)
+    passed &= compare(f"set_stage_temp({stage!r})", tm, rtol)
+
+    standard_stage, standard = first_component(tm, "Standard")
+    power_stage, power = first_component(tm, "Power per Part")
+    if standard is not None:
+        length = tm.components[standard_stage][standard]["Length (m)"]
+        with contextlib.redirect_stdout(io.StringIO()):
+            tm.update_component(standard, {"Length (m)": 1.5 * length}, stage=standard_stage)
+        passed &= compare(f"update_component({standard!r}, length)", tm, rtol)
+
+        # Direct edits of the public dictionaries
+        tm.components[standard_stage][standard]["Length (m)"] = 2 * length
+        with contextlib.redirect_stdout(io.StringIO()):
+            tm.update_all_powers()
+        passed &= compare(f"direct edit of {standard!r} length", tm, rtol)
+    if power is not None:
+        tm.components[power_stage][power]["Power per Part (W)"] *= 10
+        with contextlib.redirect_stdout(io.StringIO()):
+            tm.update_all_powers()
+        passed &= compare(f"direct edit of {power!r} power per part", tm, rtol)
+
+    if standard is not None:
+        tm.components[standard_stage]["Added"] = dict(copy.deepcopy(tm.components[standard_stage][standard]), Number=1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            tm.update_all_powers()
+        passed &= compare(f"component added to {standard_stage!r}", tm, rtol)
+        del tm.components[standard_stage]["Added"]
+        with contextlib.redirect_stdout(io.StringIO()):
+            tm.update_all_powers()
+        passed &= compare(f"component removed from {standard_stage!r}", tm, rtol)
+
+    timings = {"refresh (one stage dirty)": [], "update_all_powers": []}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            tm.mark_dirty(stage)
+            t0 = time.perf_counter()
+            tm.refresh()
+            timings["refresh (one stage dirty)"].append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            tm.update_all_powers()
+            timings["update_all_powers"].append(time.perf_counter() - t0)
+    for label, elapsed in timings.items():
+        print(f"{label:<48}best {min(elapsed)*1e3:.2f} ms of {repeat} runs")
+    return bool(passed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the incremental power updates of the thermal model class.")
+    parser.add_argument("--model", default=None, help="Thermal model JSON file. Defaults to the demo model of benchmark_vcs_optimizer.py.")
+    parser.add_argument("--rtol", type=float, default=1e-12, help="Tolerance of the total powers against get_all_powers.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed runs (the best is reported).")
+    args = parser.parse_args()
+    passed = main(model=args.model, rtol=args.rtol, repeat=args.repeat)
+    sys.exit(0 if passed else 1)
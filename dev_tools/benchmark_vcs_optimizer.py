@@ -0,0 +1,175 @@
+"""
+Benchmark of the VCS temperature optimizers of the thermal model (stage_calc.optimize_vcs).
+
+Runs the "grid" optimizer at increasing resolutions and the "adaptive" and "minimize" optimizers on a thermal
+model, and reports for each run the number of model evaluations, the run time, the optimal VCS temperatures
+and how far they are from a tightly converged reference optimum. The check passes if the adaptive and minimize
+optimizers land within 10 x --tol of the reference (or at a sum variance as low) while using fewer evaluations
+than the finest grid, and if the fits of the model cover the temperatures of their stages.
+
+The model is read from a thermal model JSON file (components and stage_details, as saved by the GUI), or a
+small built-in model made of library materials is used.
+
+Usage:
+    python benchmark_vcs_optimizer.py [--model thermal_model.json] [--grids 10 30 100] [--num-points 10] [--tol 0.01] [--workers 1]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(repo_dir, "ThermalModelTools", "PythonThermalModel"))
+
+import stage_calc
+
+
+def _standard(material, fit, OD, ID, length, number, vapor=False):
+    return {"Type": "Standard", "Material": material, "Interpolate": fit is None, "Fit Choice": fit,
+            "OD (m)": OD, "ID (m)": ID, "Length (m)": length, "Number": number, "Providing Vapor": vapor}
+
+
+def _coax(number, vapor=False):
+    return {"Type": "Coax", "Number": number, "Providing Vapor": vapor, "Length (m)": 0.3,
+            "Casing Material": "Stainless_Steel_304", "Casing Fit Choice": "Stainless_Steel_304_NIST", "Casing Interpolate": False,
+            "Insulator Material": "Teflon", "Insulator Fit Choice": "Teflon_NIST", "Insulator Interpolate": False,
+            "Core Material": "Aluminum", "Core Fit Choice": None, "Core Interpolate": True,
+            "Case OD (m)": 0.0022, "Insulator OD (m)": 0.0017, "Core OD (m)": 0.0005}
+
+
+def _power(power, number, vapor=False):
+    return {"Type": "Power per Part", "Power per Part (W)": power, "Number": number, "Providing Vapor": vapor}
+
+
+def demo_model() -> tuple:
+    """
+    Returns:
+        components, stage_details (dict, dict): A small VCS cooled thermal model. The fits of every component cover
+            the temperatures its stage can take while the VCS temperatures are optimized (see check_ranges).
+    """
+    components = {
+        "VCS 2": {"Legs": _standard("G10_CR_Normal", "G10_CR_Normal_NIST", 0.02, 0.018, 0.3, 6), "Coax": _coax(8),
+                  "Optical load": _power(2.0, 1)},
+        "VCS 1": {"Legs": _standard("G10_CR_Normal", "G10_CR_Normal_NIST", 0.02, 0.018, 0.2, 6), "Coax": _coax(8),
+                  "Optical load": _power(0.5, 1), "Strap": _standard("Aluminum", None, 0.003, 0.0, 0.5, 2)},
+        "4K - LHe": {"Legs": _standard("G10_CR_Normal", "G10_CR_Normal_NIST", 0.015, 0.013, 0.15, 6, True),
+                     "Coax": _coax(8, True), "Optical load": _power(0.05, 1, True)},
+        "4K - Transient": {"LNA": _power(0.01, 4, True)},
+        "300mK": {"Legs": _standard("Teflon", "Teflon_data", 0.002, 0.0, 0.05, 4), "Load": _power(1e-5, 1)},
+    }
+    stage_details = {
+        "VCS 2": {"lowT": 150.0, "highT": 300.0},
+        "VCS 1": {"lowT": 40.0, "highT": 150.0},
+        "4K - LHe": {"lowT": 4.2, "highT": 40.0},
+        "4K - Transient": {"lowT": 4.2, "highT": 4.2},
+        "300mK": {"lowT": 0.3, "highT": 4.2},
+    }
+    return components, stage_details
+
+
+def stage_spans(stage_details) -> dict:
+    """
+    Returns:
+        spans (dict): Lowest and highest temperature [K] of each stage over the VCS search ranges of the optimizers.
+    """
+    spans = {stage: (float(temps["lowT"]), float(temps["highT"])) for stage, temps in stage_details.items()}
+    vcs2, vcs1 = stage_calc.VCS2_RANGE, stage_calc.VCS1_RANGE
+    if "VCS 2" in spans:
+        spans["VCS 2"] = (min(spans["VCS 2"][0], vcs2[0]), max(spans["VCS 2"][1], vcs2[1]))
+    if "VCS 1" in spans:
+        spans["VCS 1"] = (min(spans["VCS 1"][0], vcs1[0]), max(spans["VCS 1"][1], vcs2[1]))
+    if "4K - LHe" in spans:
+        spans["4K - LHe"] = (spans["4K - LHe"][0], max(spans["4K - LHe"][1], vcs1[1]))
+    return spans
+
+
+def check_ranges(components, stage_details) -> list:
+    """
+    Description : Checks that the fit (or interpolation) of every material of the model covers the temperatures of
+    its stage, so that no power comes from an extrapolated fit.
+    Returns:
+        problems (list): One message per material used outside of its range.
+    """
+    spans = stage_spans(stage_details)
+    layers = [("Material", "Fit Choice", "Interpolate")] + [layer[:3] for layer in stage_calc.COAX_LAYERS]
+    problems = []
+    for stage, stage_components in components.items():
+        lowT, highT = spans[stage]
+        for name, details in stage_components.items():
+            for mat_key, fit_key, interp_key in layers:
+                if mat_key not in details:
+                    continue
+                material = details[mat_key]
+                if details.get(interp_key):
+                    valid_range = stage_calc.find_interpolation(material)[1]
+                    label = f"{material} interpolation"
+                else:
+                    valid_range = stage_calc.get_fit_by_name(material, details[fit_key]).range
+                    label = details[fit_key]
+                if valid_range is None or lowT < valid_range[0] or highT > valid_range[1]:
+                    problems.append(f"{stage} / {name} : {label} is valid over {valid_range} K, the stage spans {lowT} to {highT} K")
+    return problems
+
+
+def run(components, stage_details, **kwargs) -> tuple:
+    # The model functions print intermediate values, keep them out of the report
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = stage_calc.optimize_vcs(components, stage_details, **kwargs)
+    return result, time.perf_counter() - t0
+
+
+def main(model: str = None, grids: list = (10, 30, 100), num_points: int = 10, tol: float = 0.01, workers: int = 1) -> bool:
+    if model is None:
+        components, stage_details = demo_model()
+    else:
+        with open(model, "r") as f:
+            data = json.load(f)
+        components, stage_details = data["components"], data["stage_details"]
+
+    problems = check_ranges(components, stage_details)
+    for problem in problems:
+        print(f"FAIL : {problem}")
+
+    reference, _ = run(components, stage_details, method="minimize", num_points=num_points, tol=1e-6, ftol=1e-14, max_evals=100000)
+    print(f"Reference optimum : VCS 2 = {reference['VCS 2']:.4f} K, VCS 1 = {reference['VCS 1']:.4f} K, sum variance = {reference['sum_variance']:.6g} W")
+
+    runs = [(f"grid {n}x{n}", dict(method="grid", num_points=n)) for n in grids]
+    runs += [(f"{method} ({num_points}x{num_points} start)", dict(method=method, num_points=num_points, tol=tol))
+             for method in ("adaptive", "minimize")]
+    print(f"{'optimizer':<28}{'evaluations':>12}{'time (s)':>10}{'VCS 2 (K)':>12}{'VCS 1 (K)':>12}{'|dT| (K)':>11}{'sum var (W)':>14}")
+    results = {}
+    for label, kwargs in runs:
+        result, elapsed = run(components, stage_details, workers=workers, **kwargs)
+        distance = max(abs(result["VCS 2"] - reference["VCS 2"]), abs(result["VCS 1"] - reference["VCS 1"]))
+        results[kwargs["method"] if kwargs["method"] != "grid" else label] = (result, distance)
+        print(f"{label:<28}{result['evaluations']:>12}{elapsed:>10.3f}{result['VCS 2']:>12.4f}{result['VCS 1']:>12.4f}"
+              f"{distance:>11.2g}{result['sum_variance']:>14.6g}")
+
+    finest_evaluations = max(grids)**2
+    passed = not problems
+    for method in ("adaptive", "minimize"):
+        result, distance = results[method]
+        if distance > 10*tol and result["sum_variance"] > reference["sum_variance"]*(1 + 1e-6):
+            print(f"FAIL : the {method} optimizer is {distance:.3g} K away from the reference optimum")
+            passed = False
+        if result["evaluations"] >= finest_evaluations:
+            print(f"FAIL : the {method} optimizer used {result['evaluations']} evaluations, the finest grid {finest_evaluations}")
+            passed = False
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the VCS temperature optimizers of the thermal model.")
+    parser.add_argument("--model", default=None, help="Thermal model JSON file. Defaults to a built-in demo model.")
+    parser.add_argument("--grids", type=int, nargs="+", default=[10, 30, 100], help="Grid resolutions to compare.")
+    parser.add_argument("--num-points", type=int, default=10, help="Points per axis of the starting grid of the adaptive and minimize optimizers.")
+    parser.add_argument("--tol", type=float, default=0.01, help="Temperature tolerance of the adaptive and minimize optimizers [K].")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes evaluating the grids.")
+    args = parser.parse_args()
+    passed = main(model=args.model, grids=args.grids, num_points=args.num_points, tol=args.tol, workers=args.workers)
+    sys.exit(0 if passed else 1)
@@ -7,6 +7,7 @@ from scipy.special import erf
 
 from fit_types import Nppoly, polylog, loglog_func, linear_fit
 from tc_utils import *
+from serialization import MATERIAL_FILE, material_path, load_material_file
 
 lib_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib")
 mat_list = [d for d in os.listdir(lib_folder) if os.path.isdir(os.path.join(lib_folder, d))]
@@ -42,13 +43,13 @@ mat_list = [d for d in os.listdir(lib_folder) if os.path.isdir(os.path.join(lib_
 
 for material in mat_list:
     print(material)
-    # open the pickle file
+    # open the material file
     material_folder = os.path.join(lib_folder, material)
-    pickle_path = os.path.join(material_folder, "material.pkl")
+    material_file = material_path(material_folder)
     if material == "Cu_OFHC":
         continue
-    if os.path.exists(pickle_path):
-        mat = pickle.load(open(pickle_path, "rb"))
+    if material_file is not None:
+        mat = load_material_file(material_file)
         # for fit in mat.fits:
         if mat.fit_type == "polylog" or mat.fit_type == "Nppoly":
             # print(f"{material} has polylog fit: {mat.name}")
@@ -62,12 +63,12 @@ for material in mat_list:
             # mat.plot_data_fit()
             # plt.show()
             try:
-                mat = mat.update_fit("loglog", None)
+                # Multi-start fit : the existing fit competes with seeded transition temperatures, no manual retries
+                mat = mat.update_fit("loglog", None, n_starts=16, seed=0, workers=None)
             except:
                 print(f"Fit update failed for {material}.")
         
-        with open(pickle_path, "wb") as f:
-            pickle.dump(mat, f)
+        mat.to_file(os.path.join(material_folder, MATERIAL_FILE))
 
             # mat.plot_data_fit()
             # plt.show()
\ No newline at end of file
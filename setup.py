@@ -85,6 +85,6 @@ setup(
 	packages=find_packages(),
 	package_data={
 		'thermal_model': ['*.json', '*.txt', '*.csv', '*.png', '*.css', '*.html', 'static/*.png', 'static/*.css'],
-		"thermal_conductivity" : ['**/*.pkl']
+		"thermal_conductivity" : ['**/*.npz']
 		},
 	include_package_data=True)	
\ No newline at end of file
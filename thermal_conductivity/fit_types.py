@@ -15,11 +15,51 @@ Some special functions have their own arguments.
 
 """
 import numpy as np
-from scipy.special import erf
+
+
+def _erf(x):
+    """
+    The error function, from scipy.special. scipy.special is only imported the first time an erf-based fit
+    (e.g. loglog or NIST-experf) is evaluated, so importing this file stays fast : the first call rebinds _erf and
+    _erfc to the scipy ufuncs, which the fit functions then call directly.
+    """
+    global _erf, _erfc
+    from scipy.special import erf as _erf, erfc as _erfc
+
+    return _erf(x)
+
+
+def _erfc(x):
+    """
+    The complementary error function 1 - erf(x), from scipy.special (imported on first use, like _erf).
+    """
+    global _erf, _erfc
+    from scipy.special import erf as _erf, erfc as _erfc
+
+    return _erfc(x)
+
+
+def __getattr__(name):
+    # fit_types.erf and fit_types.erfc are the scipy.special ufuncs. They are private names in this file so that
+    # "from fit_types import *" does not shadow scipy's erf with a wrapper.
+    if name in ("erf", "erfc"):
+        import scipy.special
+
+        return getattr(scipy.special, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_fit_type_dict = None
 
 
 def get_fit_type_dic():
-    fit_type_dict = {
+    """
+    Returns the dictionary mapping fit type names to fit functions. It is built once and shared, so don't modify it.
+    """
+    global _fit_type_dict
+    if _fit_type_dict is not None:
+        return _fit_type_dict
+    _fit_type_dict = {
         "polylog": polylog,
         "3 order polylog": polylog,
         "Nppoly": Nppoly,
@@ -38,7 +78,7 @@ def get_fit_type_dic():
         "poly1d": poly1d_fit,
     }
 
-    return fit_type_dict
+    return _fit_type_dict
 
 
 def get_func_type(key):
@@ -111,8 +151,8 @@ def loglog_func(T, *param):
     low_fit = Nppoly(T, *param[: (np.size(param) - 1) // 2])
     hi_fit = polylog(T, *param[(np.size(param) - 1) // 2 : -1])
 
-    erf_low = 0.5 * (1 - erf(erf_multiplicity * (np.log10(T / erf_param))))
-    erf_hi = 0.5 * (1 + erf(erf_multiplicity * (np.log10(T / erf_param))))
+    erf_low = 0.5 * (1 - _erf(erf_multiplicity * (np.log10(T / erf_param))))
+    erf_hi = 0.5 * (1 + _erf(erf_multiplicity * (np.log10(T / erf_param))))
 
     # print(erf_multiplicity, erf_param)
     k = hi_fit * erf_hi + low_fit * erf_low
@@ -145,9 +185,9 @@ def NIST_experf(T, a, b, c, d, e, f):
     """
 
     logT = np.log10(T)
-    k_val = (a + b * logT) * ((1 - erf(2 * (logT - c))) / (2)) + (
+    k_val = (a + b * logT) * ((1 - _erf(2 * (logT - c))) / (2)) + (
         d + e * (np.exp(-1 * logT / f))
-    ) * ((1 + erf(2 * (logT - c))) / (2))
+    ) * ((1 + _erf(2 * (logT - c))) / (2))
     k = 10**k_val
     return k
 
@@ -261,11 +301,19 @@ Case 2  'NIST formulation for OFHC Copper
 
 
 def NIST5a_3(T, *params):
+    """
+    Description : Chebyshev polynomial in ln(T) giving ln(k) (see Case 3 below).
+    The series sum_n c_n cos(n*arccos(x)) is evaluated with Clenshaw's recurrence; like the arccos form, it is NaN
+    where |x| > 1 (outside of the [params[1], params[2]] range in ln(T)).
+    """
     lnT = np.log(T)
     x = ((lnT - params[1]) - (params[2] - lnT)) / (params[2] - params[1])
-    k = 0
-    for i in range(3, 3 + int(params[0])):
-        k = k + params[i] * np.cos((i - 3) * np.arccos(x))
+    coeffs = np.asarray(params[3 : 3 + int(params[0])], dtype=float)
+    if coeffs.size == 0:
+        return np.exp(np.zeros_like(x))
+    with np.errstate(invalid="ignore"):
+        k = np.polynomial.chebyshev.chebval(x, coeffs)
+        k = np.where(np.abs(x) <= 1, k, np.nan)
     k = np.exp(k)
     return k
 
@@ -282,35 +330,32 @@ Case 3  'Tcheby polynomial in ln(T) giving ln(g), a=# parameters, b=low temp, c=
 """
 
 
-def lowTextrapolate(T, *params):
-    k = []
+def _lowTextrapolate_kernel(T, params):
+    """
+    Array kernel of lowTextrapolate. The parameters may be scalars or arrays broadcasting against T (see FitBank).
+    """
+    # k = 10**(params[0] + params[1]*log10(T) + ... + params[-2]*log10(T)**(len(params)-2)), evaluated by Horner
+    with np.errstate(all="ignore"):
+        logtemp = np.log10(T)
+        k_plus = np.zeros_like(logtemp)
+        for coeff in params[: len(params) - 1][::-1]:
+            k_plus = k_plus * logtemp + coeff
+        log_polynomial = 10**k_plus
+        power = params[3] * T ** params[2]
+    return np.where(T > params[0], log_polynomial, np.where(T > params[1], power, -1 * T))
 
+
+def lowTextrapolate(T, *params):
+    """
+    Description : Log polynomial fit with a power law extrapolation to lower temperatures (see Case 4 below).
+    Above params[0] : k = 10**(params[0] + params[1]*log10(T) + ... + params[-2]*log10(T)**(len(params)-2))
+    Above params[1] : k = params[3] * T**params[2]
+    Otherwise       : k = -T (flags temperatures below the extrapolation range)
+    A single temperature returns a float.
+    """
+    k = _lowTextrapolate_kernel(np.asarray(T, dtype=float), params)
     if np.size(T) == 1:
-        k_plus = 0
-        if T > params[0]:
-            logtemp = np.log10(T)
-            for n in range(1, len(params)):
-                k_plus += params[n - 1] * logtemp ** (n - 1)
-            k = np.append(k, 10 ** (k_plus))
-        elif T > params[1]:
-            k = np.append(k, params[3] * T ** params[2])
-        else:
-            # k = params[16] * T ** params[15]
-            k = np.append(k, -1 * T)
-        k = float(k)
-    else:
-        for i in range(len(T)):
-            k_plus = 0
-            if T[i] > params[0]:
-                logtemp = np.log10(T[i])
-                for n in range(1, len(params)):
-                    k_plus += params[n - 1] * logtemp ** (n - 1)
-                k = np.append(k, 10 ** (k_plus))
-            elif T[i] > params[1]:
-                k = np.append(k, params[3] * T[i] ** params[2])
-            else:
-                # k = params[16] * T ** params[15]
-                k = np.append(k, -1 * T[i])
+        k = float(np.ravel(k)[0])
     return k
 
 
@@ -390,8 +435,8 @@ def RRadebaugh2(T, low_param, hi_param, erf_param):
         erf_hi = 1
     else:
         erf_multiplicity = 1 / 7
-        erf_low = 0.5 * (1 - erf(erf_multiplicity * (T - erf_param)))
-        erf_hi = 0.5 * (1 + erf(erf_multiplicity * (T - erf_param)))
+        erf_low = 0.5 * (1 - _erf(erf_multiplicity * (T - erf_param)))
+        erf_hi = 0.5 * (1 + _erf(erf_multiplicity * (T - erf_param)))
 
     k = low_fit * erf_low + hi_fit * erf_hi
     return k
@@ -414,8 +459,8 @@ def RRadebaugh3(T, low_param, hi_param, erf_param):
         erf_hi = 1
     else:
         erf_multiplicity = 1 / 7
-        erf_low = 0.5 * (1 - erf(erf_multiplicity * (T - erf_param)))
-        erf_hi = 0.5 * (1 + erf(erf_multiplicity * (T - erf_param)))
+        erf_low = 0.5 * (1 - _erf(erf_multiplicity * (T - erf_param)))
+        erf_hi = 0.5 * (1 + _erf(erf_multiplicity * (T - erf_param)))
 
     k = low_fit * erf_low + hi_fit * erf_hi
     return k
@@ -695,3 +740,451 @@ Case 8 'Superconducting extension
         Conductivity = IParameters(32) * Exp(IParameters(31) * (1 - IParameters(30) / temp))
     End If  
 """
+
+
+#################################################################
+# Batched evaluation of many fits at once (fit bank)
+#################################################################
+def _horner(P, x):
+    """
+    Evaluates the polynomials in the rows of P (highest order first, as np.polyval) at x.
+    P has shape (N, m) and x shape (M,) or (N, 1) ; returns an (N, M) or (N, 1) array.
+    """
+    acc = P[:, 0:1] * np.ones_like(x)
+    for j in range(1, P.shape[1]):
+        acc *= x
+        acc += P[:, j : j + 1]
+    return acc
+
+
+def _clenshaw(C, x):
+    """
+    Evaluates the Chebyshev series in the rows of C (lowest order first, as np.polynomial.chebyshev.chebval) at x.
+    C has shape (N, m) and x shape (M,), (N, M) or (N, 1) ; returns an (N, M) or (N, 1) array.
+    """
+    b1 = np.zeros((C.shape[0], np.shape(x)[-1]))
+    b2 = np.zeros_like(b1)
+    for j in range(C.shape[1] - 1, 0, -1):
+        b1, b2 = 2 * x * b1 - b2 + C[:, j : j + 1], b1
+    return x * b1 - b2 + C[:, 0:1]
+
+
+def _bank_polylog(T, P):
+    return np.exp(np.log(10) * _horner(P, np.log10(T)))
+
+
+def _bank_Nppoly(T, P):
+    return T * _horner(P, T)
+
+
+def _bank_poly1d(T, P):
+    return _horner(P, T)
+
+
+def _bank_loglog(T, P):
+    # Same split of the parameters as loglog_func : Nppoly (low), polylog (high), erf transition temperature
+    erf_multiplicity = 15
+    n = (P.shape[1] - 1) // 2
+    logT = np.log10(T)
+    low_fit = T * _horner(P[:, :n], T)
+    hi_fit = np.exp(np.log(10) * _horner(P[:, n:-1], logT))
+    z = erf_multiplicity * np.log10(T / P[:, -1:])
+    # erf(z) is exactly +-1 in double precision for |z| >= 6, only the points near the transition need erf
+    erf_term = np.sign(z)
+    near = np.abs(z) < 6
+    erf_term[near] = _erf(z[near])
+    return hi_fit * 0.5 * (1 + erf_term) + low_fit * 0.5 * (1 - erf_term)
+
+
+def _bank_Chebyshev(T, P):
+    return np.exp(_clenshaw(P, np.log(T)))
+
+
+def _bank_NIST5a_3(T, P):
+    lnT = np.log(T)
+    x = ((lnT - P[:, 1:2]) - (P[:, 2:3] - lnT)) / (P[:, 2:3] - P[:, 1:2])
+    # Only the first params[0] coefficients are used
+    n_coeff = P[:, 0:1].astype(int)
+    C = np.where(np.arange(P.shape[1] - 3) < n_coeff, P[:, 3:], 0.0)
+    k = _clenshaw(C, x)
+    # cos(n*arccos(x)) is undefined outside of [-1, 1]
+    return np.exp(np.where(np.abs(x) <= 1, k, np.nan))
+
+
+def _bank_lowTextrapolate(T, P):
+    return _lowTextrapolate_kernel(T, [P[:, j : j + 1] for j in range(P.shape[1])])
+
+
+def _bank_broadcast(func):
+    """
+    Batched kernel for fit functions with one scalar argument per parameter, which broadcast over parameter columns.
+    """
+
+    def kernel(T, P):
+        return func(T, *[P[:, j : j + 1] for j in range(P.shape[1])]) * np.ones((P.shape[0], 1))
+
+    return kernel
+
+
+def _bank_loop(func):
+    """
+    Fallback batched kernel, evaluating the fits one at a time. Fits that fail to evaluate give NaN.
+    """
+
+    def _row(T, params):
+        try:
+            return np.broadcast_to(func(T, *params), np.shape(T))
+        except Exception:
+            return np.full(np.shape(T), np.nan)
+
+    def kernel(T, P):
+        if np.ndim(T) < 2:
+            return np.vstack([_row(T, params) for params in P])
+        # One temperature per row of P : evaluate each run of consecutive rows with the same parameters in one call
+        same = (P[1:] == P[:-1]) | (np.isnan(P[1:]) & np.isnan(P[:-1]))
+        starts = np.concatenate(([0], np.nonzero(~same.all(axis=1))[0] + 1, [len(P)]))
+        k = np.empty(np.shape(T))
+        for start, stop in zip(starts[:-1], starts[1:]):
+            k[start:stop, 0] = _row(T[start:stop, 0], P[start])
+        return k
+
+    return kernel
+
+
+_bank_kernels = None
+
+
+def get_bank_kernel(fit_type):
+    """
+    Returns the batched kernel of a fit type : kernel(T, P) evaluates the fits whose parameters are the rows of
+    the (N, m) matrix P at the (M,) temperatures T, and returns an (N, M) array. T may also be an (N, 1) column
+    of one temperature per row of P, which returns an (N, 1) array.
+    """
+    global _bank_kernels
+    if _bank_kernels is None:
+        _bank_kernels = {
+            polylog: _bank_polylog,
+            Nppoly: _bank_Nppoly,
+            poly1d_fit: _bank_poly1d,
+            loglog_func: _bank_loglog,
+            Chebyshev: _bank_Chebyshev,
+            NIST5a_3: _bank_NIST5a_3,
+            lowTextrapolate: _bank_lowTextrapolate,
+            power_law: _bank_broadcast(power_law),
+            NIST_experf: _bank_broadcast(NIST_experf),
+            Superconducting: _bank_broadcast(Superconducting),
+        }
+    func = get_func_type(fit_type)
+    return _bank_kernels.get(func) or _bank_loop(func)
+
+
+class FitBank:
+    """
+    A set of fits stacked by fit type for batched evaluation.
+
+    Fits sharing a fit type and a number of parameters are stored as the rows of one contiguous parameter matrix,
+    so that evaluating every fit of the bank at M temperatures costs one vectorized call per group.
+
+    Attributes:
+        names (list): Names of the fits, in the order of the rows of the evaluated arrays.
+        fit_types (list): Fit type of each fit.
+        ranges (np.ndarray): (N, 2) array of the valid temperature range of each fit.
+        groups (dict): {(fit_type, number of parameters): (row indices, parameter matrix)}.
+    """
+
+    def __init__(self, fits: list):
+        """
+        Args:
+            fits (list): Fit objects, or dictionaries with name, fit_type, range and parameters entries
+                (e.g. from LibraryIndex.fits).
+        """
+
+        def _get(fit, key):
+            return fit[key] if isinstance(fit, dict) else getattr(fit, key)
+
+        self.names = [str(_get(fit, "name")) for fit in fits]
+        self.fit_types = [str(_get(fit, "fit_type")) for fit in fits]
+        self.ranges = np.array([[float(r) for r in _get(fit, "range")] for fit in fits]).reshape(-1, 2)
+        rows = {}
+        params = [np.asarray(_get(fit, "parameters"), dtype=float).ravel() for fit in fits]
+        for i, (fit_type, p) in enumerate(zip(self.fit_types, params)):
+            rows.setdefault((fit_type, p.size), []).append(i)
+        self.groups = {
+            key: (np.array(idx), np.vstack([params[i] for i in idx]).reshape(len(idx), key[1]))
+            for key, idx in rows.items()
+        }
+
+    def evaluate(self, T, extrapolate: bool = False) -> tuple:
+        """
+        Evaluates every fit of the bank at every temperature.
+        By default, each fit is only evaluated at the temperatures within its range : the in-range temperatures of
+        the fits of a group are gathered into one column, evaluated in one vectorized call and scattered back.
+        Args:
+            T (float or array-like): Temperature(s) [K].
+            extrapolate (bool, optional): Whether to also evaluate the fits outside of their range. Defaults to False.
+        Returns:
+            k (np.ndarray): (N, M) array of thermal conductivities, one row per fit (see FitBank.names). NaN where
+                T is out of range, unless extrapolate is True.
+            out_of_range (np.ndarray): (N, M) boolean array, True where T is outside of the range of the fit.
+        """
+        T = np.atleast_1d(np.asarray(T, dtype=float)).ravel()
+        out_of_range = (T < self.ranges[:, 0:1]) | (T > self.ranges[:, 1:2])
+        if extrapolate:
+            k = np.empty((len(self.names), T.size))
+            with np.errstate(all="ignore"):
+                for (fit_type, n_param), (idx, P) in self.groups.items():
+                    k[idx] = get_bank_kernel(fit_type)(T, P)
+            return k, out_of_range
+
+        # In sorted temperatures, the in-range points of each fit are the slice start[i]:stop[i]
+        order = np.argsort(T, kind="stable") if np.any(T[1:] < T[:-1]) else None
+        T_sorted = T if order is None else T[order]
+        start = np.searchsorted(T_sorted, self.ranges[:, 0], side="left")
+        stop = np.maximum(np.searchsorted(T_sorted, self.ranges[:, 1], side="right"), start)
+        k = np.full((len(self.names), T.size), np.nan)
+        with np.errstate(all="ignore"):
+            for (fit_type, n_param), (idx, P) in self.groups.items():
+                counts = stop[idx] - start[idx]
+                if not counts.any():
+                    continue
+                T_in = np.concatenate([T_sorted[start[i] : stop[i]] for i in idx])[:, None]
+                # One row of parameters per temperature, column-major so that the kernels read contiguous columns
+                P_in = np.repeat(P.T, counts, axis=1).T
+                k_in = get_bank_kernel(fit_type)(T_in, P_in)[:, 0]
+                offset = 0
+                for i, count in zip(idx, counts):
+                    k[i, start[i] : stop[i]] = k_in[offset : offset + count]
+                    offset += count
+        if order is not None:
+            k[:, order] = k.copy()
+        return k, out_of_range
+
+    def index(self, name: str) -> int:
+        """
+        Returns the row of the named fit in the evaluated arrays.
+        """
+        return self.names.index(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __repr__(self):
+        return f"FitBank({len(self)} fits in {len(self.groups)} groups)"
+
+
+#################################################################
+# Integration of the fit functions
+#################################################################
+def _antiderivative_Nppoly(T, *param):
+    # k = T * (p[0]*T**(m-1) + ... + p[m-1]) integrates term by term to T**2 * sum p[i] * T**(m-1-i) / (m+1-i)
+    powers = np.arange(len(param) + 1, 1, -1)
+    return T**2 * np.polyval(np.asarray(param, dtype=float) / powers, T)
+
+
+def _antiderivative_poly1d(T, *param):
+    return np.polyval(np.polyint(np.asarray(param, dtype=float)), T)
+
+
+def _antiderivative_power_law(T, A, B):
+    if B == -1:
+        return A * np.log(T)
+    return A * T ** (B + 1) / (B + 1)
+
+
+def _antiderivative_polylog(T, *param):
+    # Only defined for polylog fits of order <= 1, which are power laws : 10**(b*log10(T) + a) = 10**a * T**b
+    if len(param) == 1:
+        return 10 ** param[0] * T
+    return _antiderivative_power_law(T, 10 ** param[1], param[0])
+
+
+def _antiderivative_loglog_low(T, *param):
+    # The Nppoly (T*polynomial) half of loglog_func, weighted by 0.5*(1 - erf(a*u)) with u = ln(T/Tc) and
+    # a = 15/ln(10). With b = n+1, each term integrates in closed form (integration by parts in u) :
+    # int T**n * erf(a*u) dT = (T**b * erf(a*u) - Tc**b * exp(b**2/(4a**2)) * erf(a*u - b/(2a))) / b
+    erf_multiplicity = 15
+    n_low = (np.size(param) - 1) // 2
+    low_param, erf_param = np.asarray(param[:n_low], dtype=float), param[-1]
+    a = erf_multiplicity / np.log(10)
+    u = np.log(np.asarray(T, dtype=float) / erf_param)
+    total = 0.0
+    for p, b in zip(low_param, np.arange(n_low, 0, -1) + 1.0):
+        total = total + 0.5 * p / b * (
+            np.asarray(T, dtype=float) ** b * _erfc(a * u) + erf_param**b * np.exp(b**2 / (4 * a**2)) * _erf(a * u - b / (2 * a))
+        )
+    return total
+
+
+def _loglog_high(T, *param):
+    # The polylog half of loglog_func, which has no closed-form integral
+    erf_multiplicity = 15
+    n_low = (np.size(param) - 1) // 2
+    hi_param, erf_param = param[n_low:-1], param[-1]
+    return polylog(T, *hi_param) * 0.5 * (1 + _erf(erf_multiplicity * np.log10(T / erf_param)))
+
+
+_antiderivatives = None
+_partial_antiderivatives = None
+
+
+def get_partial_antiderivative(fit_type):
+    """
+    Returns (F, remainder) for fit types that are the sum of a part with a closed-form antiderivative F(T, *params)
+    and a remainder(T, *params) to integrate numerically, or None. loglog splits into its Nppoly (T*polynomial) half
+    and its polylog half.
+    """
+    global _partial_antiderivatives
+    if _partial_antiderivatives is None:
+        _partial_antiderivatives = {loglog_func: (_antiderivative_loglog_low, _loglog_high)}
+    return _partial_antiderivatives.get(get_func_type(fit_type))
+
+
+def get_antiderivative(fit_type, n_param: int = None):
+    """
+    Returns a closed-form antiderivative F(T, *params) of a fit type, such that the integral of the fit from T1 to
+    T2 is F(T2, *params) - F(T1, *params), or None if the fit type (with n_param parameters) doesn't have one.
+    """
+    global _antiderivatives
+    if _antiderivatives is None:
+        _antiderivatives = {
+            Nppoly: _antiderivative_Nppoly,
+            poly1d_fit: _antiderivative_poly1d,
+            power_law: _antiderivative_power_law,
+            polylog: _antiderivative_polylog,
+        }
+    func = get_func_type(fit_type)
+    if func is polylog and (n_param is None or n_param > 2):
+        return None
+    return _antiderivatives.get(func)
+
+
+#################################################################
+# Jacobians of the fit functions
+#################################################################
+def _jacobian_polylog(T, *param):
+    # dk/dp_i = k * ln(10) * log10(T)**(m-1-i)
+    return polylog(T, *param)[:, None] * np.log(10) * np.vander(np.log10(T), len(param))
+
+
+def _jacobian_Nppoly(T, *param):
+    # dk/dp_i = T**(m-i)
+    return T[:, None] * np.vander(T, len(param))
+
+
+def _jacobian_Chebyshev(T, *param):
+    # dk/dp_i = k * T_i(ln(T)), the i-th Chebyshev polynomial
+    return Chebyshev(T, *param)[:, None] * np.polynomial.chebyshev.chebvander(np.log(T), len(param) - 1)
+
+
+def _jacobian_power_law(T, A, B):
+    TB = T**B
+    return np.column_stack([TB, A * TB * np.log(T)])
+
+
+def _jacobian_Superconducting(T, alpha, beta, gamma, delta):
+    Tb = T**beta
+    exp_term = np.exp(delta / T)
+    return np.column_stack([Tb, alpha * Tb * np.log(T), T * exp_term, gamma * exp_term])
+
+
+def _jacobian_NIST_experf(T, a, b, c, d, e, f):
+    logT = np.log10(T)
+    erf_term = _erf(2 * (logT - c))
+    low, high = (1 - erf_term) / 2, (1 + erf_term) / 2
+    exp_term = np.exp(-1 * logT / f)
+    # d(erf_term)/dc
+    d_erf = -4 / np.sqrt(np.pi) * np.exp(-4 * (logT - c) ** 2)
+    d_log10k = np.column_stack(
+        [
+            low,
+            logT * low,
+            ((d + e * exp_term) - (a + b * logT)) * d_erf / 2,
+            high,
+            exp_term * high,
+            e * exp_term * logT / f**2 * high,
+        ]
+    )
+    return NIST_experf(T, a, b, c, d, e, f)[:, None] * np.log(10) * d_log10k
+
+
+def _jacobian_loglog(T, *param):
+    # Same split of the parameters as loglog_func : Nppoly (low), polylog (high), erf transition temperature
+    erf_multiplicity = 15
+    n_low = (np.size(param) - 1) // 2
+    low_param, hi_param, erf_param = param[:n_low], param[n_low:-1], param[-1]
+    z = erf_multiplicity * np.log10(T / erf_param)
+    erf_low = 0.5 * (1 - _erf(z))
+    erf_hi = 0.5 * (1 + _erf(z))
+    d_erf = -erf_multiplicity / (erf_param * np.log(10)) * 2 / np.sqrt(np.pi) * np.exp(-(z**2))
+    low_fit, hi_fit = Nppoly(T, *low_param), polylog(T, *hi_param)
+    return np.column_stack(
+        [
+            _jacobian_Nppoly(T, *low_param) * erf_low[:, None],
+            _jacobian_polylog(T, *hi_param) * erf_hi[:, None],
+            (hi_fit - low_fit) * d_erf / 2,
+        ]
+    )
+
+
+_jacobians = None
+
+
+def get_jacobian(fit_type):
+    """
+    Returns J(T, *params), the (len(T), n_params) array of the derivatives of a fit type with respect to its
+    parameters at the temperatures in the 1D array T, or None if the fit type doesn't have an analytic Jacobian.
+    """
+    global _jacobians
+    if _jacobians is None:
+        _jacobians = {
+            polylog: _jacobian_polylog,
+            Nppoly: _jacobian_Nppoly,
+            Chebyshev: _jacobian_Chebyshev,
+            power_law: _jacobian_power_law,
+            Superconducting: _jacobian_Superconducting,
+            NIST_experf: _jacobian_NIST_experf,
+            loglog_func: _jacobian_loglog,
+        }
+    return _jacobians.get(get_func_type(fit_type))
+
+
+def gauss_legendre_log_integral(func, params, T1, T2, rtol: float = 1e-8, order: int = 8, max_panels: int = 1024):
+    """
+    Description : Integrates k(T) = func(T, *params) from T1 to T2 with a composite Gauss-Legendre rule in ln(T)
+    (int k dT = int k(e^u) e^u du), vectorized over arrays of (T1, T2) pairs. The number of panels is doubled until
+    two consecutive refinements both agree with the previous estimate to rtol for every pair (or max_panels is
+    reached), so that a single coincidental agreement doesn't end the refinement.
+    Args:
+        func (function): Fit function.
+        params (array-like): Fit parameters.
+        T1 (float or array-like): Lower temperature(s) [K].
+        T2 (float or array-like): Upper temperature(s) [K].
+        rtol (float, optional): Requested relative tolerance. Defaults to 1e-8.
+        order (int, optional): Number of Gauss-Legendre nodes per panel. Defaults to 8.
+        max_panels (int, optional): Maximum number of panels. Defaults to 1024.
+    Returns:
+        integral (np.ndarray): Integral(s) from T1 to T2.
+        error (np.ndarray): Estimated absolute error(s), the larger of the last two differences between successive
+            estimates.
+    """
+    T1, T2 = np.broadcast_arrays(np.asarray(T1, dtype=float), np.asarray(T2, dtype=float))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        a, b = np.log(T1)[..., None], np.log(T2)[..., None]
+    x, w = np.polynomial.legendre.leggauss(order)
+    previous, previous_change = None, None
+    panels = 1
+    while True:
+        edges = a + (b - a) * np.linspace(0, 1, panels + 1)
+        mid, half = 0.5 * (edges[..., 1:] + edges[..., :-1]), 0.5 * np.diff(edges, axis=-1)
+        T = np.exp(mid[..., None] + half[..., None] * x)
+        with np.errstate(all="ignore"):
+            integral = ((func(T, *params) * T) @ w * half).sum(axis=-1)
+        if previous is not None:
+            change = np.abs(integral - previous)
+            error = change if previous_change is None else np.maximum(change, previous_change)
+            converged = (error <= rtol * np.abs(integral)) | ~np.isfinite(integral)
+            if (previous_change is not None and np.all(converged)) or panels >= max_panels:
+                return integral, error
+            previous_change = change
+        previous = integral
+        panels *= 2
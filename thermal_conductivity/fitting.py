@@ -0,0 +1,654 @@
+"""
+This file contains the solvers used to fit the fit types of fit_types.py to thermal conductivity data.
+
+Material.fit_data cleans the data of a material and passes the temperature and conductivity arrays to
+fit_arrays, which fits them in log space (so that low temperatures are valued as much as high ones) and
+returns the parameters and their covariance in the same form as scipy.optimize.curve_fit.
+
+Fit types that are linear in their parameters are solved directly as a (weighted) linear least-squares
+problem instead of with an iterative nonlinear fit:
+    - polylog : ln(k) = ln(10) * polynomial(log10(T)), which is exactly the log space residual.
+    - Nppoly  : k/T = polynomial(T), weighted by T/k so that the residuals are relative errors, which equal
+                the log space residuals to first order. The log space residual is then minimized exactly by a
+                few Gauss-Newton steps, each of which is the same linear solve reweighted by the current fit.
+    - Chebyshev : ln(k) = Chebyshev series(ln(T)), which is exactly the log space residual.
+Bounds (default (0, inf), as for the nonlinear fits) are kept with a bounded linear solver when the
+unconstrained solution is outside of them.
+
+Every other fit type (and any fit with a robust loss) is fit with scipy.optimize.least_squares, using the
+analytic Jacobian registered for the fit type in fit_types.py (get_jacobian) when there is one, and finite
+differences otherwise. The covariance of the parameters is computed from the Jacobian at the solution, as
+curve_fit does.
+
+loglog fits can also be fit from many starting points (fit_multistart) : the erf transition temperature is
+seeded from a grid over the data range, the low (Nppoly) and high (polylog) temperature halves from linear fits
+to the data on either side of it, and the best of the fits (run in parallel worker processes) is kept.
+
+scipy is only imported the first time a fit needs it.
+"""
+
+import os
+import sys
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+if this_dir not in sys.path:
+    sys.path.append(this_dir)
+
+from fit_types import get_func_type, get_fit_type_dic, get_jacobian
+from fit_types import polylog, Nppoly, Chebyshev, loglog_func, power_law, Superconducting, NIST_experf
+
+DEFAULT_BOUNDS = (0, np.inf)
+MAX_NFEV = 10000
+
+
+def is_linear_fit_type(fit_type: str) -> bool:
+    """
+    Returns True if the fit type is linear in its parameters and is fit with a linear least-squares solve.
+    """
+    return get_func_type(fit_type) in (polylog, Nppoly, Chebyshev)
+
+
+def linear_system(fit_type: str, T, k, n_param: int) -> tuple:
+    """
+    Description : Builds the linear least-squares system of a linear fit type, whose residuals are A @ p - b.
+    Args:
+        fit_type (str): Fit type (see is_linear_fit_type).
+        T (np.ndarray): Temperatures [K].
+        k (np.ndarray): Thermal conductivities.
+        n_param (int): Number of parameters (polynomial order + 1), highest order first as np.polyval
+            (lowest order first for Chebyshev, as np.polynomial.chebyshev.chebval).
+    Returns:
+        A, b (np.ndarray, np.ndarray): The (len(T), n_param) design matrix and the (len(T),) target.
+    """
+    T = np.asarray(T, dtype=float)
+    k = np.asarray(k, dtype=float)
+    func = get_func_type(fit_type)
+    if func is polylog:
+        return np.log(10) * np.vander(np.log10(T), n_param), np.log(k)
+    if func is Nppoly:
+        # (k/T - polynomial(T)) * T/k is the relative error, and the weighted target (k/T) * (T/k) is 1
+        return np.vander(T, n_param) * (T / k)[:, None], np.ones_like(T)
+    if func is Chebyshev:
+        return np.polynomial.chebyshev.chebvander(np.log(T), n_param - 1), np.log(k)
+    raise ValueError(f"{fit_type} is not a linear fit type.")
+
+
+def _bounds_arrays(bounds, n_param: int) -> tuple:
+    lower, upper = DEFAULT_BOUNDS if bounds is None else bounds
+    lower = np.broadcast_to(np.asarray(lower, dtype=float), (n_param,))
+    upper = np.broadcast_to(np.asarray(upper, dtype=float), (n_param,))
+    return lower, upper
+
+
+def solve_linear(A, b, bounds=None) -> np.ndarray:
+    """
+    Description : Solves the least-squares problem min ||A @ p - b|| within bounds.
+                : The columns of A are scaled to unit norm first (polynomials in T span many orders of magnitude).
+                : The unconstrained solution comes from np.linalg.lstsq; if it is outside of the bounds, the
+                : bounded problem is solved with scipy.optimize.lsq_linear. Both give the global minimum.
+    Args:
+        A (np.ndarray): (n, m) design matrix.
+        b (np.ndarray): (n,) target.
+        bounds (tuple, optional): (lower, upper) bounds, scalars or length m arrays, as curve_fit. Defaults to (0, inf).
+    Returns:
+        p (np.ndarray): The m parameters.
+    """
+    lower, upper = _bounds_arrays(bounds, A.shape[1])
+    scale = np.linalg.norm(A, axis=0)
+    scale[scale == 0] = 1.0
+    A_scaled = A / scale
+    x = np.linalg.lstsq(A_scaled, b, rcond=None)[0]
+    p = x / scale
+    if np.any(p < lower) or np.any(p > upper):
+        from scipy.optimize import lsq_linear
+
+        x = lsq_linear(A_scaled, b, bounds=(lower * scale, upper * scale), method="bvls").x
+        p = np.clip(x / scale, lower, upper)
+    return p
+
+
+def fit_covariance(J, chi2: float) -> np.ndarray:
+    """
+    Description : Covariance of the parameters of a least-squares solution, computed as curve_fit does
+                : (absolute_sigma=False) : the pseudo-inverse of J^T J scaled by the residual variance.
+    Args:
+        J (np.ndarray): (n, m) Jacobian of the residuals at the solution.
+        chi2 (float): Sum of the squared residuals (twice the cost of least_squares for robust losses).
+    Returns:
+        pcov (np.ndarray): (m, m) covariance matrix, filled with inf if there are no more points than parameters.
+    """
+    n, m = J.shape
+    _, s, VT = np.linalg.svd(J, full_matrices=False)
+    threshold = np.finfo(float).eps * max(J.shape) * s[0]
+    keep = s > threshold
+    pcov = np.dot(VT[keep].T / s[keep] ** 2, VT[keep])
+    if n > m:
+        pcov = pcov * chi2 / (n - m)
+    else:
+        pcov.fill(np.inf)
+    return pcov
+
+
+def _refine_Nppoly(T, k, p, bounds, max_iter: int = 50, ftol: float = 1e-12) -> tuple:
+    """
+    Description : Minimizes the log space residual ln(k) - ln(Nppoly(T, *p)) with Gauss-Newton steps from p.
+                : Linearizing ln(polynomial(T)) around p0 gives the linear system A = V / polynomial_0(T),
+                : b = ln(k/T) - ln(polynomial_0(T)) + 1 (V the Vandermonde matrix of T), solved with solve_linear.
+                : Steps that increase the residual are halved, and steps between feasible points stay feasible.
+    Returns:
+        p, A, b (np.ndarray): The parameters and the linear system of the last step, whose residuals are the log
+            space residuals.
+        n_solves (int): The number of linear solves.
+    """
+    V = np.vander(T, p.size)
+    log_k_T = np.log(k / T)
+
+    def cost(p):
+        poly = V @ p
+        if np.any(poly <= 0):
+            return np.inf
+        r = log_k_T - np.log(poly)
+        return r @ r
+
+    current = cost(p)
+    A, b = linear_system("Nppoly", T, k, p.size)
+    if not np.isfinite(current):
+        # The relative error fit is not positive at every data point, so there is no log space residual to refine
+        return p, A, b, 0
+    n_solves = 0
+    for _ in range(max_iter):
+        poly = V @ p
+        A = V / poly[:, None]
+        b = log_k_T - np.log(poly) + 1
+        step = solve_linear(A, b, bounds) - p
+        n_solves += 1
+        for _ in range(30):
+            new = cost(p + step)
+            if new <= current:
+                break
+            step = step / 2
+        else:
+            break
+        p = p + step
+        converged = current - new <= ftol * current
+        current = new
+        if converged:
+            break
+    poly = V @ p
+    return p, V / poly[:, None], log_k_T - np.log(poly) + 1, n_solves
+
+
+def fit_linear(fit_type: str, T, k, n_param: int, bounds=None) -> tuple:
+    """
+    Description : Fits a linear fit type (see is_linear_fit_type) with linear least-squares solves.
+    Returns:
+        popt, pcov (np.ndarray, np.ndarray): Parameters and their covariance, as curve_fit.
+        info (dict): nfev (number of linear solves) and cost (half the sum of the squared log space residuals).
+    """
+    T = np.asarray(T, dtype=float)
+    k = np.asarray(k, dtype=float)
+    A, b = linear_system(fit_type, T, k, n_param)
+    popt = solve_linear(A, b, bounds)
+    n_solves = 1
+    if get_func_type(fit_type) is Nppoly:
+        popt, A, b, n_refine = _refine_Nppoly(T, k, popt, bounds)
+        n_solves += n_refine
+    residuals = A @ popt - b
+    chi2 = residuals @ residuals
+    return popt, fit_covariance(A, chi2), {"method": "linear", "nfev": n_solves, "njev": 0, "cost": chi2 / 2}
+
+
+def fit_nonlinear(
+    fit_type: str, T, k, p0, bounds=None, loss: str = "linear", f_scale: float = 0.1, jac=None, max_nfev: int = MAX_NFEV
+) -> tuple:
+    """
+    Description : Fits a fit type in log space with scipy.optimize.least_squares (trust region reflective, as
+                : curve_fit with bounds), minimizing sum(loss((ln(fit(T)) - ln(k))**2)).
+    Args:
+        fit_type (str): Fit type.
+        T (np.ndarray): Temperatures [K].
+        k (np.ndarray): Thermal conductivities.
+        p0 (array-like): Initial guess, moved inside of the bounds if needed.
+        bounds (tuple, optional): (lower, upper) bounds, as curve_fit. Defaults to (0, inf).
+        loss (str, optional): least_squares loss ("linear", "soft_l1", "huber", "cauchy" or "arctan"). Defaults to "linear".
+        f_scale (float, optional): Residual at which a robust loss starts to down-weight points, in ln(k)
+            (0.1 is about a 10% deviation). Defaults to 0.1.
+        jac (str, optional): least_squares finite difference scheme ("2-point", "3-point") to use instead of the
+            analytic Jacobian. Defaults to None (the analytic Jacobian of the fit type, or "2-point" if it has none).
+        max_nfev (int, optional): Maximum number of function evaluations. Defaults to MAX_NFEV.
+    Returns:
+        popt, pcov (np.ndarray, np.ndarray): Parameters and their covariance, as curve_fit.
+        info (dict): nfev, njev, cost and message of the least_squares run.
+    """
+    from scipy.optimize import least_squares
+
+    T = np.asarray(T, dtype=float)
+    log_k = np.log(np.asarray(k, dtype=float))
+    func = get_func_type(fit_type)
+    jacobian = get_jacobian(fit_type) if jac is None else None
+
+    def residuals(p):
+        return np.log(func(T, *p)) - log_k
+
+    def log_jacobian(p):
+        return jacobian(T, *p) / func(T, *p)[:, None]
+
+    lower, upper = _bounds_arrays(bounds, np.size(p0))
+    res = least_squares(
+        residuals,
+        np.clip(np.asarray(p0, dtype=float), lower, upper),
+        jac=log_jacobian if jacobian is not None else (jac or "2-point"),
+        bounds=(lower, upper),
+        method="trf",
+        loss=loss,
+        f_scale=f_scale,
+        max_nfev=max_nfev,
+    )
+    if not res.success:
+        raise RuntimeError("Optimal parameters not found: " + res.message)
+    info = {"method": "least_squares", "nfev": res.nfev, "njev": res.njev, "cost": res.cost, "message": res.message}
+    return res.x, fit_covariance(res.jac, 2 * res.cost), info
+
+
+def fit_arrays(
+    fit_type: str,
+    T,
+    k,
+    n_param: int = None,
+    p0=None,
+    bounds=None,
+    loss: str = "linear",
+    f_scale: float = 0.1,
+    jac=None,
+    full_output: bool = False,
+) -> tuple:
+    """
+    Description : Fits a fit type to thermal conductivity data in log space.
+    Args:
+        fit_type (str): Fit type (see fit_types.get_fit_type_dic).
+        T (np.ndarray): Temperatures [K] (positive).
+        k (np.ndarray): Thermal conductivities (positive).
+        n_param (int, optional): Number of parameters. Defaults to the length of p0.
+        p0 (array-like, optional): Initial guess of the nonlinear fits. Defaults to ones (linear fit types start
+            from their linear solution).
+        bounds (tuple, optional): (lower, upper) bounds of the parameters, as curve_fit. Defaults to (0, inf).
+        loss (str, optional): Robust loss (see fit_nonlinear). Defaults to "linear" (least squares).
+        f_scale (float, optional): Scale of the robust loss in ln(k) (see fit_nonlinear). Defaults to 0.1.
+        jac (str, optional): Finite difference scheme to use instead of the analytic Jacobian (see fit_nonlinear).
+        full_output (bool, optional): Also return the info dictionary of the solver. Defaults to False.
+    Returns:
+        popt (np.ndarray): Optimal values for the fit parameters.
+        pcov (np.ndarray): Covariance matrix of the fit parameters.
+        info (dict): Only with full_output, method, nfev, njev and cost (half the sum of the squared residuals).
+    """
+    if n_param is None and p0 is not None:
+        n_param = len(p0)
+    if n_param is None:
+        raise ValueError(f"The number of parameters of the {fit_type} fit must be given.")
+    if is_linear_fit_type(fit_type):
+        popt, pcov, info = fit_linear(fit_type, T, k, n_param, bounds)
+        if loss != "linear":
+            # Robust losses aren't linear, start the nonlinear fit from the least-squares solution
+            popt, pcov, info = fit_nonlinear(fit_type, T, k, popt, bounds, loss, f_scale, jac)
+    else:
+        p0 = np.ones(n_param) if p0 is None else p0
+        popt, pcov, info = fit_nonlinear(fit_type, T, k, p0, bounds, loss, f_scale, jac)
+    if full_output:
+        return popt, pcov, info
+    return popt, pcov
+
+
+def loglog_default_start(T) -> tuple:
+    """
+    Description : The default start of loglog fits to data at temperatures T : an example starting point with the
+                : transition at the middle of the data range, unbounded coefficients and the transition temperature
+                : bounded by the data range.
+    Returns:
+        n_param, p0, bounds (int, list, tuple): 9 parameters, the starting point and the bounds.
+    """
+    p0 = [
+        1.13377143e-07,
+        -2.98684987e-05,
+        1.90655344e-03,
+        8.47382032e-02,
+        9.98573679e-03,
+        2.45862017e-02,
+        1.00316703e-01,
+        6.12147734e-01,
+        np.mean([min(T), max(T)]),
+    ]  # This is just an example starting point for the fit
+    bounds = ([-np.inf] * 8 + [min(T)], [np.inf] * 8 + [max(T)])
+    return 9, p0, bounds
+
+
+def information_criteria(chi2: float, n: int, n_param: int) -> tuple:
+    """
+    Description : Akaike and Bayesian information criteria of a least-squares fit with Gaussian residuals.
+    Args:
+        chi2 (float): Sum of the squared residuals.
+        n (int): Number of data points.
+        n_param (int): Number of fit parameters.
+    Returns:
+        aic, bic (float, float): n*ln(chi2/n) + 2*n_param and n*ln(chi2/n) + n_param*ln(n).
+    """
+    log_likelihood_term = n * np.log(chi2 / n)
+    return log_likelihood_term + 2 * n_param, log_likelihood_term + n_param * np.log(n)
+
+
+def supports_multistart(fit_type: str) -> bool:
+    """
+    Returns True if the fit type can be seeded by loglog_starts (see fit_multistart).
+    """
+    return get_func_type(fit_type) is loglog_func
+
+
+def _half_fit(fit_type: str, T, k, mask, n_param: int, low: bool) -> np.ndarray:
+    # Linear fit to the data selected by mask, or to the n_param + 1 lowest (highest) temperatures if there are too few
+    if np.count_nonzero(mask) <= n_param:
+        order = np.argsort(T)
+        mask = order[: n_param + 1] if low else order[-(n_param + 1) :]
+    return fit_linear(fit_type, T[mask], k[mask], n_param, bounds=(-np.inf, np.inf))[0]
+
+
+def loglog_starts(T, k, n_param: int = 9, n_starts: int = 8, seed: int = None) -> list:
+    """
+    Description : Starting points of loglog fits with transition temperatures spread over the data range.
+                : The range is split into n_starts log-spaced cells with one transition temperature each (the cell
+                : center, or a log-uniform draw within the cell with a seed). The low temperature half (Nppoly) is
+                : a linear fit to the data below the transition, the high temperature half (polylog) to the data above.
+    Args:
+        T (np.ndarray): Temperatures [K].
+        k (np.ndarray): Thermal conductivities.
+        n_param (int, optional): Number of loglog parameters. Defaults to 9.
+        n_starts (int, optional): Number of starting points. Defaults to 8.
+        seed (int, optional): Seed of the transition temperature draws. Defaults to None (cell centers).
+    Returns:
+        starts (list): n_starts parameter arrays.
+    """
+    T = np.asarray(T, dtype=float)
+    k = np.asarray(k, dtype=float)
+    n_low = (n_param - 1) // 2
+    n_high = n_param - 1 - n_low
+    log_edges = np.linspace(np.log(T.min()), np.log(T.max()), n_starts + 1)
+    if seed is None:
+        log_Tc = 0.5 * (log_edges[:-1] + log_edges[1:])
+    else:
+        log_Tc = np.random.default_rng(seed).uniform(log_edges[:-1], log_edges[1:])
+    starts = []
+    for Tc in np.exp(log_Tc):
+        low = _half_fit("Nppoly", T, k, T <= Tc, n_low, low=True)
+        high = _half_fit("polylog", T, k, T >= Tc, n_high, low=False)
+        starts.append(np.concatenate([low, high, [Tc]]))
+    return starts
+
+
+def _fit_start(task: tuple):
+    # One start of fit_multistart, run in a worker process. Failed starts return None.
+    fit_type, T, k, p0, bounds, loss, f_scale, max_nfev = task
+    try:
+        with np.errstate(all="ignore"):
+            return fit_nonlinear(fit_type, T, k, p0, bounds, loss, f_scale, max_nfev=max_nfev)
+    except (RuntimeError, ValueError, np.linalg.LinAlgError):
+        return None
+
+
+def fit_multistart(
+    fit_type: str,
+    T,
+    k,
+    n_param: int = 9,
+    extra_starts: list = (),
+    bounds=None,
+    n_starts: int = 8,
+    seed: int = None,
+    workers: int = 1,
+    loss: str = "linear",
+    f_scale: float = 0.1,
+    max_nfev: int = 2000,
+    full_output: bool = False,
+) -> tuple:
+    """
+    Description : Fits a loglog fit type from the extra starting points and n_starts seeded ones (see loglog_starts),
+                : and keeps the fit with the lowest cost. All starts have the same number of parameters, so this is
+                : also the fit with the lowest AIC/BIC. Ties go to the earliest start (extra starts first), so the
+                : result only depends on the data, the starts and seed, not on the number of workers. Starts that
+                : don't converge within max_nfev function evaluations are dropped.
+    Args:
+        fit_type (str): Fit type (see supports_multistart).
+        T (np.ndarray): Temperatures [K].
+        k (np.ndarray): Thermal conductivities.
+        n_param (int, optional): Number of parameters. Defaults to 9.
+        extra_starts (list, optional): Further starting points, e.g. the existing fit and the default guess. Defaults to ().
+        bounds (tuple, optional): (lower, upper) bounds, as curve_fit. Defaults to (0, inf).
+        n_starts (int, optional): Number of seeded starting points. Defaults to 8.
+        seed (int, optional): Seed of the transition temperatures (see loglog_starts). Defaults to None.
+        workers (int, optional): Number of worker processes, None for one per CPU. Defaults to 1 (no pool).
+        loss (str, optional): Robust loss (see fit_nonlinear). Defaults to "linear".
+        f_scale (float, optional): Scale of the robust loss in ln(k). Defaults to 0.1.
+        max_nfev (int, optional): Maximum number of function evaluations of each start. Defaults to 2000.
+        full_output (bool, optional): Also return the info dictionary. Defaults to False.
+    Returns:
+        popt (np.ndarray): Optimal values for the fit parameters.
+        pcov (np.ndarray): Covariance matrix of the fit parameters.
+        info (dict): Only with full_output, the info of the best fit (see fit_nonlinear) with its aic and bic,
+            plus starts (number of starts), failed (number of failed starts), best_start (its index, extra starts
+            first), costs (cost of every start, inf if it failed) and nfev/njev summed over all starts.
+    """
+    if not supports_multistart(fit_type):
+        raise ValueError(f"Multi-start fitting is not available for {fit_type} fits.")
+    T = np.asarray(T, dtype=float)
+    k = np.asarray(k, dtype=float)
+    starts = [np.asarray(start, dtype=float) for start in extra_starts if start is not None]
+    starts += loglog_starts(T, k, n_param, n_starts, seed)
+    tasks = [(fit_type, T, k, start, bounds, loss, f_scale, max_nfev) for start in starts]
+    if workers is None or workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_fit_start, tasks))
+    else:
+        results = [_fit_start(task) for task in tasks]
+
+    costs = np.array([np.inf if result is None else result[2]["cost"] for result in results])
+    if not np.any(np.isfinite(costs)):
+        raise RuntimeError(f"Optimal parameters not found: all {len(starts)} starts failed.")
+    best = int(np.argmin(costs))
+    popt, pcov, info = results[best]
+    info = dict(info)
+    info["aic"], info["bic"] = information_criteria(2 * info["cost"], T.size, n_param)
+    info.update(
+        {
+            "method": "multistart",
+            "starts": len(starts),
+            "failed": int(np.sum(~np.isfinite(costs))),
+            "best_start": best,
+            "costs": costs,
+            "nfev": sum(result[2]["nfev"] for result in results if result is not None),
+            "njev": sum(result[2]["njev"] for result in results if result is not None),
+        }
+    )
+    if full_output:
+        return popt, pcov, info
+    return popt, pcov
+
+
+#################################################################
+# Automatic model selection
+#################################################################
+UNBOUNDED = (-np.inf, np.inf)
+# Fit functions that auto_fit tries : {fit function: (numbers of parameters, bounds)}. Bounds of None are the
+# defaults of fit_arrays ((0, inf)) or, for loglog, of loglog_default_start.
+AUTO_FIT_CANDIDATES = {
+    polylog: (range(2, 9), UNBOUNDED),
+    Nppoly: (range(2, 7), UNBOUNDED),
+    Chebyshev: (range(2, 9), UNBOUNDED),
+    power_law: ((2,), None),
+    Superconducting: ((4,), None),
+    NIST_experf: ((6,), UNBOUNDED),
+    loglog_func: ((9,), None),
+}
+AUTO_FIT_CRITERIA = ("cv", "aic", "bic")
+
+
+def auto_fit_candidates(fit_types: list = None, orders: dict = None) -> list:
+    """
+    Description : The candidates of an automatic fit : every fit type of get_fit_type_dic that can be fit to data
+                : (AUTO_FIT_CANDIDATES, one name per fit function), with each of its numbers of parameters.
+    Args:
+        fit_types (list, optional): Only use these fit types. Defaults to None (all of them).
+        orders (dict, optional): {fit type: numbers of parameters} replacing the default range of a fit type.
+    Returns:
+        candidates (list): (fit type, number of parameters, bounds) tuples.
+    """
+    candidates = []
+    seen = set()
+    for name, func in get_fit_type_dic().items():
+        if func not in AUTO_FIT_CANDIDATES or func in seen or (fit_types is not None and name not in fit_types):
+            continue
+        seen.add(func)
+        n_params, bounds = AUTO_FIT_CANDIDATES[func]
+        if orders is not None and name in orders:
+            n_params = orders[name]
+        candidates += [(name, int(n_param), bounds) for n_param in n_params]
+    return candidates
+
+
+def cross_validation_folds(n: int, n_folds: int = 5, seed: int = 0) -> list:
+    """
+    Returns:
+        folds (list): min(n_folds, n) arrays of test indices, a seeded random partition of range(n).
+    """
+    return np.array_split(np.random.default_rng(seed).permutation(n), min(n_folds, n))
+
+
+def _fit_candidate(fit_type: str, T, k, n_param: int, bounds, p0=None, n_starts: int = 4, seed: int = 0) -> tuple:
+    # Fits one candidate : loglog from the default and n_starts seeded starts (or from p0 alone), others from p0
+    if supports_multistart(fit_type):
+        default_n_param, default_p0, default_bounds = loglog_default_start(T)
+        bounds = default_bounds if bounds is None else bounds
+        if p0 is None:
+            extra_starts = [default_p0] if n_param == default_n_param else []
+            return fit_multistart(fit_type, T, k, n_param, extra_starts, bounds, n_starts=n_starts, seed=seed, full_output=True)
+    return fit_arrays(fit_type, T, k, n_param=n_param, p0=p0, bounds=bounds, full_output=True)
+
+
+def auto_fit_tasks(T, k, candidates: list = None, n_folds: int = 5, seed: int = 0, n_starts: int = 4) -> list:
+    """
+    Returns:
+        tasks (list): One task per candidate (see auto_fit_candidates) for score_candidate. All candidates share
+            the same cross-validation folds.
+    """
+    T = np.asarray(T, dtype=float)
+    k = np.asarray(k, dtype=float)
+    candidates = auto_fit_candidates() if candidates is None else candidates
+    folds = cross_validation_folds(T.size, n_folds, seed)
+    return [(fit_type, n_param, bounds, T, k, folds, n_starts, seed) for fit_type, n_param, bounds in candidates]
+
+
+def score_candidate(task: tuple) -> dict:
+    """
+    Description : Fits one candidate to all of the data (cost, AIC and BIC) and scores it by k-fold cross-validation :
+                : the fit is repeated on each training set, warm started from the full fit, and the held out points
+                : are predicted. Runs in worker processes.
+    Args:
+        task (tuple): See auto_fit_tasks.
+    Returns:
+        result (dict): fit_type, n_param, cv_rms (root mean square of the held out log residuals), cost, aic, bic,
+            popt and pcov of the full fit, and error (None, or why the candidate failed, its scores are then inf).
+    """
+    fit_type, n_param, bounds, T, k, folds, n_starts, seed = task
+    result = {"fit_type": fit_type, "n_param": n_param, "cv_rms": np.inf, "cost": np.inf, "aic": np.inf, "bic": np.inf}
+    result.update({"popt": None, "pcov": None, "error": None})
+    func = get_func_type(fit_type)
+    try:
+        if T.size - max(fold.size for fold in folds) <= n_param:
+            raise ValueError(f"{T.size} points are too few to cross-validate {n_param} parameters.")
+        with np.errstate(all="ignore"):
+            popt, pcov, info = _fit_candidate(fit_type, T, k, n_param, bounds, n_starts=n_starts, seed=seed)
+            squared = []
+            for test in folds:
+                train = np.ones(T.size, dtype=bool)
+                train[test] = False
+                p = _fit_candidate(fit_type, T[train], k[train], n_param, bounds, p0=popt, seed=seed)[0]
+                squared.append((np.log(func(T[test], *p)) - np.log(k[test])) ** 2)
+    except (RuntimeError, ValueError, np.linalg.LinAlgError) as e:
+        result["error"] = str(e)
+        return result
+    cv_mse = np.mean(np.concatenate(squared))
+    result["cv_rms"] = float(np.sqrt(cv_mse)) if np.isfinite(cv_mse) else np.inf
+    result["cost"] = float(info["cost"])
+    result["aic"], result["bic"] = (float(ic) for ic in information_criteria(2 * info["cost"], T.size, n_param))
+    result["popt"], result["pcov"] = popt, pcov
+    return result
+
+
+def rank_candidates(results: list, criterion: str = "cv") -> list:
+    """
+    Description : Ranks scored candidates by criterion ("cv" : cross-validated residual, "aic" or "bic"), lowest
+                : first. Ties go to the candidate with fewer parameters, and failed candidates come last.
+    Returns:
+        ranked (list): The results, sorted, each with its rank (1 is the best).
+    """
+    if criterion not in AUTO_FIT_CRITERIA:
+        raise ValueError(f"Unknown criterion {criterion}, expected one of {AUTO_FIT_CRITERIA}.")
+    key = "cv_rms" if criterion == "cv" else criterion
+    ranked = sorted(results, key=lambda result: (not np.isfinite(result[key]), result[key], result["n_param"]))
+    for rank, result in enumerate(ranked, start=1):
+        result["rank"] = rank
+    return ranked
+
+
+def auto_fit_report(ranked: list) -> list:
+    """
+    Returns:
+        report (list): The ranked results without the fit parameters (JSON serializable, infinite scores as None).
+    """
+    report = []
+    for result in ranked:
+        entry = {key: value for key, value in result.items() if key not in ("popt", "pcov")}
+        for key in ("cv_rms", "cost", "aic", "bic"):
+            entry[key] = entry[key] if np.isfinite(entry[key]) else None
+        report.append(entry)
+    return report
+
+
+def run_tasks(func, tasks: list, workers: int = 1, executor=None) -> list:
+    """
+    Description : Maps func over tasks in an executor, a new process pool of workers (None for one per CPU), or
+                : in this process if workers is 1.
+    """
+    if executor is not None:
+        return list(executor.map(func, tasks))
+    if workers is None or workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, tasks))
+    return [func(task) for task in tasks]
+
+
+def auto_fit_arrays(
+    T,
+    k,
+    candidates: list = None,
+    n_folds: int = 5,
+    criterion: str = "cv",
+    seed: int = 0,
+    n_starts: int = 4,
+    workers: int = 1,
+) -> list:
+    """
+    Description : Fits every candidate fit type and number of parameters to the data in a process pool and ranks
+                : them (see score_candidate and rank_candidates).
+    Args:
+        T (np.ndarray): Temperatures [K].
+        k (np.ndarray): Thermal conductivities.
+        candidates (list, optional): (fit type, n_param, bounds) tuples. Defaults to auto_fit_candidates().
+        n_folds (int, optional): Number of cross-validation folds. Defaults to 5.
+        criterion (str, optional): "cv", "aic" or "bic". Defaults to "cv".
+        seed (int, optional): Seed of the folds and of the loglog starts. Defaults to 0.
+        n_starts (int, optional): Number of seeded starts of loglog candidates. Defaults to 4.
+        workers (int, optional): Number of worker processes, None for one per CPU. Defaults to 1 (no pool).
+    Returns:
+        ranked (list): The scored candidates, best first (see score_candidate).
+    """
+    tasks = auto_fit_tasks(T, k, candidates, n_folds, seed, n_starts)
+    return rank_candidates(run_tasks(score_candidate, tasks, workers), criterion)
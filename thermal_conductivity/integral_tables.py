@@ -0,0 +1,152 @@
+"""
+This file defines the cumulative conductivity integral tables used for fast heat-load queries.
+
+Every heat load is an integral of the thermal conductivity between two temperatures. Instead of integrating
+k(T) for every query, each material interpolation and each fit carries a table of the cumulative integral
+    F(T) = int_{T_0}^{T} k(T') dT'
+at a set of knots, together with k at the same knots. Any integral is then
+    int_a^b k dT = F(b) - F(a)
+where F between two knots is the cubic Hermite interpolant matching F and F' = k at both knots.
+
+The tables are built once, when the library index is written (see library_index.py), and served by
+tc_utils.get_integral_table / tc_utils.get_conductivity_integrals.
+
+Error bounds:
+    - Interpolation tables use the interpolation knots themselves. k is linear between knots, so F is
+      quadratic there and the cubic Hermite interpolant is exact (to rounding).
+    - Fit tables use POINTS_PER_DECADE log-spaced knots over the fit range. F at the knots is accumulated with a
+      GAUSS_ORDER-point Gauss-Legendre rule per interval (error ~1e-15 relative for the library fits). Between
+      knots the Hermite interpolation error is bounded by
+          |F(T) - H(T)| <= h**4 / 384 * max |k'''|   on an interval of width h = T * (ln(10) / POINTS_PER_DECADE).
+      For a power law k ~ T**n, this is a relative error on F(b) - F(a) of about n**3 * (n + 1) * 4.5e-11
+      (below 1e-8 for n <= 4), and it is much smaller than the uncertainty of the fits themselves.
+    - These bounds assume k itself is smooth to rounding. Some loglog fits with very large polylog coefficients
+      evaluate 10**(huge) * (1 + erf(z)) with 1 + erf(z) close to rounding, so k carries evaluation noise near
+      its transition; their tables (and any quadrature of them) are then accurate to ~1e-5 of the total integral.
+    - Temperatures outside of the table (outside of the interpolation knots, or of the fit range) return NaN,
+      like the interpolation function itself.
+"""
+
+import numpy as np
+
+POINTS_PER_DECADE = 200
+MIN_POINTS = 64
+GAUSS_ORDER = 5
+
+
+class IntegralTable:
+    """
+    Cumulative integral of a thermal conductivity function on a set of temperature knots.
+
+    Attributes:
+        T (np.ndarray): Increasing temperature knots [K].
+        F (np.ndarray): Cumulative integral of k from T[0] to each knot [W/m].
+        k (np.ndarray): Thermal conductivity at each knot [W/m/K].
+    """
+
+    def __init__(self, T, F, k):
+        self.T = np.asarray(T, dtype=float)
+        self.F = np.asarray(F, dtype=float)
+        self.k = np.asarray(k, dtype=float)
+
+    def cumulative(self, T):
+        """
+        Evaluate the cumulative integral F(T). Temperatures outside of the table return NaN.
+        Args:
+            T (float or array-like): Temperature(s) [K].
+        Returns:
+            F (float or np.ndarray): Integral of k from the first knot to T [W/m].
+        """
+        T = np.asarray(T, dtype=float)
+        i = np.clip(np.searchsorted(self.T, T, side="right") - 1, 0, self.T.size - 2)
+        h = self.T[i + 1] - self.T[i]
+        s = (T - self.T[i]) / h
+        s2, s3 = s * s, s * s * s
+        F = (
+            (2 * s3 - 3 * s2 + 1) * self.F[i]
+            + (s3 - 2 * s2 + s) * h * self.k[i]
+            + (-2 * s3 + 3 * s2) * self.F[i + 1]
+            + (s3 - s2) * h * self.k[i + 1]
+        )
+        F = np.where((T < self.T[0]) | (T > self.T[-1]), np.nan, F)
+        return F if F.ndim else float(F)
+
+    def integrate(self, T1, T2):
+        """
+        Integral of k from T1 to T2. T1 and T2 may be arrays (broadcast against each other), e.g. the lower and
+        upper temperatures of many heat-load queries.
+        Args:
+            T1 (float or array-like): Lower temperature(s) [K].
+            T2 (float or array-like): Upper temperature(s) [K].
+        Returns:
+            integral (float or np.ndarray): Integral(s) of k from T1 to T2 [W/m].
+        """
+        return self.cumulative(T2) - self.cumulative(T1)
+
+    def __repr__(self):
+        return f"IntegralTable({self.T.size} knots, {self.T[0]} K to {self.T[-1]} K)"
+
+
+def build_interpolation_table(T, k) -> IntegralTable:
+    """
+    Description : Builds the (exact) integral table of a piecewise linear interpolation.
+    Args:
+        T (array-like): Interpolation knots [K].
+        k (array-like): Thermal conductivity at the knots [W/m/K].
+    Returns:
+        table (IntegralTable): The integral table.
+    """
+    T = np.asarray(T, dtype=float)
+    k = np.asarray(k, dtype=float)
+    order = np.argsort(T, kind="stable")
+    T, k = T[order], k[order]
+    F = np.concatenate([[0.0], np.cumsum(0.5 * (k[1:] + k[:-1]) * np.diff(T))])
+    return IntegralTable(T, F, k)
+
+
+def build_function_table(func, T_low: float, T_high: float, points_per_decade: int = POINTS_PER_DECADE) -> IntegralTable:
+    """
+    Description : Builds the integral table of a conductivity function on a log-spaced grid.
+    Args:
+        func (function): Vectorized function k(T).
+        T_low (float): Lowest temperature of the table [K].
+        T_high (float): Highest temperature of the table [K].
+        points_per_decade (int, optional): Knot density. Defaults to POINTS_PER_DECADE.
+    Returns:
+        table (IntegralTable): The integral table.
+    """
+    n = max(MIN_POINTS, int(np.ceil(np.log10(T_high / T_low) * points_per_decade)) + 1)
+    T = np.logspace(np.log10(T_low), np.log10(T_high), n)
+    T[0], T[-1] = T_low, T_high
+    x, w = np.polynomial.legendre.leggauss(GAUSS_ORDER)
+    mid, half = 0.5 * (T[1:] + T[:-1]), 0.5 * np.diff(T)
+    nodes = mid[:, None] + half[:, None] * x
+    with np.errstate(all="ignore"):
+        k_nodes = np.asarray(func(nodes.ravel()), dtype=float).reshape(nodes.shape)
+        k = np.asarray(func(T), dtype=float) * np.ones_like(T)
+    F = np.concatenate([[0.0], np.cumsum(half * (k_nodes @ w))])
+    return IntegralTable(T, F, k)
+
+
+def build_fit_table(fit, points_per_decade: int = POINTS_PER_DECADE) -> IntegralTable:
+    """
+    Description : Builds the integral table of a fit over its temperature range.
+    Args:
+        fit (Fit or dict): A Fit object, or a dictionary with fit_type, parameters and range entries.
+        points_per_decade (int, optional): Knot density. Defaults to POINTS_PER_DECADE.
+    Returns:
+        table (IntegralTable): The integral table, or None if the fit has no fit type or an empty range.
+    """
+    from fit_types import get_func_type
+
+    def _get(key):
+        return fit[key] if isinstance(fit, dict) else getattr(fit, key)
+
+    fit_type, fit_range = _get("fit_type"), _get("range")
+    if fit_type is None or not float(fit_range[0]) < float(fit_range[1]) or float(fit_range[0]) <= 0:
+        return None
+    func = get_func_type(str(fit_type))
+    params = np.asarray(_get("parameters"), dtype=float).ravel()
+    return build_function_table(
+        lambda T: func(T, *params), float(fit_range[0]), float(fit_range[1]), points_per_decade
+    )
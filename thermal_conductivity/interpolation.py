@@ -0,0 +1,37 @@
+"""
+This file defines the numpy-only interpolation function used by Material.interpolate.
+
+LinearInterpolator reproduces the behaviour of scipy.interpolate.interp1d(x, y, bounds_error=False) as used
+by the repository (piecewise linear, NaN outside of the knots) and exposes the same x and y attributes, but
+it is a plain container of two arrays so it can be stored and loaded without scipy.
+"""
+
+import numpy as np
+
+
+class LinearInterpolator:
+    """
+    A piecewise linear interpolation function through a set of (T, k) knots.
+
+    Attributes:
+        x (np.ndarray): Sorted temperature knots.
+        y (np.ndarray): Thermal conductivity at each knot.
+    """
+
+    def __init__(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        order = np.argsort(x, kind="stable")
+        self.x = x[order]
+        self.y = y[order]
+
+    def __call__(self, T):
+        """
+        Evaluate the interpolation at T. Temperatures outside of the knots return NaN.
+        """
+        T = np.asarray(T, dtype=float)
+        k = np.interp(T, self.x, self.y)
+        return np.where((T < self.x[0]) | (T > self.x[-1]), np.nan, k)
+
+    def __repr__(self):
+        return f"LinearInterpolator({self.x.size} knots, {self.x[0]} K to {self.x[-1]} K)"
@@ -0,0 +1,300 @@
+"""
+This file builds and reads the consolidated library index.
+
+The index is a single versioned .npz file (lib/library_index.npz by default) holding, for every material in
+the library, its metadata, its complete fit table (name, type, range, parameters, covariance, reference), its
+interpolation knots and the cumulative conductivity integral tables of its interpolation and fits (see
+integral_tables.py). Each material also records the checksum of the material file it was indexed from, so that
+readers can tell when a material was saved after the index was written (see tc_utils.get_integral_table). All numeric data lives in a handful of flat arrays with offsets recorded in a JSON
+metadata record, so the whole library is read with a single file read and no unpickling.
+
+update_repo.main writes the index at the end of every rebuild. It can also be regenerated from the existing
+material files on its own:
+    python library_index.py
+"""
+
+import os
+import io
+import sys
+import json
+import numpy as np
+from datetime import datetime as dt
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+if this_dir not in sys.path:
+    sys.path.append(this_dir)
+path_to_mat_lib = os.path.join(this_dir, "lib")
+
+from serialization import to_jsonable, material_path
+from material_registry import file_checksum
+from integral_tables import IntegralTable, build_fit_table, build_interpolation_table
+
+INDEX_VERSION = 3
+INDEX_FILE = os.path.join(path_to_mat_lib, "library_index.npz")
+
+
+def build_library_index(materials: list) -> dict:
+    """
+    Description : Packs a list of Material objects into the flat arrays stored in the library index.
+    Args:
+        materials (list): List of Material objects.
+    Returns:
+        arrays (dict): Dictionary of numpy arrays ready to be passed to np.savez.
+    """
+    parameters, covariance, interp_T, interp_k = [], [], [], []
+    tables = []
+    n_param, n_cov, n_interp, n_table = 0, 0, 0, 0
+    mat_records, fit_records = [], []
+
+    def _add_table(table):
+        nonlocal n_table
+        if table is None:
+            return None
+        tables.append(table)
+        table_slice = [n_table, table.T.size]
+        n_table += table.T.size
+        return table_slice
+    for mat in materials:
+        fit_start = len(fit_records)
+        for fit in mat.fits:
+            params = np.asarray(fit.parameters, dtype=float).ravel()
+            try:
+                table = build_fit_table(fit)
+            except Exception:
+                table = None
+            cov = fit.parameter_covariance
+            cov = np.zeros(0) if cov is None else np.asarray(cov, dtype=float)
+            fit_records.append(
+                {
+                    "name": str(fit.name),
+                    "material": str(fit.material),
+                    "source": str(fit.source),
+                    "fit_type": None if fit.fit_type is None else str(fit.fit_type),
+                    "range": [float(fit.range[0]), float(fit.range[1])],
+                    "fit_error": to_jsonable(fit.fit_error),
+                    "reference": to_jsonable(getattr(fit, "reference", None)),
+                    "params": [n_param, params.size],
+                    "cov": [n_cov, cov.size],
+                    "cov_shape": list(cov.shape),
+                    "table": _add_table(table),
+                }
+            )
+            parameters.append(params)
+            covariance.append(cov.ravel())
+            n_param += params.size
+            n_cov += cov.size
+
+        interp_slice, interp_table = None, None
+        interp_func = getattr(mat, "interpolate_function", None)
+        if interp_func is not None:
+            T = np.asarray(interp_func.x, dtype=float)
+            k = np.asarray(interp_func.y, dtype=float)
+            interp_T.append(T)
+            interp_k.append(k)
+            interp_slice = [n_interp, T.size]
+            n_interp += T.size
+            interp_table = _add_table(build_interpolation_table(T, k))
+
+        mat_file = material_path(os.path.join(path_to_mat_lib, str(mat.name)))
+        mat_records.append(
+            {
+                "name": str(mat.name),
+                "checksum": None if mat_file is None else file_checksum(mat_file),
+                "parent": None if mat.parent is None else str(mat.parent),
+                "fit_type": None if mat.fit_type is None else str(mat.fit_type),
+                "temp_range": to_jsonable(getattr(mat, "temp_range", None)),
+                "room_temp_tuple": to_jsonable(getattr(mat, "room_temp_tuple", None)),
+                "fits": [fit_start, len(fit_records) - fit_start],
+                "interpolation": interp_slice,
+                "table": interp_table,
+            }
+        )
+
+    metadata = {
+        "version": INDEX_VERSION,
+        "created": dt.now().isoformat(timespec="seconds"),
+        "materials": mat_records,
+        "fits": fit_records,
+    }
+
+    def _concat(chunks):
+        return np.concatenate(chunks) if len(chunks) > 0 else np.zeros(0)
+
+    return {
+        "metadata": np.array(json.dumps(metadata)),
+        "parameters": _concat(parameters),
+        "covariance": _concat(covariance),
+        "interp_T": _concat(interp_T),
+        "interp_k": _concat(interp_k),
+        "table_T": _concat([table.T for table in tables]),
+        "table_F": _concat([table.F for table in tables]),
+        "table_k": _concat([table.k for table in tables]),
+    }
+
+
+def write_library_index(materials: list = None, index_file: str = INDEX_FILE) -> str:
+    """
+    Description : Writes the consolidated library index.
+    Args:
+        materials (list, optional): List of Material objects to include. Defaults to every material in the library.
+        index_file (str, optional): Path of the index file. Defaults to lib/library_index.npz.
+    Returns:
+        index_file (str): Path of the written index file.
+    """
+    if materials is None:
+        from tc_utils import get_materials_list, get_material
+
+        materials = [get_material(mat) for mat in sorted(get_materials_list())]
+        materials = [mat for mat in materials if mat is not None]
+    arrays = build_library_index(materials)
+    # Write to a temporary file first so readers never see a partially written index
+    tmp_file = index_file + ".tmp"
+    with open(tmp_file, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_file, index_file)
+    return index_file
+
+
+class LibraryIndex:
+    """
+    A read-only view of the consolidated library index.
+
+    Attributes:
+        version (int): Index format version.
+        created (str): Creation time of the index (ISO format).
+        materials (list): Names of all indexed materials.
+    """
+
+    def __init__(self, arrays: dict):
+        metadata = json.loads(str(arrays["metadata"]))
+        if metadata["version"] > INDEX_VERSION:
+            raise ValueError(
+                f"Library index version {metadata['version']} is newer than the supported version {INDEX_VERSION}."
+            )
+        self.version = metadata["version"]
+        self.created = metadata["created"]
+        self._materials = {rec["name"]: rec for rec in metadata["materials"]}
+        self._fits = metadata["fits"]
+        self._parameters = arrays["parameters"]
+        self._covariance = arrays["covariance"]
+        self._interp_T = arrays["interp_T"]
+        self._interp_k = arrays["interp_k"]
+        # Integral tables were added in version 2
+        self._table_T = arrays.get("table_T")
+        self._table_F = arrays.get("table_F")
+        self._table_k = arrays.get("table_k")
+        self.materials = list(self._materials.keys())
+
+    def material_info(self, mat: str) -> dict:
+        """
+        Returns:
+            info (dict): name, parent, fit_type, temp_range and room_temp_tuple of the material.
+        """
+        rec = self._materials[mat]
+        return {key: rec[key] for key in ("name", "parent", "fit_type", "temp_range", "room_temp_tuple")}
+
+    def checksum(self, mat: str) -> str:
+        """
+        Returns:
+            checksum (str): sha256 of the material file the material was indexed from (see
+                material_registry.file_checksum), or None if unknown (indexes written before version 3).
+        """
+        return self._materials[mat].get("checksum")
+
+    def _fit_record(self, rec: dict) -> dict:
+        p_start, p_len = rec["params"]
+        c_start, c_len = rec["cov"]
+        fit = {key: rec[key] for key in ("name", "material", "source", "fit_type", "fit_error", "reference")}
+        fit["range"] = tuple(rec["range"])
+        fit["parameters"] = self._parameters[p_start : p_start + p_len]
+        fit["parameter_covariance"] = self._covariance[c_start : c_start + c_len].reshape(rec["cov_shape"])
+        return fit
+
+    def fits(self, mat: str) -> list:
+        """
+        Args:
+            mat (str): Material name.
+        Returns:
+            fits (list): List of dictionaries (name, material, source, fit_type, range, parameters,
+                parameter_covariance, fit_error, reference), one per fit of the material.
+        """
+        start, length = self._materials[mat]["fits"]
+        return [self._fit_record(rec) for rec in self._fits[start : start + length]]
+
+    def fit_by_name(self, mat: str, fit_name: str) -> dict:
+        for fit in self.fits(mat):
+            if fit["name"] == fit_name:
+                return fit
+        return None
+
+    def all_fits(self) -> list:
+        """
+        Returns:
+            fits (list): The fit table of the whole library (see LibraryIndex.fits).
+        """
+        return [self._fit_record(rec) for rec in self._fits]
+
+    def interpolation(self, mat: str) -> tuple:
+        """
+        Args:
+            mat (str): Material name.
+        Returns:
+            T, k (np.ndarray, np.ndarray): Interpolation knots of the material, or (None, None) if it has no interpolation.
+        """
+        interp_slice = self._materials[mat]["interpolation"]
+        if interp_slice is None:
+            return None, None
+        start, length = interp_slice
+        return self._interp_T[start : start + length], self._interp_k[start : start + length]
+
+    def _table(self, table_slice) -> IntegralTable:
+        if table_slice is None or self._table_T is None:
+            return None
+        start, length = table_slice
+        end = start + length
+        return IntegralTable(self._table_T[start:end], self._table_F[start:end], self._table_k[start:end])
+
+    def integral_table(self, mat: str, fit_name: str = None) -> IntegralTable:
+        """
+        Args:
+            mat (str): Material name.
+            fit_name (str, optional): Name of one of the material's fits. Defaults to the material's interpolation.
+        Returns:
+            table (IntegralTable): Cumulative integral table of the interpolation (or fit), or None if there is none.
+        """
+        if fit_name is None:
+            return self._table(self._materials[mat].get("table"))
+        start, length = self._materials[mat]["fits"]
+        for rec in self._fits[start : start + length]:
+            if rec["name"] == fit_name:
+                return self._table(rec.get("table"))
+        return None
+
+    def __contains__(self, mat):
+        return mat in self._materials
+
+    def __len__(self):
+        return len(self._materials)
+
+    def __repr__(self):
+        return f"LibraryIndex(version={self.version}, created={self.created}, materials={len(self)}, fits={len(self._fits)})"
+
+
+def load_library_index(index_file: str = INDEX_FILE) -> LibraryIndex:
+    """
+    Description : Loads the consolidated library index with a single file read.
+    Args:
+        index_file (str, optional): Path of the index file. Defaults to lib/library_index.npz.
+    Returns:
+        index (LibraryIndex): The loaded library index.
+    """
+    with open(index_file, "rb") as f:
+        buffer = io.BytesIO(f.read())
+    with np.load(buffer, allow_pickle=False) as npz:
+        arrays = {key: npz[key] for key in npz.files}
+    return LibraryIndex(arrays)
+
+
+if __name__ == "__main__":
+    index_file = write_library_index()
+    print(load_library_index(index_file))
@@ -1,12 +1,8 @@
 import numpy as np
-import os, sys
-import matplotlib.pyplot as plt
-from scipy.optimize import curve_fit
-import json, shutil, pickle, yaml
-from scipy.interpolate import interp1d
-from scipy.integrate import quad
-from astropy import units as u
-from astropy import constants as const
+import os, sys, shutil, hashlib, warnings, functools
+
+# Plotting (matplotlib), unit handling (astropy), curve fitting/integration (scipy) and yaml parsing are
+# imported inside the methods that need them, so that loading and evaluating materials stays fast.
 
 # from inspect import signature
 
@@ -17,6 +13,51 @@ if this_dir not in sys.path:
 
 
 from fit_types import get_func_type, linear_fit, loglog_func, Nppoly, polylog
+from fit_types import get_antiderivative, get_partial_antiderivative, gauss_legendre_log_integral
+from interpolation import LinearInterpolator
+from fitting import fit_arrays, fit_multistart, supports_multistart, loglog_default_start, DEFAULT_BOUNDS, UNBOUNDED
+from fitting import auto_fit_arrays, auto_fit_candidates, auto_fit_report
+import serialization
+
+
+def _pyplot():
+    """
+    Returns matplotlib.pyplot, importing it on first use.
+    """
+    import matplotlib.pyplot as plt
+
+    return plt
+
+
+def _quantity_input(**unit_names):
+    """
+    A lazy version of astropy.units.quantity_input. The units are given by name (e.g. T="K") and astropy is
+    only imported the first time the decorated function is called.
+    """
+
+    def decorator(func):
+        checked_func = None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nonlocal checked_func
+            if checked_func is None:
+                from astropy import units as u
+
+                checked_func = u.quantity_input(**{arg: u.Unit(unit) for arg, unit in unit_names.items()})(func)
+            return checked_func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def file_checksum(path):
+    """
+    Returns the sha256 hex digest of the content of a file, used to tell which RAW csv files changed.
+    """
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
 
 class Material:
@@ -35,12 +76,18 @@ class Material:
         temp_range (tuple): Temperature range covered by the data.
         raw_fit_params (np.ndarray): Parameters from the initial fit to all included data.
         raw_fit_cov (np.ndarray): Covariance matrix from the initial fit to all included data.
+        data_fit_key (str): The included_data_key of the datasets the data fit was made from.
         room_temp_tuple (tuple): Tuple containing room temperature and corresponding conductivity, if available.
         interpolate_function (function): Interpolation function for thermal conductivity based on fits.
     """
 
     def __init__(
-        self, name, parent: str = None, fit_type="loglog", force_update: bool = False
+        self,
+        name,
+        parent: str = None,
+        fit_type="loglog",
+        force_update: bool = False,
+        update_parent: bool = True,
     ):
         """Initialize the Material class.
 
@@ -49,25 +96,26 @@ class Material:
             parent (str, optional): Name of the parent material. Defaults to None.
             fit_type (function, optional): The fitting function to use. Defaults to loglog_func.
             force_update (bool, optional): Whether to force update the material. Defaults to False.
+            update_parent (bool, optional): Whether to copy the raw data and fits of the material to its parent
+                material (and save the parent). Defaults to True.
 
         """
         self.name = name
         self.folder = "lib" + os.sep + name  #
         folder_path = os.path.join(this_dir, "lib", name)
 
-        # If the folder exists and contains a pickle file with the class already stored then load it
-        pickle_file = os.path.join(self.folder, "material.pkl")
-        if os.path.exists(pickle_file) and not force_update: # If the material pickle exists and we aren't forcing an update, load it
-            with open(pickle_file, "rb") as f:
-                material = pickle.load(f)
-                self.__dict__.update(material.__dict__)
+        # If the folder exists and contains a material file with the class already stored then load it
+        material_file = serialization.material_path(self.folder)
+        if material_file is not None and not force_update: # If the material file exists and we aren't forcing an update, load it
+            material = serialization.load_material_file(material_file)
+            self.__dict__.update(material.__dict__)
             # print(f"Loaded existing material: {self.name}")
             self.folder = "lib" + os.sep + name  # os.path.join(this_dir, "lib", name)
             self.data_folder = os.path.join(self.folder, "RAW")
             self.plot_folder = os.path.join(self.folder, "PLOTS")
             if not os.path.exists(self.plot_folder):
                 os.mkdir(self.plot_folder)
-        # If the material pickle doesn't exist (or we are forcing an update), then create the material from scratch
+        # If the material file doesn't exist (or we are forcing an update), then create the material from scratch
         else:
             self.data_folder = os.path.join(self.folder, "RAW")
             self.plot_folder = os.path.join(self.folder, "PLOTS")
@@ -113,70 +161,84 @@ class Material:
         # If it has a parent
         # We want to copy any raw data files to the parent folder
         # And also copy any fits we have to the parent material
-        if self.parent is not None:
-            parent_folder = os.path.join(this_dir, "lib", self.parent)
-            if not os.path.exists(parent_folder):
-                os.mkdir(parent_folder)
-
-            # If the parent material doesn't have a RAW folder, create it
-            if os.path.exists(self.data_folder) and self.data_classes is not None:
-                if os.listdir(self.data_folder) != []:
-                    parent_raw_folder = os.path.join(parent_folder, "RAW")
-                    if not os.path.exists(parent_raw_folder):
-                        os.mkdir(parent_raw_folder)
-                    # if this material has csv files in the data folder, copy them to the parent data folder
-                    for file in os.listdir(self.data_folder):
-                        if file.endswith(".csv"):
-                            src = os.path.join(self.data_folder, file)
-                            dst = os.path.join(parent_raw_folder, file)
-                            if not os.path.exists(dst):
-                                shutil.copy(src, dst)
-                            # This code block may be needed to avoid overwriting files in the parent folder
-                            # i = 1
-                            # if os.path.exists(dst):
-                            #     print(f"File {file} already exists in parent folder. Renaming to avoid overwrite.")
-                            #     while os.path.exists(dst):
-                            #         dst = os.path.join(parent_raw_folder, f"{file.split('.')[0]}_{i}.csv")
-                            #         i += 1
-                            # print(f"Copying {src} to {dst}")
-                            # shutil.copy(src, dst)
-            # Now we want to see if the parent already has a class pickle file
-            parent_pickle = os.path.join(parent_folder, "material.pkl")
-            if os.path.exists(parent_pickle):
-                parent_class = pickle.load(open(parent_pickle, "rb"))
-                # load the existing fits
-                existing_fits = [fit.name for fit in parent_class.get_fits()]
-                # If it does, we want to add our fits to the parent class fits
-                for fit in self.fits:
-                    if fit.name not in existing_fits:
-                        # print(f"Adding fits from {self.name} to parent material {self.parent}.")
-                        parent_class.add_fits(
-                            self.name,
-                            fit.source,
-                            fit.range,
-                            fit.parameters,
-                            fit.parameter_covariance,
-                            fit.fit_type,
-                            fit.fit_error,
-                            fit.reference if hasattr(fit, "reference") else None,
-                        )
-            # If the parent class doesn't yet exist, we want to create it
-            else:
-                parent_class = Material(self.parent, force_update=True)
-                for fit in self.fits:
-                    parent_class.add_fits(
-                        self.name,
-                        fit.source,
-                        fit.range,
-                        fit.parameters,
-                        fit.parameter_covariance,
-                        fit.fit_type,
-                        fit.fit_error,
-                    )
-            # Finally, we save the updated parent class
-            with open(parent_pickle, "wb") as f:
-                pickle.dump(parent_class, f)
-            # print(f"Updating data to parent material: {self.parent}")
+        if self.parent is not None and update_parent:
+            self.push_to_parent()
+
+    def copy_data_to_parent(self):
+        """
+        Copy the raw data files of this material to the RAW folder of its parent (existing files are kept).
+        """
+        parent_folder = os.path.join(this_dir, "lib", self.parent)
+        if not os.path.exists(parent_folder):
+            os.mkdir(parent_folder)
+
+        # If the parent material doesn't have a RAW folder, create it
+        if os.path.exists(self.data_folder) and self.data_classes is not None:
+            if os.listdir(self.data_folder) != []:
+                parent_raw_folder = os.path.join(parent_folder, "RAW")
+                if not os.path.exists(parent_raw_folder):
+                    os.mkdir(parent_raw_folder)
+                # if this material has csv files in the data folder, copy them to the parent data folder
+                for file in sorted(os.listdir(self.data_folder)):
+                    if file.endswith(".csv"):
+                        src = os.path.join(self.data_folder, file)
+                        dst = os.path.join(parent_raw_folder, file)
+                        if not os.path.exists(dst):
+                            shutil.copy(src, dst)
+                        # This code block may be needed to avoid overwriting files in the parent folder
+                        # i = 1
+                        # if os.path.exists(dst):
+                        #     print(f"File {file} already exists in parent folder. Renaming to avoid overwrite.")
+                        #     while os.path.exists(dst):
+                        #         dst = os.path.join(parent_raw_folder, f"{file.split('.')[0]}_{i}.csv")
+                        #         i += 1
+                        # print(f"Copying {src} to {dst}")
+                        # shutil.copy(src, dst)
+        return
+
+    def add_child_fits(self, child):
+        """
+        Add the fits of a child material that this (parent) material doesn't have yet.
+        Args:
+            child (Material): The child material.
+        """
+        # load the existing fits
+        existing_fits = [fit.name for fit in self.get_fits()]
+        for fit in child.fits:
+            if fit.name not in existing_fits:
+                # print(f"Adding fits from {child.name} to parent material {self.name}.")
+                self.add_fits(
+                    child.name,
+                    fit.source,
+                    fit.range,
+                    fit.parameters,
+                    fit.parameter_covariance,
+                    fit.fit_type,
+                    fit.fit_error,
+                    fit.reference if hasattr(fit, "reference") else None,
+                )
+        return
+
+    def push_to_parent(self):
+        """
+        Copy the raw data and fits of this material to its parent material and save the parent.
+        update_repo aggregates each parent once, after all of its children are built, instead of calling this.
+        """
+        parent_folder = os.path.join(this_dir, "lib", self.parent)
+        self.copy_data_to_parent()
+        # Now we want to see if the parent already has a class material file
+        parent_file = serialization.material_path(parent_folder)
+        if parent_file is not None:
+            parent_class = serialization.load_material_file(parent_file)
+        # If the parent class doesn't yet exist, we want to create it
+        else:
+            parent_class = Material(self.parent, force_update=True)
+        # If it does, we want to add our fits to the parent class fits
+        parent_class.add_child_fits(self)
+        # Finally, we save the updated parent class
+        parent_class.to_file(os.path.join(parent_folder, serialization.MATERIAL_FILE))
+        # print(f"Updating data to parent material: {self.parent}")
+        return
 
     def get_data(self):
         """Get the data for the material.
@@ -189,45 +251,106 @@ class Material:
         data_class_dict = {}
         if not os.path.exists(self.data_folder):
             return None, None
-        for file in os.listdir(self.data_folder):
-            if file.endswith(".csv"):
-                reference_row = np.loadtxt(
-                    os.path.join(self.data_folder, file),
-                    delimiter=",",
-                    max_rows=1,
-                    dtype=str,
-                )
-                ref_string = [i for i in reference_row if i != ""]
-                data = np.loadtxt(
-                    os.path.join(self.data_folder, file), delimiter=",", skiprows=2
-                )
-                # If the data is only one row (one dimensional), we need to reshape it to be two dimensional
-                if len(data.shape) == 1:
-                    data = data.reshape((1, -1))
-                data_dict[file] = data
-                data_class_dict[file] = DataSet(file, data, ref_string=ref_string)
+        for file in self.data_files():
+            data_class_dict[file] = self.read_dataset(file)
+            data_dict[file] = data_class_dict[file].data
         return data_dict, data_class_dict
 
-    def update_data(self):
+    def data_files(self):
+        """
+        Returns:
+            files (list): The sorted names of the csv files in the RAW data folder (empty if there is none).
+        """
+        if not os.path.exists(self.data_folder):
+            return []
+        return sorted(file for file in os.listdir(self.data_folder) if file.endswith(".csv"))
+
+    def read_dataset(self, file, checksum=None):
+        """
+        Parse one csv file of the RAW data folder.
+        Args:
+            file (str): Name of the csv file.
+            checksum (str, optional): The checksum of the file, if already computed. Defaults to None.
+        Returns:
+            dataset (DataSet): The dataset of the file.
+        """
+        path = os.path.join(self.data_folder, file)
+        reference_row = np.loadtxt(path, delimiter=",", max_rows=1, dtype=str)
+        ref_string = [i for i in reference_row if i != ""]
+        data = np.loadtxt(path, delimiter=",", skiprows=2)
+        # If the data is only one row (one dimensional), we need to reshape it to be two dimensional
+        if len(data.shape) == 1:
+            data = data.reshape((1, -1))
+        return DataSet(file, data, ref_string=ref_string, checksum=checksum or file_checksum(path))
+
+    def included_data_key(self):
+        """
+        Returns:
+            key (str): sha256 of the names and checksums of the included datasets. It changes when a dataset is
+                added, removed, modified or its inclusion state is toggled.
+        """
+        key = hashlib.sha256()
+        for name, dataset in sorted((self.data_classes or {}).items()):
+            if dataset.include:
+                key.update(f"{name}:{getattr(dataset, 'checksum', None)}\n".encode())
+        return key.hexdigest()
+
+    def update_data(self, incremental: bool = True):
         """Update the data for the material.
 
+        Args:
+            incremental (bool, optional): Only parse the csv files that are new or changed (by checksum) and keep the
+                cached DataSets of the others, with their inclusion state. False re-reads every file. Defaults to True.
+
         Returns:
-            dict: A dictionary containing the updated data for the material.
-            dict: A dictionary containing updated DataSet objects for each data file.
+            changed (list): Names of the datasets that were added, changed or removed.
         """
-        self.data_classes = self.get_data()[1]
-        return
-    def update_material(self):
+        if not incremental or self.data_classes is None:
+            old_classes = self.data_classes or {}
+            self.data_classes = self.get_data()[1]
+            return sorted(set(old_classes) | set(self.data_classes or {}))
+        data_classes, changed = {}, []
+        for file in self.data_files():
+            checksum = file_checksum(os.path.join(self.data_folder, file))
+            cached = self.data_classes.get(file)
+            if cached is not None and getattr(cached, "checksum", None) == checksum:
+                data_classes[file] = cached
+            else:
+                data_classes[file] = self.read_dataset(file, checksum=checksum)
+                changed.append(file)
+        changed += [file for file in self.data_classes if file not in data_classes]
+        self.data_classes = data_classes or None
+        return sorted(changed)
+
+    def update_material(self, save: bool = True, incremental: bool = True):
         """Update the material after adding a dataset
+
+        Args:
+            save (bool, optional): Save the material to its material file afterwards. Defaults to True.
+            incremental (bool, optional): Only parse the new or changed csv files (see update_data), warm start the
+                data fit from the existing one, skip it if neither the included data nor the fit type changed, and rebuild
+                the interpolation only over the temperatures of the old and new data fits. False re-reads every
+                file, refits from the default guess and rebuilds the whole interpolation. Defaults to True.
         """
-        self.update_data()
+        changed = self.update_data(incremental=incremental)
+        if self.data_classes is None:
+            print(f"No data for {self.name}.")
+            return
         included_data = [
             ds.data for ds in self.data_classes.values() if ds.include
         ]
         all_data = np.vstack(included_data)
         self.temp_range = (min(all_data[:, 0]), max(all_data[:, 0]))
+
+        old_fit = self.fit_by_name(f"{self.name}_data")
+        up_to_date = getattr(self, "data_fit_key", None) == self.included_data_key()
+        if incremental and not changed and up_to_date and self._warm_start_params() is not None:
+            # Nothing to refit, the data fit was made from the same included datasets
+            if save:
+                self.save()
+            return
         try:
-            fit_param, fit_cov = self.fit_data()
+            fit_param, fit_cov = self.fit_data(warm_start=incremental)
             self.raw_fit_params = fit_param
             self.raw_fit_cov = fit_cov
         except Exception as e:
@@ -236,25 +359,90 @@ class Material:
             self.raw_fit_cov = None
         
         if len(self.fits) > 0:
-            self.interpolate_function = self.interpolate(preferred_fit=None)
+            # Only the data fit changed, so only the temperatures it covered or covers are re-interpolated
+            new_fit = self.fit_by_name(f"{self.name}_data")
+            T_range = None
+            if incremental and old_fit is not None and new_fit is not None:
+                T_range = (min(old_fit.range[0], new_fit.range[0]), max(old_fit.range[1], new_fit.range[1]))
+            self.interpolate_function = self.interpolate(preferred_fit=None, T_range=T_range)
         
-        self.save()
+        if save:
+            self.save()
         return
-    def fit_data(self, n_param=None, p0=None, bounds=None):
+    def fit_data(
+        self, n_param=None, p0=None, bounds=None, loss="linear", f_scale=0.1, warm_start=True, n_starts=None, seed=None, workers=1
+    ):
         """Fit the data for the material.
 
         Args:
             n_param (int, optional): The number of parameters for the fit. Defaults to 8.
             p0 (array-like, optional): Initial guess for the fit parameters. Defaults to None.
             bounds (tuple, optional): Bounds for the fit parameters. Defaults to None.
+            loss (str, optional): Robust loss of the fit, e.g. "soft_l1" to down-weight outlying data (see fitting.fit_nonlinear). Defaults to "linear".
+            f_scale (float, optional): Log residual at which the robust loss starts to down-weight data. Defaults to 0.1.
+            warm_start (bool, optional): Start nonlinear fits from the existing data fit when it has the same fit type and number of parameters (and p0 isn't given). Without n_param, the existing data fit also sets the number of parameters. Defaults to True.
+            n_starts (int, optional): Fit loglog data from this many seeded starting points plus the warm start and default guess, and keep the best (see fitting.fit_multistart). Defaults to None (a single start).
+            seed (int, optional): Seed of the multi-start transition temperatures. Defaults to None.
+            workers (int, optional): Number of worker processes running the starts, None for one per CPU. Defaults to 1.
 
         Returns:
             popt (np.ndarray): Optimal values for the fit parameters.
             pcov (np.ndarray): Covariance matrix of the fit parameters.
         """
-        if self.data_classes == None:
+        inputs = self.fit_inputs(n_param=n_param, p0=p0, bounds=bounds, warm_start=warm_start)
+        if inputs is None:
             print("No data to fit.")
             return None, None
+        multistart = n_starts is not None and supports_multistart(self.fit_type)
+        if multistart:
+            # The existing fit (warm start) and the default guess compete with the seeded starts
+            default_p0 = self.fit_inputs(n_param=n_param, p0=p0, bounds=bounds, warm_start=False)[3]
+        x, y, n_param, p0, bounds = inputs
+
+        # fit in log space to equally value low temps (linear fit types are solved directly, see fitting.py)
+        if multistart:
+            extra_starts = [p0] if np.array_equal(p0, default_p0) else [p0, default_p0]
+            popt, pcov = fit_multistart(
+                self.fit_type, x, y, n_param, extra_starts, bounds, n_starts=n_starts, seed=seed, workers=workers, loss=loss, f_scale=f_scale
+            )
+        else:
+            popt, pcov = fit_arrays(self.fit_type, x, y, n_param=n_param, p0=p0, bounds=bounds, loss=loss, f_scale=f_scale)
+        self._set_data_fit(x, popt, pcov)
+        return popt, pcov
+
+    def _set_data_fit(self, x, popt, pcov):
+        """
+        Add the data fit (fit type self.fit_type, over the range of the temperatures x) to the fits, or replace it.
+        """
+        new_fit = Fit(self.name, "data", (min(x), max(x)), popt, pcov, self.fit_type)
+        new_fit.add_reference("Data Fit (see references for included data)")
+        self.data_fit_key = self.included_data_key()
+        # If a data fit for this material already exists, we want to update it rather than add a new one
+        for i, fit in enumerate(self.fits):
+            if fit.name == new_fit.name and fit.source == "data":
+                self.fits[i] = new_fit
+                print("Updating existing data fit.")
+                return
+        
+        self.fits.append(new_fit)
+        return
+
+    def fit_inputs(self, n_param=None, p0=None, bounds=None, warm_start=True):
+        """Collect the data and the fit settings used by fit_data.
+
+        Args:
+            n_param (int, optional): The number of parameters for the fit. Defaults to None.
+            p0 (array-like, optional): Initial guess for the fit parameters. Defaults to None.
+            bounds (tuple, optional): Bounds for the fit parameters. Defaults to None.
+            warm_start (bool, optional): Use the existing data fit as the initial guess (see fit_data). Defaults to True.
+
+        Returns:
+            x, y (np.ndarray, np.ndarray): The valid temperatures and conductivities of the included data.
+            n_param, p0, bounds: The fit settings, with the defaults of the fit type (loglog) and the warm start applied.
+            Returns None if the material has no data.
+        """
+        if self.data_classes == None:
+            return None
         # Only fit the dataset classes that have a fit tag (aren't excluded)
         included_data = [ds.data for ds in self.data_classes.values() if ds.include]
 
@@ -275,70 +463,36 @@ class Material:
         x = x[valid_indices]
         y = y[valid_indices]
 
-        # fit to a log scale version of the function to equally value low temps
-        def log_func(x, *args):
-            y = get_func_type(self.fit_type)(x, *args)
-            return np.log(y)
+        warm_p0 = self._warm_start_params(n_param) if warm_start and p0 is None else None
 
         if self.fit_type == "loglog":
-            n_param = 9
-            p0 = [
-                1.13377143e-07,
-                -2.98684987e-05,
-                1.90655344e-03,
-                8.47382032e-02,
-                9.98573679e-03,
-                2.45862017e-02,
-                1.00316703e-01,
-                6.12147734e-01,
-                np.mean([min(x), max(x)]),
-            ]  # This is just an example starting point for the fit
-            bounds = (
-                (
-                    -np.inf,
-                    -np.inf,
-                    -np.inf,
-                    -np.inf,
-                    -np.inf,
-                    -np.inf,
-                    -np.inf,
-                    -np.inf,
-                    min(x),
-                ),
-                (
-                    np.inf,
-                    np.inf,
-                    np.inf,
-                    np.inf,
-                    np.inf,
-                    np.inf,
-                    np.inf,
-                    np.inf,
-                    max(x),
-                ),
-            )
+            n_param, p0, bounds = loglog_default_start(x)
 
-        popt, pcov = curve_fit(
-            log_func,
-            x,
-            np.log(y),
-            maxfev=10000,
-            p0=np.ones(n_param) if p0 is None else p0,
-            bounds=(0, np.inf) if bounds is None else bounds,
-        )
-        new_fit = Fit(self.name, "data", (min(x), max(x)), popt, pcov, self.fit_type)
-        new_fit.add_reference("Data Fit (see references for included data)")
-        # If a data fit for this material already exists, we want to update it rather than add a new one
-        for i, fit in enumerate(self.fits):
-            if fit.name == new_fit.name and fit.source == "data":
-                self.fits[i] = new_fit
-                print("Updating existing data fit.")
-                return popt, pcov
-        
-        self.fits.append(new_fit)
-        return popt, pcov
+        # Without a number of parameters, the warm start also sets it (e.g. the order chosen by auto_fit)
+        if warm_p0 is not None and (n_param is None or np.size(warm_p0) == n_param):
+            n_param, p0 = np.size(warm_p0), warm_p0
+            # A fit made without the default bounds (e.g. by auto_fit) is refit without them
+            if bounds is None and np.any(warm_p0 < DEFAULT_BOUNDS[0]):
+                bounds = UNBOUNDED
+
+        return x, y, n_param, p0, bounds
+
+    def _warm_start_params(self, n_param=None):
+        """
+        Returns the parameters of the material's data fit (raw_fit_params) if that fit has the current fit type
+        (and n_param parameters, if given), to start a refit from. Returns None otherwise.
+        """
+        if self.raw_fit_params is None:
+            return None
+        params = np.asarray(self.raw_fit_params, dtype=float)
+        if n_param is not None and params.size != n_param:
+            return None
+        for fit in self.fits:
+            if fit.source == "data" and fit.material == self.name and fit.fit_type == self.fit_type:
+                return params
+        return None
 
-    def update_fit(self, new_fit_type, fit_index_to_replace:int, n_param=None):
+    def update_fit(self, new_fit_type, fit_index_to_replace:int, n_param=None, **fit_options):
         """
         Use this function to change the default fit type for the material and refit the data. Be careful when doing this with a parent material
         as the parent material may have multiple fits that match the 'data' fit source and you may accidently update the wrong fit.
@@ -347,13 +501,14 @@ class Material:
             new_fit_type (str): The new fit type to use.
             fit_index_to_replace (int): The index of the fit in the material.fits list to replace with the new fit. Be careful to choose the correct index, especially if there are multiple fits with source "data".
             n_param (int, optional): Number of parameters for the new fit. Defaults to None.
+            **fit_options: Further options of fit_data, e.g. n_starts, seed and workers for a multi-start loglog fit.
         Returns:
             self (Material): The updated Material object with the new fit.
         """
 
         self.fit_type = new_fit_type
         try:
-            popt, pcov = self.fit_data(n_param=n_param)
+            popt, pcov = self.fit_data(n_param=n_param, **fit_options)
         except ValueError:
 
             print(
@@ -368,11 +523,64 @@ class Material:
         self.interpolate_function = self.interpolate(preferred_fit=None)
         return self
 
-    def interpolate(self, preferred_fit: None):
+    def auto_fit(self, fit_types=None, orders=None, n_folds=5, criterion="cv", seed=0, n_starts=4, workers=1, save=False):
+        """
+        Fit every candidate fit type and number of parameters to the data, and keep the best one as the material's
+        fit type and data fit. The candidates (see fitting.auto_fit_candidates) are fit in a process pool and
+        ranked by k-fold cross-validated log residual, AIC or BIC (see fitting.score_candidate).
+
+        Args:
+            fit_types (list, optional): Fit types to try. Defaults to None (every fit type that can be fit to data).
+            orders (dict, optional): {fit type: numbers of parameters} replacing the default range of a fit type. Defaults to None.
+            n_folds (int, optional): Number of cross-validation folds. Defaults to 5.
+            criterion (str, optional): Ranking criterion, "cv", "aic" or "bic". Defaults to "cv".
+            seed (int, optional): Seed of the folds and of the multi-start loglog fits. Defaults to 0.
+            n_starts (int, optional): Number of seeded starts of the loglog candidates. Defaults to 4.
+            workers (int, optional): Number of worker processes, None for one per CPU. Defaults to 1.
+            save (bool, optional): Save the material to its material file afterwards. Defaults to False.
+        Returns:
+            report (list): The ranked candidates (fit_type, n_param, cv_rms, cost, aic, bic, error, rank), also
+                kept in self.auto_fit_report. None if the material has no data.
+        """
+        inputs = self.fit_inputs(warm_start=False)
+        if inputs is None:
+            print("No data to fit.")
+            return None
+        x, y = inputs[:2]
+        candidates = auto_fit_candidates(fit_types, orders)
+        ranked = auto_fit_arrays(x, y, candidates, n_folds=n_folds, criterion=criterion, seed=seed, n_starts=n_starts, workers=workers)
+        self.apply_auto_fit(ranked, x)
+        if save:
+            self.save()
+        return self.auto_fit_report
+
+    def apply_auto_fit(self, ranked, x):
+        """
+        Make the best of the ranked candidates of an automatic fit (see auto_fit) the material's fit type and data fit.
+
+        Args:
+            ranked (list): The ranked candidates (see fitting.rank_candidates).
+            x (np.ndarray): The temperatures of the fitted data.
+        """
+        self.auto_fit_report = auto_fit_report(ranked)
+        best = ranked[0]
+        if best["error"] is not None or best["popt"] is None:
+            print(f"Could not auto fit data for {self.name}: no candidate could be fit.")
+            return
+        self.fit_type = best["fit_type"]
+        self.raw_fit_params, self.raw_fit_cov = best["popt"], best["pcov"]
+        self._set_data_fit(x, best["popt"], best["pcov"])
+        self.interpolate_function = self.interpolate(preferred_fit=None)
+        return
+
+    def interpolate(self, preferred_fit: None, T_range=None):
         """
         Interpolate the thermal conductivity data for the material.
         Args:
             preferred_fit (Fit, optional): A Fit object that should be preferred in the interpolation. Defaults to None.
+            T_range (tuple, optional): Only rebuild the interpolation over these temperatures (e.g. the range of a
+                refit data fit), keeping the knots of the existing interpolation outside of it. Defaults to None
+                (rebuild everything).
         Returns:
             interp_func (function): An interpolation function for the thermal conductivity data.
         """
@@ -403,25 +611,24 @@ class Material:
         # sorting_indices = np.append(0, sorting_indices+1)  # Add an index at the start for room temperature if it exists
         sorted_fits = [fits[i] for i in sorting_indices]
         Ts = np.empty(0, float)
-        ks = np.empty(0, float)
+        # (temperatures, fit type, parameters) of each piece of the interpolation, evaluated once all are placed
+        segments = []
 
         # If we have a fit we prefer the interpolation to use it will create the points here and block other fits from overriding them later
         if preferred_fit != None:
             T = np.logspace(
                 np.log10(preferred_fit.range[0]), np.log10(preferred_fit.range[1]), 100
             )
-            k = get_func_type(preferred_fit.fit_type)(T, *preferred_fit.parameters)
+            segments.append((T, preferred_fit.fit_type, preferred_fit.parameters))
             Ts = np.append(Ts, T)
-            ks = np.append(ks, k)
 
         # Here, we go through every fit for the chosen material and decide what parts of each fit to use
         for i, fit in enumerate(sorted_fits):
             # If we have a room temperature data point, we want to include it in the interpolation
             if self.room_temp is not None and i == 0:
                 T = np.array([self.room_temp])
-                k = np.array([self.room_temp_conductivity])
+                segments.append((T, None, self.room_temp_conductivity))
                 Ts = np.append(Ts, T)
-                ks = np.append(ks, k)
 
             # If we have a preferred fit, we want to skip any fits that overlap with it
             if preferred_fit != None:
@@ -448,26 +655,38 @@ class Material:
                 )
                 # if T[-1] > add_fit_range[1]:
                 #     T[-1] = add_fit_range[1]
-                k = get_func_type(fit.fit_type)(T, *fit.parameters)
+                segments.append((T, fit.fit_type, fit.parameters))
                 Ts = np.append(Ts, T)
-                ks = np.append(ks, k)
+
+        # Evaluate the pieces (only inside T_range if we keep the rest of the existing interpolation)
+        old_interp = getattr(self, "interpolate_function", None) if T_range is not None else None
+        Ts, ks = [np.empty(0, float)], [np.empty(0, float)]
+        for T, fit_type, parameters in segments:
+            if old_interp is not None:
+                T = T[(T >= T_range[0]) & (T <= T_range[1])]
+            Ts.append(T)
+            ks.append(np.full(T.shape, parameters) if fit_type is None else get_func_type(fit_type)(T, *parameters))
+        if old_interp is not None:
+            outside = (old_interp.x < T_range[0]) | (old_interp.x > T_range[1])
+            Ts.append(old_interp.x[outside])
+            ks.append(old_interp.y[outside])
+        Ts = np.concatenate(Ts)
+        ks = np.concatenate(ks).astype(float)
 
         # Finally, we sort the points and save them to a file
         sorted_indices = np.argsort(Ts)
         Ts = Ts[sorted_indices]
         ks = ks[sorted_indices]
 
-        # create an interpolation function
-        interp_func = interp1d(Ts, ks, bounds_error=False)
-        interp_pkl = os.path.join(this_dir, "lib", self.name, "interpolation.pkl")
-        with open(interp_pkl, "wb") as f:
-            pickle.dump(interp_func, f)
+        # create an interpolation function (stored with the material by Material.save)
+        interp_func = LinearInterpolator(Ts, ks)
         return interp_func
 
     def plot_data(self, loglog=True):
         """
         Plot the experimental data for the material.
         """
+        plt = _pyplot()
         if self.data_classes == None:
             return
         included_data = [ds.data for ds in self.data_classes.values() if ds.include]
@@ -496,6 +715,7 @@ class Material:
         """
         Plot the experimental data and the fit to the data for the material.
         """
+        plt = _pyplot()
         if self.data_classes == None or self.raw_fit_params is None:
             return
         if self.fits == []:
@@ -520,6 +740,7 @@ class Material:
         """
         Plot the interpolation fit for the material.
         """
+        plt = _pyplot()
         if (
             hasattr(self, "interpolate_function")
             and self.interpolate_function is not None
@@ -544,11 +765,17 @@ class Material:
         else:
             return
 
-    def plot_all_fits(self, loglog=True):
+    def plot_all_fits(self, loglog=True, ax=None):
         """
         Plot all the available fits for the material.
+        Args:
+            loglog (bool, optional): Use logarithmic axes. Defaults to True.
+            ax (matplotlib.axes.Axes, optional): Axes to draw on. Defaults to the axes of a new figure.
         """
-        fig, ax = plt.subplots()
+        if ax is None:
+            fig, ax = _pyplot().subplots()
+        else:
+            fig = ax.figure
 
         if len(self.fits) == 0:
             print("No fits to plot.")
@@ -587,6 +814,8 @@ class Material:
         """
         Converts the self.fits to a dictionary and saves as a json file
         """
+        import json
+
         fits_dict = {}
         for fit in self.fits:
             fit_dict = fit.__dict__.copy()
@@ -648,14 +877,35 @@ class Material:
 
     def save(self):
         """
-        Save the material class as a pickle file.
+        Save the material class to its material file (lib/<material>/material.npz).
         """
-        # Save the material class as a pickle file
-        with open(os.path.join(self.folder, "material.pkl"), "wb") as f:
-            pickle.dump(self, f)
-            print("Material has successfully been saved to its pickle file!")
+        self.to_file()
+        print("Material has successfully been saved to its material file!")
         return
 
+    def to_file(self, path: str = None):
+        """
+        Save the material (fits, datasets and interpolation knots) in the npz format described in serialization.py.
+        Args:
+            path (str, optional): Path of the file. Defaults to the material.npz file in the material folder.
+        Returns:
+            path (str): Path of the written file.
+        """
+        if path is None:
+            path = os.path.join(self.folder, serialization.MATERIAL_FILE)
+        return serialization.save_material(self, path)
+
+    @classmethod
+    def from_file(cls, path: str):
+        """
+        Load a material saved with Material.to_file. Only numpy is needed to read the file.
+        Args:
+            path (str): Path of the material file.
+        Returns:
+            material (Material): The loaded material.
+        """
+        return serialization.load_material(path)
+
     def fit_by_name(self, fit_name):
         """
         Retrieves the fit object for a specified fit name.
@@ -753,8 +1003,8 @@ class Fit:
         """
         return get_func_type(self.fit_type)
 
-    @u.quantity_input
-    def calc_tc(self, T: u.K):
+    @_quantity_input(T="K")
+    def calc_tc(self, T):
         """
         Calculate the thermal conductivity at a specific temperature.
         Args:
@@ -764,6 +1014,8 @@ class Fit:
 
         Uses astropy units to ensure correct unit handling.
         """
+        from astropy import units as u
+
         # Convert temperature to Kelvin if it is not already
         T = T.to(u.K).value
         if self.fit_type is not None:
@@ -786,34 +1038,115 @@ class Fit:
             print("No fit type defined.")
             return None
             
-    @u.quantity_input
-    def tc_integral(self, T1: u.K, T2: u.K):
+    def integrate(self, T1, T2, rtol: float = 1e-8, method: str = "auto"):
+        """
+        Integrate the fit function from T1 to T2 without astropy units.
+        With method="auto" the fastest method meeting rtol is used : the closed-form antiderivative of the fit type
+        if it has one (see fit_types.get_antiderivative), else a vectorized Gauss-Legendre rule in ln(T) (for loglog,
+        only on the polylog half, the Nppoly half being integrated in closed form, see
+        fit_types.get_partial_antiderivative), and scipy.integrate.quad only if the error estimate of the faster
+        methods doesn't meet rtol. An explicitly requested method is always used, with a warning if its error
+        estimate doesn't meet rtol.
+        Args:
+            T1 (float or array-like): Lower temperature limit(s) [K].
+            T2 (float or array-like): Upper temperature limit(s) [K], broadcast against T1.
+            rtol (float, optional): Requested relative tolerance. Defaults to 1e-8.
+            method (str, optional): "auto", "analytic", "gauss-legendre" or "quad". Defaults to "auto".
+        Returns:
+            integral (float or np.ndarray): Integral(s) of the thermal conductivity [W/m].
+            error (float or np.ndarray): Estimated absolute error(s) [W/m].
+            method (str): The method that was used ("analytic", "analytic+gauss-legendre", "gauss-legendre" or "quad").
+        """
+        if self.fit_type is None:
+            raise ValueError(f"No fit type defined for fit {self.name}.")
+        if method not in ("auto", "analytic", "gauss-legendre", "quad"):
+            raise ValueError(f"Unknown integration method {method}.")
+        params = np.asarray(self.parameters, dtype=float).ravel()
+        func = get_func_type(self.fit_type)
+        T1, T2 = np.broadcast_arrays(np.asarray(T1, dtype=float), np.asarray(T2, dtype=float))
+        scalar = T1.ndim == 0
+
+        def _result(integral, error, used):
+            if scalar:
+                return float(integral), float(error), used
+            return integral, error, used
+
+        def _meets_rtol(integral, error):
+            return np.all((error <= rtol * np.abs(integral)) | ~np.isfinite(integral))
+
+        def _checked(integral, error, used):
+            if not _meets_rtol(integral, error):
+                warnings.warn(f"The {used} integral of {self.name} doesn't meet rtol={rtol} (estimated error {np.max(error):.3g}).")
+            return _result(integral, error, used)
+
+        def _analytic(antiderivative):
+            with np.errstate(all="ignore"):
+                F1, F2 = antiderivative(T1, *params), antiderivative(T2, *params)
+            # Rounding error of the difference of the antiderivatives
+            return F2 - F1, 4 * np.finfo(float).eps * (np.abs(F2) + np.abs(F1))
+
+        if method in ("auto", "analytic"):
+            antiderivative = get_antiderivative(self.fit_type, params.size)
+            if antiderivative is not None:
+                integral, error = _analytic(antiderivative)
+                if method == "analytic" or _meets_rtol(integral, error):
+                    return _checked(integral, error, "analytic")
+            elif method == "analytic":
+                raise ValueError(f"Fit type {self.fit_type} with {params.size} parameters has no closed-form antiderivative.")
+            partial = get_partial_antiderivative(self.fit_type) if method == "auto" else None
+            if partial is not None:
+                antiderivative, remainder = partial
+                integral, error = _analytic(antiderivative)
+                rest, rest_error = gauss_legendre_log_integral(remainder, params, T1, T2, rtol=rtol)
+                integral, error = integral + rest, error + rest_error
+                if _meets_rtol(integral, error):
+                    return _result(integral, error, "analytic+gauss-legendre")
+        if method in ("auto", "gauss-legendre"):
+            integral, error = gauss_legendre_log_integral(func, params, T1, T2, rtol=rtol)
+            if method == "gauss-legendre" or _meets_rtol(integral, error):
+                return _checked(integral, error, "gauss-legendre")
+        from scipy.integrate import quad
+
+        integral, error = np.empty(T1.shape), np.empty(T1.shape)
+        for i in np.ndindex(T1.shape):
+            integral[i], error[i] = quad(func, T1[i], T2[i], args=tuple(params), epsrel=rtol)
+        return _result(integral, error, "quad")
+
+    @_quantity_input(T1="K", T2="K")
+    def tc_integral(self, T1, T2, rtol: float = 1e-8, method: str = "auto", return_method: bool = False):
         """
         Calculate the integral of the thermal conductivity over a temperature range.
         Args:
             T1 (u.K): Lower temperature limit.
             T2 (u.K): Upper temperature limit.
+            rtol (float, optional): Requested relative tolerance. Defaults to 1e-8.
+            method (str, optional): Integration method, see Fit.integrate. Defaults to "auto" (the fastest method
+                meeting rtol).
+            return_method (bool, optional): Also return the name of the method that was used. Defaults to False.
         Returns:
             integral (u.W/m): The integral of thermal conductivity from T1 to T2.
-            error (float): Estimated error of the integral.
+            error (u.W/m): Estimated error of the integral.
+            method (str): The integration method used (only if return_method is True).
 
         Uses astropy units to ensure correct unit handling.
         """
+        from astropy import units as u
+
         # Convert temperatures to Kelvin if they are not already
         T1 = T1.to(u.K).value
         T2 = T2.to(u.K).value
         if self.fit_type is not None:
-            integral, error = (
-                quad(get_func_type(self.fit_type), T1, T2, args=tuple(self.parameters))
-                * u.W
-                / u.m
-            )
+            integral, error, used = self.integrate(T1, T2, rtol=rtol, method=method)
+            integral, error = integral * u.W / u.m, error * u.W / u.m
+            if return_method:
+                return integral, error, used
             return integral, error
         else:
             print("No fit type defined.")
             return None, None
 
     def plot(self, **plotkwargs):
+        plt = _pyplot()
         x = np.linspace(self.range[0], self.range[1], 100)
         y = get_func_type(self.fit_type)(x, *self.parameters)
         if "label" in plotkwargs:
@@ -828,6 +1161,19 @@ class Fit:
         plt.yticks(fontsize=15)
         plt.title(f"Fit for {self.name}", fontsize=15)
 
+    def to_file(self, path: str):
+        """
+        Save the fit in the npz format described in serialization.py.
+        """
+        return serialization.save_fit(self, path)
+
+    @classmethod
+    def from_file(cls, path: str):
+        """
+        Load a fit saved with Fit.to_file.
+        """
+        return serialization.load_fit(path)
+
     def add_reference(self, reference: str):
         """Adds a reference string to the fit.
 
@@ -856,13 +1202,15 @@ class DataSet:
         name (str): Name of the dataset (usually the filename).
         data (np.ndarray): The data array with temperature and property values.
         include (bool): Whether to include this dataset in fits.
+        checksum (str): sha256 of the csv file the data was read from (see file_checksum), None if unknown.
     """
 
-    def __init__(self, name: str, data: np.ndarray, ref_string: str):
+    def __init__(self, name: str, data: np.ndarray, ref_string: str, checksum: str = None):
         self.name = name
         self.data = data
         self.include = self.inclusion_state()
         self.reference = ref_string
+        self.checksum = checksum
 
     def inclusion_state(self, state=True):
         """
@@ -874,3 +1222,16 @@ class DataSet:
         """
         self.include = state
         return state
+
+    def to_file(self, path: str):
+        """
+        Save the dataset in the npz format described in serialization.py.
+        """
+        return serialization.save_dataset(self, path)
+
+    @classmethod
+    def from_file(cls, path: str):
+        """
+        Load a dataset saved with DataSet.to_file.
+        """
+        return serialization.load_dataset(path)
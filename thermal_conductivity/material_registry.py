@@ -0,0 +1,266 @@
+"""
+This file defines the process-wide material registry.
+
+Every accessor in tc_utils (and the thermal model tools built on top of it) used to open and load
+lib/<material>/material.npz (or a legacy material.pkl) on every call. The registry loads each material
+once, keeps it in a bounded least-recently-used cache and transparently reloads it when the file on disk
+changes (new mtime/size, or a new content hash when hash checking is enabled).
+
+Typical use:
+    from material_registry import get_registry
+    mat = get_registry().get("Aluminum")
+    print(get_registry().stats())
+
+Note : the registry hands out the cached object itself, not a copy. Treat it as read-only, or save it back
+to the library (which invalidates the cached entry) if you modify it.
+"""
+
+import os
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+# Add this directory to the system path so that the library modules (and legacy pickled classes) resolve
+if this_dir not in sys.path:
+    sys.path.append(this_dir)
+path_to_mat_lib = os.path.join(this_dir, "lib")
+
+import serialization
+
+
+class LRUCache:
+    """
+    A bounded least-recently-used cache with hit/miss/eviction counters.
+
+    Attributes:
+        maxsize (int): Maximum number of entries kept in the cache. None means unbounded.
+        hits (int): Number of lookups that found a valid entry.
+        misses (int): Number of lookups that found no (or a stale) entry.
+        evictions (int): Number of entries dropped to respect maxsize.
+        invalidations (int): Number of stale entries dropped during lookups.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None, is_valid=None):
+        """
+        Look up a key and mark it as recently used.
+
+        Args:
+            key (hashable): Key to look up.
+            default (optional): Value returned when the key is missing or stale. Defaults to None.
+            is_valid (function, optional): Called with the cached value; if it returns False the entry is
+                dropped and the lookup counts as a miss. Defaults to None.
+        Returns:
+            The cached value, or default.
+        """
+        with self._lock:
+            if key in self._data:
+                value = self._data[key]
+                if is_valid is None or is_valid(value):
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.invalidations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Insert (or replace) a value, evicting the least recently used entries if the cache is full.
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+        return
+
+    def pop(self, key, default=None):
+        """
+        Remove a key from the cache and return its value (or default).
+        """
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self):
+        """
+        Remove every entry from the cache. The counters are left untouched.
+        """
+        with self._lock:
+            self._data.clear()
+        return
+
+    def reset_stats(self):
+        """
+        Reset the hit/miss/eviction/invalidation counters to zero.
+        """
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+        return
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            stats (dict): The cache counters, current size and maxsize.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._data.keys())
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+class MaterialRegistry:
+    """
+    A lazily populated, bounded cache of Material objects loaded from the material library.
+
+    Attributes:
+        lib_folder (str): Path to the material library.
+        check_hash (bool): If True, a content hash of the material file is also compared before reusing a
+            cached entry (slower, but robust to files rewritten within the mtime resolution).
+    """
+
+    def __init__(self, lib_folder: str = path_to_mat_lib, maxsize: int = 128, check_hash: bool = False):
+        self.lib_folder = lib_folder
+        self.check_hash = check_hash
+        self._cache = LRUCache(maxsize=maxsize)
+        self._checksums = {}
+
+    def material_file(self, name: str) -> str:
+        """
+        Returns:
+            path (str): Path to the stored material file for the named material (material.npz, or a legacy
+                material.pkl), or None if there is none.
+        """
+        return serialization.material_path(os.path.join(self.lib_folder, name))
+
+    def file_signature(self, path: str) -> tuple:
+        """
+        Returns:
+            signature (tuple): (path, mtime_ns, size[, sha1]) of the file, used to detect changes on disk.
+        """
+        stat = os.stat(path)
+        signature = (path, stat.st_mtime_ns, stat.st_size)
+        if self.check_hash:
+            with open(path, "rb") as f:
+                signature += (hashlib.sha1(f.read()).hexdigest(),)
+        return signature
+
+    def file_checksum(self, path: str) -> str:
+        """
+        Returns:
+            checksum (str): sha256 of the content of the file (as stored in the library index), recomputed only
+                when the mtime or size of the file change.
+        """
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._checksums.get(path)
+        if cached is None or cached[0] != key:
+            cached = (key, file_checksum(path))
+            self._checksums[path] = cached
+        return cached[1]
+
+    def load(self, path: str):
+        """
+        Load a material from its file, bypassing the cache.
+        """
+        return serialization.load_material_file(path)
+
+    def get(self, name: str):
+        """
+        Retrieve a material, loading it from the library only if it isn't cached or has changed on disk.
+
+        Args:
+            name (str): Material name.
+        Returns:
+            material (Material): Material object if the material has been stored in the library, else None.
+        """
+        if not os.path.isdir(os.path.join(self.lib_folder, name)):
+            return None
+        path = self.material_file(name)
+        if path is None:
+            return None
+        signature = self.file_signature(path)
+        entry = self._cache.get(name, is_valid=lambda cached: cached[0] == signature)
+        if entry is not None:
+            return entry[1]
+        material = self.load(path)
+        self._cache.put(name, (signature, material))
+        return material
+
+    def invalidate(self, name: str = None):
+        """
+        Drop a material (or every material if name is None) from the cache.
+        """
+        if name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(name)
+        return
+
+    def cached_materials(self) -> list:
+        """
+        Returns:
+            names (list): Materials currently held in the cache, least recently used first.
+        """
+        return self._cache.keys()
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            stats (dict): hits, misses, evictions, invalidations, size and maxsize of the registry.
+        """
+        return self._cache.stats()
+
+    def reset_stats(self):
+        self._cache.reset_stats()
+        return
+
+
+def file_checksum(path: str) -> str:
+    """
+    Returns:
+        checksum (str): sha256 hex digest of the content of a file.
+    """
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+_registry = MaterialRegistry()
+
+
+def get_registry() -> MaterialRegistry:
+    """
+    Returns:
+        registry (MaterialRegistry): The process-wide material registry.
+    """
+    return _registry
@@ -0,0 +1,223 @@
+"""
+This file renders the library plots (data, data + fit, interpolation and all fits of every material).
+
+Rendering is a separate stage of the library build (see update_repo.py): it runs after the materials are built,
+only needs the stored material files, and a failing plot is reported without affecting the material itself.
+Each plot has a cache key derived from the data it shows (datasets, fit parameters, interpolation knots), the
+source of the plotting method and the resolution; a PNG is only re-rendered when its key changes. The keys of a
+material's plots are stored in PLOTS/plot_keys.json.
+
+Plots are drawn with the non-interactive Agg backend on a single figure per process, cleared between plots, and
+can be rendered in a pool of worker processes:
+    python plot_render.py [--matlist Aluminum Kevlar] [--jobs 4] [--preview] [--force]
+"""
+
+import os
+import sys
+import json
+import inspect
+import hashlib
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+if this_dir not in sys.path:
+    sys.path.append(this_dir)
+path_to_mat_lib = os.path.join(this_dir, "lib")
+
+from material_class import Material
+from serialization import material_path, load_material_file
+
+PLOT_NAMES = ["data", "fits", "interpolation", "all_fits"]
+DPI = 300
+PREVIEW_DPI = 72
+# Previews are written next to the full resolution plots, so they never replace them
+PREVIEW_FOLDER = "preview"
+PLOT_KEYS_FILE = "plot_keys.json"
+
+_figure = None
+
+
+def _clean_figure():
+    """
+    Returns:
+        fig (matplotlib.figure.Figure): This process' plotting figure, cleared and made current.
+    """
+    global _figure
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    if _figure is None or not plt.fignum_exists(_figure.number):
+        _figure = plt.figure()
+    else:
+        _figure.clf()
+    plt.figure(_figure.number)
+    return _figure
+
+
+def _draw(mat: Material, plot: str, fig):
+    if plot == "data":
+        mat.plot_data()
+    elif plot == "fits":
+        mat.plot_data_fit()
+    elif plot == "interpolation":
+        mat.plot_interpolation()
+    elif plot == "all_fits":
+        mat.plot_all_fits(ax=fig.add_subplot())
+    return
+
+
+_PLOT_METHODS = {
+    "data": [Material.plot_data],
+    "fits": [Material.plot_data_fit, Material.plot_data],
+    "interpolation": [Material.plot_interpolation, Material.plot_data],
+    "all_fits": [Material.plot_all_fits],
+}
+
+
+def plot_key(mat: Material, plot: str, dpi: int = DPI) -> str:
+    """
+    Description : Cache key of one plot of a material.
+    Args:
+        mat (Material): The material.
+        plot (str): One of PLOT_NAMES.
+        dpi (int, optional): Resolution of the plot. Defaults to 300.
+    Returns:
+        key (str): Hash of everything the plot shows and of the code that draws it.
+    """
+    hasher = hashlib.sha256()
+
+    def _update(*items):
+        for item in items:
+            if isinstance(item, (np.ndarray, list, tuple)):
+                hasher.update(np.asarray(item, dtype=float).tobytes())
+            else:
+                hasher.update(repr(item).encode())
+
+    _update(plot, dpi, mat.name)
+    for method in _PLOT_METHODS[plot]:
+        _update(inspect.getsource(method))
+    if plot in ("data", "fits", "interpolation") and mat.data_classes is not None:
+        for name, dataset in mat.data_classes.items():
+            _update(name, dataset.include, dataset.data)
+    if plot == "fits":
+        _update(str(mat.fit_type), mat.raw_fit_params if mat.raw_fit_params is not None else "no fit", len(mat.fits))
+    if plot == "all_fits":
+        for fit in mat.fits:
+            _update(fit.name, str(fit.fit_type), fit.range, fit.parameters)
+    if plot in ("interpolation", "all_fits"):
+        interp_func = getattr(mat, "interpolate_function", None)
+        if interp_func is not None:
+            _update(interp_func.x, interp_func.y)
+    return hasher.hexdigest()
+
+
+def plot_files(mat: Material, preview: bool = False) -> dict:
+    """
+    Returns:
+        files (dict): {plot name: path of the png file}.
+    """
+    folder = os.path.join(mat.plot_folder, PREVIEW_FOLDER) if preview else mat.plot_folder
+    return {plot: os.path.join(folder, f"{mat.name}_{plot}.png") for plot in PLOT_NAMES}
+
+
+def render_material(material: str, preview: bool = False, force: bool = False) -> dict:
+    """
+    Description : Renders the plots of a material whose cache keys changed.
+    Args:
+        material (str): Material name.
+        preview (bool, optional): Render low resolution previews in PLOTS/preview instead. Defaults to False.
+        force (bool, optional): Render every plot, even if its key is unchanged. Defaults to False.
+    Returns:
+        result (dict): Lists of rendered, cached and failed plots (errors as (plot, message) tuples).
+    """
+    result = {"rendered": [], "cached": [], "failed": []}
+    mat = load_material_file(material_path(os.path.join(path_to_mat_lib, material)))
+    mat.folder = os.path.join(path_to_mat_lib, material)
+    mat.plot_folder = os.path.join(mat.folder, "PLOTS")
+    if len(mat.fits) == 0:
+        return result
+    dpi = PREVIEW_DPI if preview else DPI
+    files = plot_files(mat, preview=preview)
+    keys_file = os.path.join(os.path.dirname(files["data"]), PLOT_KEYS_FILE)
+    os.makedirs(os.path.dirname(keys_file), exist_ok=True)
+    stored_keys = {}
+    if os.path.exists(keys_file):
+        with open(keys_file, "r") as f:
+            stored_keys = json.load(f)
+    keys = dict(stored_keys)
+    for plot in PLOT_NAMES:
+        key = plot_key(mat, plot, dpi)
+        if not force and stored_keys.get(plot) == key and os.path.exists(files[plot]):
+            result["cached"].append(plot)
+            continue
+        try:
+            fig = _clean_figure()
+            _draw(mat, plot, fig)
+            fig.savefig(files[plot], dpi=dpi, bbox_inches="tight")
+        except Exception as e:
+            keys.pop(plot, None)
+            result["failed"].append((plot, str(e)))
+            continue
+        keys[plot] = key
+        result["rendered"].append(plot)
+    if keys != stored_keys:
+        with open(keys_file, "w") as f:
+            json.dump(keys, f, indent=2, sort_keys=True)
+    return result
+
+
+def render_plots(mat_list: list, jobs: int = 1, preview: bool = False, force: bool = False) -> dict:
+    """
+    Description : Renders the plots of several materials, in a pool of worker processes if jobs > 1.
+    Args:
+        mat_list (list): Material names.
+        jobs (int, optional): Number of worker processes. 1 renders in this process. Defaults to 1.
+        preview (bool, optional): Render low resolution previews. Defaults to False.
+        force (bool, optional): Render every plot, even if unchanged. Defaults to False.
+    Returns:
+        results (dict): {material name: result of render_material}, in the order of mat_list.
+    """
+    results = {}
+    args = [(material, preview, force) for material in mat_list]
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(render_material, *arg) for arg in args]
+            for material, future in zip(mat_list, futures):
+                try:
+                    results[material] = future.result()
+                except Exception as e:
+                    results[material] = {"rendered": [], "cached": [], "failed": [("all", str(e))]}
+    else:
+        for arg in args:
+            try:
+                results[arg[0]] = render_material(*arg)
+            except Exception as e:
+                results[arg[0]] = {"rendered": [], "cached": [], "failed": [("all", str(e))]}
+    return results
+
+
+def report(results: dict):
+    rendered = sum(len(res["rendered"]) for res in results.values())
+    cached = sum(len(res["cached"]) for res in results.values())
+    print(f"Rendered {rendered} plot(s), {cached} unchanged plot(s) reused.")
+    for material, res in results.items():
+        for plot, error in res["failed"]:
+            print(f"Error plotting {plot} for material {material}: {error}")
+    return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the material library plots.")
+    parser.add_argument("--matlist", nargs="*", help="Materials to render. Defaults to every material.")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes. Defaults to 1.")
+    parser.add_argument("--preview", action="store_true", help=f"Render {PREVIEW_DPI} dpi previews in PLOTS/{PREVIEW_FOLDER}.")
+    parser.add_argument("--force", action="store_true", help="Render every plot, even if unchanged.")
+    args = parser.parse_args()
+    mat_list = args.matlist
+    if mat_list is None:
+        mat_list = sorted(d for d in os.listdir(path_to_mat_lib) if os.path.isdir(os.path.join(path_to_mat_lib, d)))
+    report(render_plots(mat_list, jobs=args.jobs, preview=args.preview, force=args.force))
@@ -0,0 +1,426 @@
+"""
+This file defines the on-disk format of the Material, Fit and DataSet classes.
+
+Each object is stored as a single numpy .npz file (lib/<material>/material.npz for materials) containing
+    - "metadata" : a JSON record with the schema version, the kind of object and every non-array attribute
+    - plain float arrays for everything numeric (fit parameters/covariances, raw data, interpolation knots)
+The files are written and read with allow_pickle=False, so loading them needs only numpy and json: no
+pickled classes, no scipy interp1d instances and no sys.path tricks. The interpolation function is
+rebuilt as an interpolation.LinearInterpolator from the stored knots.
+
+Schema (version 1):
+    Material metadata : name, parent, fit_type, temp_range, room_temp_tuple, data_fit_key (None for older files),
+                        fits (list of Fit records), datasets (list of DataSet records), arrays (list of array names)
+    Material arrays   : raw_fit_params, raw_fit_cov, interp_T, interp_k,
+                        fit<i>_parameters, fit<i>_covariance, data<i>
+    Fit record        : material, source, name, fit_type, range, fit_error, reference
+    DataSet record    : name, include, reference, checksum (sha256 of the source csv, None for older files)
+Arrays that are None are left out of the file (metadata["arrays"] lists the stored ones) and restored as None.
+
+The existing pickled library can be converted with
+    python serialization.py [--matlist ...] [--remove-pickles]
+"""
+
+import os
+import io
+import sys
+import json
+import numpy as np
+
+this_dir = os.path.dirname(os.path.abspath(__file__))
+if this_dir not in sys.path:
+    sys.path.append(this_dir)
+path_to_mat_lib = os.path.join(this_dir, "lib")
+
+SCHEMA_VERSION = 1
+MATERIAL_FILE = "material.npz"
+LEGACY_MATERIAL_FILE = "material.pkl"
+
+
+def to_jsonable(value):
+    """
+    Converts numpy scalars/arrays (and containers of them) to plain python objects for JSON serialization.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    return value
+
+
+def _as_array(value):
+    return None if value is None else np.asarray(value, dtype=float)
+
+
+def _as_range(value):
+    return None if value is None else tuple(to_jsonable(v) for v in value)
+
+
+def _write_npz(path: str, metadata: dict, arrays: dict):
+    """
+    Writes the metadata record and the non-None arrays to an npz file (atomically, through a temporary file).
+    """
+    metadata = dict(metadata, schema_version=SCHEMA_VERSION)
+    metadata["arrays"] = sorted(key for key, value in arrays.items() if value is not None)
+    payload = {key: np.asarray(value, dtype=float) for key, value in arrays.items() if value is not None}
+    payload["metadata"] = np.array(json.dumps(metadata))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **payload)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_npz(path: str) -> tuple:
+    """
+    Description : Reads a file written in this format with a single file read.
+    Args:
+        path (str): Path of the .npz file.
+    Returns:
+        metadata (dict): The JSON metadata record.
+        arrays (dict): Dictionary of the stored arrays.
+    """
+    with open(path, "rb") as f:
+        buffer = io.BytesIO(f.read())
+    with np.load(buffer, allow_pickle=False) as npz:
+        arrays = {key: npz[key] for key in npz.files}
+    metadata = json.loads(str(arrays.pop("metadata")))
+    if metadata.get("schema_version", 0) > SCHEMA_VERSION:
+        raise ValueError(
+            f"{path} uses schema version {metadata['schema_version']}, newer than the supported version {SCHEMA_VERSION}."
+        )
+    return metadata, arrays
+
+
+###############################################
+# Fit
+###############################################
+def fit_to_record(fit, prefix: str = "") -> tuple:
+    """
+    Returns:
+        record (dict): JSON-serializable attributes of the fit.
+        arrays (dict): The fit parameters and covariance, keyed by prefix + "parameters"/"covariance".
+    """
+    record = {
+        "material": to_jsonable(fit.material),
+        "source": to_jsonable(fit.source),
+        "name": to_jsonable(fit.name),
+        "fit_type": to_jsonable(fit.fit_type),
+        "range": to_jsonable(_as_range(fit.range)),
+        "fit_error": to_jsonable(fit.fit_error),
+        "reference": to_jsonable(getattr(fit, "reference", None)),
+        "has_reference": hasattr(fit, "reference"),
+    }
+    arrays = {
+        prefix + "parameters": _as_array(fit.parameters),
+        prefix + "covariance": _as_array(fit.parameter_covariance),
+    }
+    return record, arrays
+
+
+def fit_from_record(record: dict, arrays: dict, prefix: str = ""):
+    """
+    Returns:
+        fit (Fit): The Fit object described by a record and its arrays.
+    """
+    from material_class import Fit
+
+    fit = Fit(
+        record["material"],
+        record["source"],
+        _as_range(record["range"]),
+        arrays.get(prefix + "parameters"),
+        arrays.get(prefix + "covariance"),
+        record["fit_type"],
+        record["fit_error"],
+    )
+    fit.name = record["name"]
+    if record.get("has_reference", record.get("reference") is not None):
+        fit.add_reference(record["reference"])
+    return fit
+
+
+def save_fit(fit, path: str) -> str:
+    """
+    Description : Saves a single Fit object to an .npz file.
+    """
+    record, arrays = fit_to_record(fit)
+    return _write_npz(path, {"kind": "Fit", "fit": record}, arrays)
+
+
+def load_fit(path: str):
+    """
+    Description : Loads a single Fit object from an .npz file written by save_fit.
+    """
+    metadata, arrays = read_npz(path)
+    return fit_from_record(metadata["fit"], arrays)
+
+
+###############################################
+# DataSet
+###############################################
+def dataset_to_record(dataset, prefix: str = "data") -> tuple:
+    record = {
+        "name": to_jsonable(dataset.name),
+        "include": bool(dataset.include),
+        "reference": to_jsonable(dataset.reference),
+        "checksum": getattr(dataset, "checksum", None),
+    }
+    return record, {prefix: _as_array(dataset.data)}
+
+
+def dataset_from_record(record: dict, arrays: dict, prefix: str = "data"):
+    from material_class import DataSet
+
+    dataset = DataSet(record["name"], arrays.get(prefix), ref_string=record["reference"], checksum=record.get("checksum"))
+    dataset.inclusion_state(record["include"])
+    return dataset
+
+
+def save_dataset(dataset, path: str) -> str:
+    """
+    Description : Saves a single DataSet object to an .npz file.
+    """
+    record, arrays = dataset_to_record(dataset)
+    return _write_npz(path, {"kind": "DataSet", "dataset": record}, arrays)
+
+
+def load_dataset(path: str):
+    """
+    Description : Loads a single DataSet object from an .npz file written by save_dataset.
+    """
+    metadata, arrays = read_npz(path)
+    return dataset_from_record(metadata["dataset"], arrays)
+
+
+###############################################
+# Material
+###############################################
+def material_to_record(mat) -> tuple:
+    """
+    Returns:
+        metadata (dict): JSON-serializable attributes of the material, its fits and its datasets.
+        arrays (dict): Every numeric array of the material.
+    """
+    arrays = {
+        "raw_fit_params": _as_array(getattr(mat, "raw_fit_params", None)),
+        "raw_fit_cov": _as_array(getattr(mat, "raw_fit_cov", None)),
+    }
+    interp_func = getattr(mat, "interpolate_function", None)
+    if interp_func is not None:
+        arrays["interp_T"] = _as_array(interp_func.x)
+        arrays["interp_k"] = _as_array(interp_func.y)
+
+    fit_records = []
+    for i, fit in enumerate(mat.fits):
+        record, fit_arrays = fit_to_record(fit, prefix=f"fit{i}_")
+        fit_records.append(record)
+        arrays.update(fit_arrays)
+
+    dataset_records = None
+    data_classes = getattr(mat, "data_classes", None)
+    if data_classes is not None:
+        dataset_records = []
+        for i, dataset in enumerate(data_classes.values()):
+            record, data_arrays = dataset_to_record(dataset, prefix=f"data{i}")
+            dataset_records.append(record)
+            arrays.update(data_arrays)
+
+    metadata = {
+        "kind": "Material",
+        "name": to_jsonable(mat.name),
+        "parent": to_jsonable(mat.parent),
+        "fit_type": to_jsonable(mat.fit_type),
+        "temp_range": to_jsonable(_as_range(getattr(mat, "temp_range", None))),
+        "room_temp_tuple": to_jsonable(getattr(mat, "room_temp_tuple", None)),
+        "data_fit_key": getattr(mat, "data_fit_key", None),
+        "fits": fit_records,
+        "datasets": dataset_records,
+    }
+    return metadata, arrays
+
+
+def save_material(mat, path: str) -> str:
+    """
+    Description : Saves a Material object (with its fits, datasets and interpolation knots) to an .npz file.
+    """
+    metadata, arrays = material_to_record(mat)
+    return _write_npz(path, metadata, arrays)
+
+
+def load_material(path: str):
+    """
+    Description : Loads a Material object from an .npz file written by save_material.
+    The returned material has the same attributes as one created by Material.__init__.
+    """
+    from material_class import Material
+    from interpolation import LinearInterpolator
+
+    metadata, arrays = read_npz(path)
+    mat = Material.__new__(Material)
+    mat.name = metadata["name"]
+    mat.folder = "lib" + os.sep + mat.name
+    mat.data_folder = os.path.join(mat.folder, "RAW")
+    mat.plot_folder = os.path.join(mat.folder, "PLOTS")
+    mat.parent = metadata["parent"]
+    mat.fit_type = metadata["fit_type"]
+    mat.fits = [fit_from_record(record, arrays, prefix=f"fit{i}_") for i, record in enumerate(metadata["fits"])]
+    if metadata["datasets"] is None:
+        mat.data_classes = None
+    else:
+        datasets = [dataset_from_record(record, arrays, prefix=f"data{i}") for i, record in enumerate(metadata["datasets"])]
+        mat.data_classes = {dataset.name: dataset for dataset in datasets}
+    mat.temp_range = _as_range(metadata["temp_range"])
+    mat.raw_fit_params = arrays.get("raw_fit_params")
+    mat.raw_fit_cov = arrays.get("raw_fit_cov")
+    mat.room_temp_tuple = metadata["room_temp_tuple"]
+    mat.data_fit_key = metadata.get("data_fit_key")
+    mat.room_temp = mat.room_temp_tuple[0] if mat.room_temp_tuple is not None else None
+    mat.room_temp_conductivity = mat.room_temp_tuple[1] if mat.room_temp_tuple is not None else None
+    if "interp_T" in arrays:
+        mat.interpolate_function = LinearInterpolator(arrays["interp_T"], arrays["interp_k"])
+    elif len(mat.fits) > 0:
+        mat.interpolate_function = None
+    return mat
+
+
+def material_path(folder: str) -> str:
+    """
+    Description : Finds the stored material file in a material folder, preferring the npz format over a
+    legacy material.pkl.
+    Returns:
+        path (str): Path of the material file, or None if the folder holds neither.
+    """
+    for file in (MATERIAL_FILE, LEGACY_MATERIAL_FILE):
+        path = os.path.join(folder, file)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_material_file(path: str):
+    """
+    Description : Loads a material from either format, based on the file extension.
+    """
+    if path.endswith(".npz"):
+        return load_material(path)
+    import pickle
+
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _same_array(a, b) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    return np.array_equal(np.asarray(a, dtype=float), np.asarray(b, dtype=float), equal_nan=True)
+
+
+def round_trip_mismatches(mat, reloaded) -> list:
+    """
+    Description : Compares a material with its copy reloaded from the npz format.
+    Args:
+        mat (Material): The original material.
+        reloaded (Material): The material read back with load_material.
+    Returns:
+        mismatches (list): Descriptions of what differs (fits, parameters, ranges, interpolation knots, datasets);
+            empty if the round trip is exact.
+    """
+    mismatches = []
+    if [fit.name for fit in reloaded.fits] != [fit.name for fit in mat.fits]:
+        return ["fit names"]
+    for fit, new_fit in zip(mat.fits, reloaded.fits):
+        if not _same_array(fit.parameters, new_fit.parameters):
+            mismatches.append(f"parameters of {fit.name}")
+        if not _same_array(fit.range, new_fit.range):
+            mismatches.append(f"range of {fit.name}")
+    if not _same_array(getattr(mat, "raw_fit_params", None), reloaded.raw_fit_params):
+        mismatches.append("raw_fit_params")
+    if getattr(mat, "data_fit_key", None) != reloaded.data_fit_key:
+        mismatches.append("data_fit_key")
+
+    interp_func = getattr(mat, "interpolate_function", None)
+    new_interp = getattr(reloaded, "interpolate_function", None)
+    if interp_func is None or new_interp is None:
+        if (interp_func is None) != (new_interp is None):
+            mismatches.append("interpolation")
+    else:
+        # LinearInterpolator keeps its knots sorted (stable sort), compare in that order
+        x = np.asarray(interp_func.x, dtype=float)
+        order = np.argsort(x, kind="stable")
+        if not (_same_array(x[order], new_interp.x) and _same_array(np.asarray(interp_func.y, dtype=float)[order], new_interp.y)):
+            mismatches.append("interpolation knots")
+
+    datasets = getattr(mat, "data_classes", None) or {}
+    new_datasets = reloaded.data_classes or {}
+    if list(datasets) != list(new_datasets):
+        mismatches.append("dataset names")
+    else:
+        for name, dataset in datasets.items():
+            if not _same_array(dataset.data, new_datasets[name].data):
+                mismatches.append(f"data of {name}")
+    return mismatches
+
+
+def migrate_library(lib_folder: str = path_to_mat_lib, mat_list: list = None, remove_pickles: bool = False) -> list:
+    """
+    Description : Converts material.pkl files in the library to the npz format. Materials that already have a
+    material.npz are not converted again : the npz is the file every loader reads (and every rebuild writes), so
+    their material.pkl is out of date and is only removed (with remove_pickles).
+    Args:
+        lib_folder (str, optional): Path to the material library. Defaults to thermal_conductivity/lib.
+        mat_list (list, optional): Materials to convert. Defaults to every material with a material.pkl.
+        remove_pickles (bool, optional): Whether to delete material.pkl and interpolation.pkl after a
+            successful conversion. Defaults to False.
+    Returns:
+        converted (list): Names of the converted materials.
+    """
+    if mat_list is None:
+        mat_list = sorted(
+            d for d in os.listdir(lib_folder) if os.path.isfile(os.path.join(lib_folder, d, LEGACY_MATERIAL_FILE))
+        )
+    converted = []
+    for name in mat_list:
+        pickle_file = os.path.join(lib_folder, name, LEGACY_MATERIAL_FILE)
+        npz_file = os.path.join(lib_folder, name, MATERIAL_FILE)
+        if os.path.exists(npz_file):
+            # Make sure the npz file reads before dropping the legacy file
+            load_material(npz_file)
+        else:
+            mat = load_material_file(pickle_file)
+            save_material(mat, npz_file)
+            # Check the round trip before removing anything
+            mismatches = round_trip_mismatches(mat, load_material(npz_file))
+            if mismatches:
+                raise ValueError(f"Round trip of {name} changed {', '.join(mismatches)}, keeping {pickle_file}.")
+        if remove_pickles:
+            if os.path.exists(pickle_file):
+                os.remove(pickle_file)
+            interp_file = os.path.join(lib_folder, name, "interpolation.pkl")
+            if os.path.exists(interp_file):
+                os.remove(interp_file)
+        converted.append(name)
+    return converted
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert the pickled material library to the npz format.")
+    parser.add_argument(
+        "--matlist",
+        nargs="*",
+        help="List of materials to convert. If not provided, all materials will be converted.",
+    )
+    parser.add_argument(
+        "--remove-pickles",
+        action="store_true",
+        help="Delete material.pkl and interpolation.pkl once a material has been converted.",
+    )
+    args = parser.parse_args()
+    converted = migrate_library(mat_list=args.matlist, remove_pickles=args.remove_pickles)
+    print(f"Converted {len(converted)} materials to {MATERIAL_FILE}.")
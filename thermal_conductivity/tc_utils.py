@@ -1,6 +1,10 @@
 import numpy as np
-import pandas as pd
 import os, sys
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # pandas is only needed to build dataframes and is imported inside fits_to_df
+    import pandas as pd
 
 # Add this folder to the sys path to allow imports
 this_dir = os.path.dirname(__file__)
@@ -9,9 +13,12 @@ if this_dir not in sys.path:
 path_to_mat_lib = os.path.join(this_dir, "lib")
 
 from material_class import Material, Fit
-import string, pickle
+from material_registry import get_registry, LRUCache
+from integral_tables import IntegralTable, build_fit_table, build_interpolation_table
+from library_index import INDEX_FILE, LibraryIndex, build_library_index, load_library_index
+import string
 
-from fit_types import get_func_name
+from fit_types import get_func_name, FitBank
 
 def get_materials_list() -> list:
     """
@@ -25,6 +32,8 @@ def get_materials_list() -> list:
 def get_material(mat: str) -> Material:
     """
     Description : Retrieves the material object from the materials library.
+    Materials are loaded once and served from the process-wide registry afterwards (see material_registry.py),
+    so the returned object is shared and should be treated as read-only.
 
     Args:
         mat (str): Material name.
@@ -32,13 +41,136 @@ def get_material(mat: str) -> Material:
     Returns:
         material (Material): Material object if found, else None.
     """
-    material_path = os.path.join(path_to_mat_lib, mat)
-    if os.path.exists(material_path):
-        with open(os.path.join(material_path, "material.pkl"), "rb") as f:
-            material = pickle.load(f)
-            return material
+    return get_registry().get(mat)
+
+
+def get_registry_stats() -> dict:
+    """
+    Description : Reports the hit/miss/eviction counters of the material registry.
+    Returns:
+        stats (dict): Registry statistics.
+    """
+    return get_registry().stats()
+
+
+_library_index_cache = {}
+
+
+def get_library_index(index_file: str = INDEX_FILE) -> LibraryIndex:
+    """
+    Description : Retrieves the consolidated library index (see library_index.py).
+    The index file is read once and reused until it changes on disk. If no index file has been written yet
+    (update_repo.main writes one), an index is built in memory from the material library instead.
+
+    Args:
+        index_file (str, optional): Path of the index file. Defaults to lib/library_index.npz.
+    Returns:
+        index (LibraryIndex): The library index.
+    """
+    if os.path.exists(index_file):
+        stat = os.stat(index_file)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    else:
+        signature = None
+    cached = _library_index_cache.get(index_file)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    if signature is not None:
+        index = load_library_index(index_file)
+    else:
+        materials = [get_material(mat) for mat in sorted(get_materials_list())]
+        index = LibraryIndex(build_library_index([mat for mat in materials if mat is not None]))
+    _library_index_cache[index_file] = (signature, index)
+    return index
+
+
+_fit_bank_cache = {}
+
+
+def get_fit_bank(mat_list: list = None) -> FitBank:
+    """
+    Description : Retrieves a FitBank (see fit_types.py) of the fits in the library index, for evaluating many fits
+    at many temperatures in one call:
+        bank = get_fit_bank()
+        k, out_of_range = bank.evaluate(np.logspace(-1, 2.5, 10000))
+    The bank is cached until the library index changes.
+
+    Args:
+        mat_list (list, optional): Only include the fits of these materials. Defaults to every material.
+    Returns:
+        bank (FitBank): The fit bank. Row i of the evaluated arrays is the fit bank.names[i].
+    """
+    index = get_library_index()
+    key = None if mat_list is None else tuple(mat_list)
+    cached = _fit_bank_cache.get(key)
+    if cached is not None and cached[0] is index:
+        return cached[1]
+    if mat_list is None:
+        fits = index.all_fits()
     else:
+        fits = [fit for mat in mat_list for fit in index.fits(mat)]
+    bank = FitBank(fits)
+    _fit_bank_cache[key] = (index, bank)
+    return bank
+
+
+_integral_table_cache = LRUCache(maxsize=256)
+
+
+def get_integral_table(mat: str, fit_name: str = None) -> IntegralTable:
+    """
+    Description : Retrieves the cumulative conductivity integral table (see integral_tables.py) of a material's
+    interpolation, or of one of its fits. Tables come from the library index when the material file is the one
+    the index was written from (same checksum). Otherwise (the material was saved since, or the index has no table)
+    the table is built from the material currently in the library and cached.
+
+    Args:
+        mat (str): Material name.
+        fit_name (str, optional): Name of the fit. Defaults to the material's interpolation.
+    Returns:
+        table (IntegralTable): The integral table, or None if the material has no such interpolation or fit.
+    """
+    index = get_library_index()
+    registry = get_registry()
+    mat_file = registry.material_file(mat) if os.path.isdir(os.path.join(registry.lib_folder, mat)) else None
+    if mat in index and mat_file is not None and index.checksum(mat) == registry.file_checksum(mat_file):
+        table = index.integral_table(mat, fit_name)
+        if table is not None:
+            return table
+    material = get_material(mat)
+    if material is None:
         return None
+    cached = _integral_table_cache.get((mat, fit_name), is_valid=lambda entry: entry[0] is material)
+    if cached is not None:
+        return cached[1]
+    if fit_name is None:
+        interp_func = getattr(material, "interpolate_function", None)
+        table = None if interp_func is None else build_interpolation_table(interp_func.x, interp_func.y)
+    else:
+        fit = material.fit_by_name(fit_name)
+        table = None if fit is None else build_fit_table(fit)
+    _integral_table_cache.put((mat, fit_name), (material, table))
+    return table
+
+
+def get_conductivity_integrals(mat: str, T1, T2, fit_name: str = None):
+    """
+    Description : Integrals of the thermal conductivity of a material between pairs of temperatures, from the
+    precomputed integral tables. Temperatures outside of the interpolation (or fit range) give NaN.
+
+    Args:
+        mat (str): Material name.
+        T1 (float or array-like): Lower temperature(s) in Kelvin.
+        T2 (float or array-like): Upper temperature(s) in Kelvin (broadcast against T1).
+        fit_name (str, optional): Integrate this fit instead of the material's interpolation. Defaults to None.
+    Returns:
+        integrals (float or np.ndarray): Integral(s) of k from T1 to T2 in W/m.
+    """
+    table = get_integral_table(mat, fit_name)
+    if table is None:
+        target = f"fit {fit_name}" if fit_name is not None else "interpolation function"
+        raise ValueError(f"No {target} found for material {mat}.")
+    return table.integrate(T1, T2)
 
 
 def get_material_fits(mat_name: str) -> list:
@@ -75,6 +207,8 @@ def get_fit_by_name(mat_name: str, fit_name: str) -> Fit:
 
 def get_interpolation_integral(lowT: float, highT: float, mat: str) -> float:
     """Get the integral of the interpolation function for a material.
+    The integral is read from the material's precomputed integral table (see integral_tables.py), which is exact for
+    the piecewise linear interpolation. lowT and highT may also be arrays of temperature pairs.
 
     Args:
         lowT (float): Lower temperature bound in Kelvin.
@@ -83,17 +217,7 @@ def get_interpolation_integral(lowT: float, highT: float, mat: str) -> float:
     Returns:
         integral (float) : Integral of the interpolation function between lowT and highT.
     """
-    material = get_material(mat)
-    if hasattr(material, "interpolate_function"):
-        interp_func = material.interpolate_function
-
-        T_values = np.linspace(lowT, highT, 1000)
-        k_values = interp_func(T_values)
-        integral = np.trapezoid(k_values, T_values)
-        return integral
-    else:
-        raise ValueError(f"No interpolation function found for material {mat}.")
-        return None
+    return get_conductivity_integrals(mat, lowT, highT)
 
 
 ###############################################
@@ -114,7 +238,7 @@ def generate_alphabet_array(n: int) -> list:
         return []
 
 
-def fits_to_df(fit_list: list) -> pd.DataFrame:
+def fits_to_df(fit_list: list) -> "pd.DataFrame":
     """
     Converts a list of Fit objects to a dataframe
     Args:
@@ -122,6 +246,8 @@ def fits_to_df(fit_list: list) -> pd.DataFrame:
     Returns:
         df (pd.DataFrame): Dataframe containing the fit information.
     """
+    import pandas as pd
+
     if not fit_list or len(fit_list) == 0:
         return None
     # list of Fit attributes to include in the dataframe
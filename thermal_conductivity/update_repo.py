@@ -1,6 +1,6 @@
 """
 Author : Henry Nachman
-This file cycles through every folder in the lib directory and updates the material pickle files.
+This file cycles through every folder in the lib directory and updates the material files.
 If a material has a parent, it also copies any raw data files to the parent folder.
 Then updates the parent accordingly.
 
@@ -8,87 +8,550 @@ This script fits data if it hasn't been fit yet, or if force_update=True is pass
 This is useful if new data has been added to a material or if the fit function has changed.
 
 This script also creates a plethora of plots, and compilation files for each material.
+The plots are rendered by a separate, cached stage once the materials are built (see plot_render.py); use
+--no-plots to skip it or --preview to render low resolution previews only.
+
+Rebuilds are incremental : lib/build_manifest.json records a content hash of every material's inputs (its RAW
+csv files, room_temperature.yaml, fit type, the hashes of its children and the version of the library code).
+Only materials whose inputs changed since the last build (and the parents of those materials) are rebuilt;
+materials whose RAW data changed are also refit, incrementally (only the new or changed csv files are parsed
+and the data fit is warm started, see Material.update_material). Pass --force to rebuild everything.
+
+With --auto-fit, the fit type and number of parameters of every material with data are chosen automatically
+before the build (see Material.auto_fit) : the candidates of all materials are scored in one pool of --jobs
+worker processes, and the ranked candidates of each material are written to lib/auto_fit_report.json.
 """
 
 import os
+import json
+import hashlib
 import shutil
-import pickle
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
 from material_class import Material
 import numpy as np
-import matplotlib.pyplot as plt
 import argparse
 from datetime import datetime as dt
 
 from tc_utils import mat_to_csv, fits_to_df
+from plot_render import render_plots, report as report_plots
+from library_index import write_library_index, INDEX_FILE
+from serialization import material_path, load_material_file
+from fitting import auto_fit_candidates, auto_fit_tasks, score_candidate, rank_candidates
 from fit_types import Nppoly
 from tqdm import tqdm
 
 this_dir = os.path.dirname(os.path.abspath(__file__))
 os.chdir(this_dir)
 
+MANIFEST_VERSION = 1
+MANIFEST_FILE = os.path.join(this_dir, "lib", "build_manifest.json")
+AUTO_FIT_REPORT = os.path.join(this_dir, "lib", "auto_fit_report.json")
+# Source files whose content defines the "code version" of a build
+CODE_FILES = [
+    "material_class.py",
+    "fit_types.py",
+    "fitting.py",
+    "interpolation.py",
+    "serialization.py",
+    "tc_utils.py",
+    "update_repo.py",
+]
+
+
+def _hash_file(path: str, hasher=None):
+    if hasher is None:
+        hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher
+
+
+def code_version() -> str:
+    """
+    Returns:
+        version (str): Hash of the library source files that determine the content of a build.
+    """
+    hasher = hashlib.sha256()
+    for file in CODE_FILES:
+        hasher.update(file.encode())
+        _hash_file(os.path.join(this_dir, file), hasher)
+    return hasher.hexdigest()
+
+
+def material_inputs(material: str, fit_type: str, code: str, children: dict) -> dict:
+    """
+    Description : Collects the content hashes of everything a material's build depends on.
+    Args:
+        material (str): Material name.
+        fit_type (str): Fit type of the material (None if the material has not been built yet).
+        code (str): Code version, see code_version().
+        children (dict): {child name: input hash} of the material's children.
+    Returns:
+        inputs (dict): data, room_temperature, fit_type, code and children entries.
+    """
+    folder = os.path.join(this_dir, "lib", material)
+    data_folder = os.path.join(folder, "RAW")
+    data_hash = None
+    if os.path.exists(data_folder):
+        hasher = hashlib.sha256()
+        for file in sorted(os.listdir(data_folder)):
+            if file.endswith(".csv"):
+                hasher.update(file.encode())
+                _hash_file(os.path.join(data_folder, file), hasher)
+        data_hash = hasher.hexdigest()
+    room_temp_file = os.path.join(folder, "room_temperature.yaml")
+    room_temp_hash = _hash_file(room_temp_file).hexdigest() if os.path.exists(room_temp_file) else None
+    return {
+        "data": data_hash,
+        "room_temperature": room_temp_hash,
+        "fit_type": None if fit_type is None else str(fit_type),
+        "code": code,
+        "children": dict(sorted(children.items())),
+    }
+
+
+def inputs_hash(inputs: dict) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def load_manifest(manifest_file: str = MANIFEST_FILE) -> dict:
+    """
+    Returns:
+        manifest (dict): The build manifest, or an empty manifest if there is none (or it has an unknown version).
+    """
+    if os.path.exists(manifest_file):
+        with open(manifest_file, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    return {"version": MANIFEST_VERSION, "code_version": None, "materials": {}}
+
+
+def write_manifest(manifest: dict, manifest_file: str = MANIFEST_FILE):
+    tmp_file = manifest_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_file, manifest_file)
+    return
 
-def main(mat_list=None):
-    lib_folder = os.path.join(this_dir, "lib")
-    # If no material list is provided, update all materials in the lib folder
-    if mat_list is None:
-        mat_list = [
-            d
-            for d in os.listdir(lib_folder)
-            if os.path.isdir(os.path.join(lib_folder, d))
-        ]
 
-    parent_list = []
-    # First pass: update all materials and copy raw data to parents
-    for material in tqdm(
-        mat_list,
+def material_outputs(mat: Material) -> list:
+    """
+    Returns:
+        outputs (list): Files (relative to this directory) written when the material is built. The plots are
+            outputs of the rendering stage (see plot_render.py).
+    """
+    outputs = [os.path.join(mat.folder, "material.npz")]
+    if len(mat.fits) != 0:
+        outputs += [os.path.join(mat.folder, f"{mat.name}_fits.csv"), os.path.join(mat.folder, "references.txt")]
+    return outputs
+
+
+def stored_parents(lib_folder: str) -> dict:
+    """
+    Returns:
+        parents (dict): {material name: parent name (or None)} read from the stored material files.
+    """
+    parents = {}
+    for material in sorted(os.listdir(lib_folder)):
+        if not os.path.isdir(os.path.join(lib_folder, material)):
+            continue
+        path = material_path(os.path.join(lib_folder, material))
+        parents[material] = None if path is None else load_material_file(path).parent
+    return parents
+
+
+def build_material(material: str, refit: bool = False, children: list = None) -> dict:
+    """
+    Description : Loads (and optionally refits) a material, aggregates the fits of its children if it is a parent,
+    then writes its fits csv, references and material file. The material file is written exactly once. Plots are
+    rendered afterwards, by a separate stage (see plot_render.py).
+    Args:
+        material (str): Material name.
+        refit (bool, optional): Refit the material to its RAW data. Defaults to False.
+        children (list, optional): Names of the children whose fits are added to this (parent) material. The
+            children must already be built. Defaults to None.
+    Returns:
+        result (dict): The parent and the output files of the built material.
+    """
+    # Children no longer write into their parent; each parent is aggregated once, by its own build
+    mat = Material(material, force_update=False, update_parent=False)
+    if refit and mat.data_files():
+        # Only the new or changed csv files are parsed, and the data fit is warm started from the stored one
+        mat.update_material(save=False)
+    for child in children or []:
+        child_file = material_path(os.path.join("lib", child))
+        if child_file is not None:
+            mat.add_child_fits(load_material_file(child_file))
+    room_temp_file = os.path.join(mat.folder, "room_temperature.yaml")
+    if os.path.exists(room_temp_file):
+        import yaml
+
+        with open(room_temp_file, "r") as file:
+            mat.room_temp_tuple = yaml.safe_load(file)["room_temperature_conductivity"]
+    if len(mat.fits) != 0:
+        mat.interpolate_function = mat.interpolate(preferred_fit=None)
+        # Create the csv file of fits
+        mat_to_csv(mat)
+        mat.print_refs()
+    mat.to_file()
+    return {"parent": mat.parent, "outputs": material_outputs(mat)}
+
+
+def build_dag(mat_list: list, parents: dict) -> tuple:
+    """
+    Description : Builds the parent->children dependency graph of a rebuild.
+    Args:
+        mat_list (list): Materials to build. The parents of these materials are added to the graph.
+        parents (dict): {material name: parent name (or None)} for the whole library.
+    Returns:
+        order (list): Every material of the graph in a deterministic topological order (children before parents).
+        children (dict): {material name: sorted list of all of its children in the library}.
+    """
+    nodes = set(mat_list) | {parents[mat] for mat in mat_list if parents.get(mat) is not None}
+    children = {node: sorted(c for c, p in parents.items() if p == node) for node in nodes}
+    depth = {}
+
+    def _depth(node):
+        if node not in depth:
+            depth[node] = 1 + max((_depth(c) for c in children.get(node, []) if c in nodes), default=-1)
+        return depth[node]
+
+    order = sorted(nodes, key=lambda node: (_depth(node), node))
+    return order, children
+
+
+def _run_inline(func, *args) -> Future:
+    future = Future()
+    try:
+        future.set_result(func(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def update_materials(
+    mat_list: list,
+    manifest: dict,
+    code: str,
+    parents: dict,
+    force: bool = False,
+    jobs: int = 1,
+    show_progress: bool = True,
+    save_manifest: bool = True,
+) -> dict:
+    """
+    Description : Rebuilds every material of mat_list (and their parents) whose inputs changed, updating the
+    manifest entries in place. Independent materials are built in a pool of jobs worker processes; a parent is
+    aggregated and built once, after all of its children are done.
+    Args:
+        mat_list (list): Materials to consider.
+        manifest (dict): Build manifest (see load_manifest).
+        code (str): Code version, see code_version().
+        parents (dict): {material name: parent name (or None)} for the whole library.
+        force (bool, optional): Rebuild even if the inputs are unchanged. Defaults to False.
+        jobs (int, optional): Number of worker processes. 1 builds in this process. Defaults to 1.
+        show_progress (bool, optional): Show a progress bar. Defaults to True.
+        save_manifest (bool, optional): Write the manifest after every rebuilt material. Defaults to True.
+    Returns:
+        summary (dict): Lists of rebuilt, skipped and failed materials, in build order.
+    """
+    lib_folder = os.path.join(this_dir, "lib")
+    order, children = build_dag(mat_list, parents)
+    waiting = {node: {c for c in children[node] if c in children} for node in order}
+    status = {}
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    progress = tqdm(
+        total=len(order),
         unit="mat",
         unit_scale=True,
         desc="Updating materials",
         leave=True,
         colour="blue",
         ascii=" >",
-    ):
-        try:
-            # print(f"\nUpdating material: {material}")
-            mat = Material(material, force_update=False)
-            if mat.parent is not None and mat.parent not in parent_list:
-                parent_list.append(mat.parent)
-                mat_list.append(mat.parent)  # Ensure parent materials are also updated
-            if len(mat.fits) != 0:
-                # Plot the data
-                mat.plot_data()
-                plt.savefig(os.path.join(mat.plot_folder, f"{mat.name}_data.png"), dpi=300, bbox_inches="tight")
-                plt.close()
-
-                # Plot the fits
-                mat.plot_data_fit()
-                # x_plot = np.logspace(np.log10(mat.temp_range[0]), np.log10(mat.temp_range[1]), 100)
-                # y_plot_low = Nppoly(x_plot, *mat.fits[0].parameters[:(np.size(mat.fits[0].parameters)-1)//2])
-                # plt.plot(x_plot, y_plot_low, label="Low T Fit", color="orange")
-                plt.savefig(os.path.join(mat.plot_folder, f"{mat.name}_fits.png"), dpi=300, bbox_inches="tight")
-                plt.close()
-
-                # Plot the interpolation
-                mat.plot_interpolation()
-                plt.savefig(
-                    os.path.join(mat.plot_folder, f"{mat.name}_interpolation.png"), dpi=300, bbox_inches="tight"
+        disable=not show_progress,
+    )
+    running = {}
+    ready = [node for node in order if not waiting[node]]
+
+    def _done(material, state):
+        status[material] = state
+        progress.update(1)
+        for node in order:
+            if material in waiting[node]:
+                waiting[node].discard(material)
+                if not waiting[node]:
+                    ready.append(node)
+
+    try:
+        while ready or running:
+            batch = sorted(ready, key=order.index)
+            ready.clear()
+            for material in batch:
+                if children[material]:
+                    # Gather the children's raw data before hashing, so the parent's data hash is final
+                    for child in children[material]:
+                        child_file = material_path(os.path.join(lib_folder, child))
+                        if child_file is not None:
+                            load_material_file(child_file).copy_data_to_parent()
+                # Children hashes come from the manifest, which already holds this run's hash of any rebuilt child
+                child_hashes = {
+                    child: manifest["materials"].get(child, {}).get("hash") for child in children[material]
+                }
+                stored_file = material_path(os.path.join(lib_folder, material))
+                fit_type = None if stored_file is None else load_material_file(stored_file).fit_type
+                inputs = material_inputs(material, fit_type, code, child_hashes)
+                new_hash = inputs_hash(inputs)
+                entry = manifest["materials"].get(material)
+                up_to_date = (
+                    entry is not None
+                    and entry["hash"] == new_hash
+                    and all(os.path.exists(os.path.join(this_dir, out)) for out in entry["outputs"])
                 )
-                plt.close()
-
-                # Plot all fits
-                mat.plot_all_fits()
-                plt.savefig(os.path.join(mat.plot_folder, f"{mat.name}_all_fits.png"), dpi=300, bbox_inches="tight")
-                plt.close()
-
-                # Create the csv file of fits
-                mat_to_csv(mat)
-                mat.print_refs()
-        except Exception as e:
-            print(f"Error updating material {material}: {e}")
+                if up_to_date and not force:
+                    _done(material, "skipped")
+                    continue
+                refit = entry is not None and entry["inputs"]["data"] != inputs["data"]
+                args = (build_material, material, refit, children[material])
+                future = pool.submit(*args) if pool is not None else _run_inline(*args)
+                running[future] = (material, new_hash, inputs)
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in sorted(finished, key=lambda fut: order.index(running[fut][0])):
+                material, new_hash, inputs = running.pop(future)
+                if future.exception() is not None:
+                    print(f"Error updating material {material}: {future.exception()}")
+                    _done(material, "failed")
+                    continue
+                manifest["materials"][material] = {
+                    "hash": new_hash,
+                    "inputs": inputs,
+                    "outputs": future.result()["outputs"],
+                    "updated": dt.now().isoformat(timespec="seconds"),
+                }
+                if save_manifest:
+                    # Keep the manifest current, so an interrupted rebuild resumes where it stopped
+                    manifest["code_version"] = code
+                    write_manifest(manifest)
+                _done(material, "rebuilt")
+    finally:
+        progress.close()
+        if pool is not None:
+            pool.shutdown()
+
+    summary = {"rebuilt": [], "skipped": [], "failed": []}
+    for material in order:
+        summary[status[material]].append(material)
+    return summary
+
+
+def auto_fit_library(
+    mat_list: list, jobs: int = 1, criterion: str = "cv", n_folds: int = 5, seed: int = 0, report_file: str = AUTO_FIT_REPORT
+) -> list:
+    """
+    Description : Automatically selects the fit type and number of parameters of every material with data (see
+    Material.auto_fit) in one parallel run : the candidates of all materials are scored in a single pool of jobs
+    worker processes. The winners are written to the material files, and the ranked candidates of every material
+    to the report file.
+    Args:
+        mat_list (list): Materials to auto fit. Materials without data are skipped.
+        jobs (int, optional): Number of worker processes. 1 fits in this process. Defaults to 1.
+        criterion (str, optional): Ranking criterion, "cv", "aic" or "bic". Defaults to "cv".
+        n_folds (int, optional): Number of cross-validation folds. Defaults to 5.
+        seed (int, optional): Seed of the folds and of the multi-start loglog fits. Defaults to 0.
+        report_file (str, optional): Path of the JSON report. Defaults to lib/auto_fit_report.json.
+    Returns:
+        auto_fitted (list): The materials whose data fit was replaced.
+    """
+    lib_folder = os.path.join(this_dir, "lib")
+    materials, tasks = {}, []
+    for material in sorted(mat_list):
+        path = material_path(os.path.join(lib_folder, material))
+        mat = None if path is None else load_material_file(path)
+        inputs = None if mat is None or not mat.data_classes else mat.fit_inputs(warm_start=False)
+        if inputs is None:
             continue
-        with open(os.path.join(mat.folder, "material.pkl"), "wb") as f:
-            pickle.dump(mat, f)
+        x, y = inputs[:2]
+        mat_tasks = auto_fit_tasks(x, y, auto_fit_candidates(), n_folds=n_folds, seed=seed)
+        materials[material] = (mat, x, len(tasks), len(mat_tasks))
+        tasks += mat_tasks
 
+    progress = dict(total=len(tasks), unit="fit", desc="Auto fitting", colour="blue", ascii=" >")
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(tqdm(pool.map(score_candidate, tasks, chunksize=4), **progress))
+    else:
+        results = [score_candidate(task) for task in tqdm(tasks, **progress)]
+
+    auto_fitted, reports = [], {}
+    for material, (mat, x, start, count) in materials.items():
+        mat.apply_auto_fit(rank_candidates(results[start : start + count], criterion), x)
+        reports[material] = mat.auto_fit_report
+        if mat.auto_fit_report[0]["error"] is None:
+            mat.to_file()
+            auto_fitted.append(material)
+    with open(report_file, "w") as f:
+        json.dump(
+            {
+                "created": dt.now().isoformat(timespec="seconds"),
+                "criterion": criterion,
+                "n_folds": n_folds,
+                "seed": seed,
+                "materials": reports,
+            },
+            f,
+            indent=1,
+        )
+    print(f"Auto fit {len(auto_fitted)} material(s), ranked candidates written to {report_file}")
+    return auto_fitted
+
+
+def partition_families(mat_list: list, parents: dict, n_ranks: int) -> list:
+    """
+    Description : Splits the materials into families (a parent together with its children) and spreads the
+    families over n_ranks build lists, largest families first, so that every parent is built on the same rank
+    as its children.
+    Args:
+        mat_list (list): Materials to build.
+        parents (dict): {material name: parent name (or None)}.
+        n_ranks (int): Number of build lists to produce.
+    Returns:
+        build_lists (list): One build list per rank.
+    """
+    families = {}
+    for mat in sorted(mat_list):
+        # Children whose parent is not in the list still form a family, so the parent (added to the
+        # dependency graph by update_materials) is built on the same rank
+        family = parents.get(mat) or mat
+        families.setdefault(family, []).append(mat)
+    build_lists = [[] for _ in range(n_ranks)]
+    for family in sorted(families, key=lambda fam: (-len(families[fam]), fam)):
+        members = families[family]
+        rank = min(range(n_ranks), key=lambda r: (len(build_lists[r]), r))
+        build_lists[rank] += members
+    return build_lists
+
+
+def report(summary: dict):
+    print(
+        f"Rebuilt {len(summary['rebuilt'])} material(s), skipped {len(summary['skipped'])} unchanged material(s)"
+        + (f", {len(summary['failed'])} failed: {summary['failed']}" if summary["failed"] else ".")
+    )
+    if summary["skipped"]:
+        print(f"Skipped (unchanged) : {', '.join(summary['skipped'])}")
+    return
+
+
+def main(
+    mat_list=None,
+    force: bool = False,
+    mpi: bool = False,
+    jobs: int = 1,
+    plots: bool = True,
+    preview: bool = False,
+    auto_fit: bool = False,
+    criterion: str = "cv",
+) -> dict:
+    """
+    Description : Rebuilds the materials whose inputs changed since the last build, then the compilation files
+    and the library index.
+    Args:
+        mat_list (list, optional): Materials to consider. Defaults to every material in the lib folder.
+        force (bool, optional): Rebuild every considered material, even if its inputs are unchanged. Defaults to False.
+        mpi (bool, optional): Distribute the materials over the ranks of MPI.COMM_WORLD (run with mpirun -n N).
+            Rank 0 gathers the results and writes the manifest, compilation files and library index. Defaults to False.
+        jobs (int, optional): Number of worker processes building materials in parallel (per rank in MPI mode).
+            Defaults to 1.
+        plots (bool, optional): Run the plot rendering stage after the build. Defaults to True.
+        preview (bool, optional): Only render low resolution previews (see plot_render.py). Defaults to False.
+        auto_fit (bool, optional): Choose the fit type of every material with data first (see auto_fit_library).
+            The auto fit materials (and their parents) are rebuilt. Defaults to False.
+        criterion (str, optional): Ranking criterion of the auto fit, "cv", "aic" or "bic". Defaults to "cv".
+    Returns:
+        summary (dict): Lists of rebuilt, skipped and failed materials and the rendering results (None on ranks
+            other than 0).
+    """
+    lib_folder = os.path.join(this_dir, "lib")
+    # If no material list is provided, update all materials in the lib folder
+    if mat_list is None:
+        mat_list = [
+            d
+            for d in os.listdir(lib_folder)
+            if os.path.isdir(os.path.join(lib_folder, d))
+        ]
+
+    manifest = load_manifest()
+    code = code_version()
+    parents = stored_parents(lib_folder)
+    if mpi:
+        from mpi4py import MPI
+
+        comm = MPI.COMM_WORLD
+        rank, size = comm.Get_rank(), comm.Get_size()
+
+    if auto_fit:
+        # Rank 0 auto fits the whole list in one pool, then every rank rebuilds the materials whose fits changed
+        auto_fitted = auto_fit_library(mat_list, jobs=jobs, criterion=criterion) if not mpi or rank == 0 else None
+        if mpi:
+            auto_fitted = comm.bcast(auto_fitted, root=0)
+        for material in auto_fitted:
+            manifest["materials"].pop(material, None)
+            manifest["materials"].pop(parents.get(material), None)
+
+    if mpi:
+        # Whole families go to one rank, so that each parent is aggregated after all of its children
+        build_list = partition_families(mat_list, parents, size)[rank]
+        summary = update_materials(
+            build_list, manifest, code, parents, force=force, jobs=jobs, show_progress=rank == 0, save_manifest=False
+        )
+        entries = {mat: manifest["materials"][mat] for mat in summary["rebuilt"]}
+        plot_results = {}
+        if plots:
+            plot_results = render_plots(build_dag(build_list, parents)[0], jobs=jobs, preview=preview, force=force)
+        gathered = comm.gather((summary, entries, plot_results), root=0)
+        if rank != 0:
+            return None
+        summary = {"rebuilt": [], "skipped": [], "failed": []}
+        plot_results = {}
+        for rank_summary, rank_entries, rank_plots in gathered:
+            for key in summary:
+                summary[key] += rank_summary[key]
+            manifest["materials"].update(rank_entries)
+            plot_results.update(rank_plots)
+        # Report in the same order as a serial rebuild, whatever the number of ranks
+        order = build_dag(mat_list, parents)[0]
+        for key in summary:
+            summary[key].sort(key=order.index)
+        if summary["rebuilt"]:
+            manifest["code_version"] = code
+            write_manifest(manifest)
+    else:
+        summary = update_materials(mat_list, manifest, code, parents, force=force, jobs=jobs)
+        plot_results = {}
+        if plots:
+            # Rendering only needs the stored material files, so it runs as its own stage once the build is done
+            plot_results = render_plots(build_dag(mat_list, parents)[0], jobs=jobs, preview=preview, force=force)
+
+    report(summary)
+    if plots:
+        report_plots(plot_results)
+    summary["plots"] = plot_results
+    compilation_exists = any(
+        file.startswith("tc_compilation") for file in os.listdir(os.path.dirname(this_dir))
+    )
+    if not summary["rebuilt"] and compilation_exists and os.path.exists(INDEX_FILE) and not force:
+        print("Compilation files and library index are up to date.")
+        return summary
+    write_compilation_files(lib_folder)
+    return summary
+
+
+def write_compilation_files(lib_folder: str):
+    """
+    Description : Writes the tc_compilation csv files (all materials and curated) and the library index.
+    """
     mat_list = [
         d for d in os.listdir(lib_folder) if os.path.isdir(os.path.join(lib_folder, d))
     ]
@@ -132,10 +595,11 @@ def main(mat_list=None):
     # The chosen fit for a given material will be the fit with the largest temperature range
     compilation_fits = []
     curated_comp_fits = []
+    indexed_materials = []
     for material in mat_list:
-        # Load the material from the pickle file
-        with open(os.path.join(lib_folder, material, "material.pkl"), "rb") as f:
-            mat = pickle.load(f)
+        # Load the material from its material file
+        mat = load_material_file(material_path(os.path.join(lib_folder, material)))
+        indexed_materials.append(mat)
         if len(mat.fits) == 0:
             print(
                 f"Material {material} has no fits, skipping compilation file creation."
@@ -165,6 +629,9 @@ def main(mat_list=None):
     )
     fits_to_df(curated_comp_fits).to_csv(curated_comp_file, index=False)
 
+    # Finally, write the consolidated library index (every material's fits and interpolation in one file)
+    write_library_index(indexed_materials)
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Update material library.")
@@ -174,5 +641,52 @@ if __name__ == "__main__":
         help="List of materials to update. If not provided, all materials will be updated.",
     )
 
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild every material, even if its inputs are unchanged since the last build.",
+    )
+
+    parser.add_argument(
+        "--mpi",
+        action="store_true",
+        help="Distribute the rebuild over MPI ranks (requires mpi4py), e.g. mpirun -n 4 python update_repo.py --mpi",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes building materials in parallel. Defaults to 1.",
+    )
+
+    parser.add_argument(
+        "--auto-fit",
+        action="store_true",
+        help="Choose the fit type and number of parameters of every material with data before the build.",
+    )
+    parser.add_argument(
+        "--criterion",
+        choices=["cv", "aic", "bic"],
+        default="cv",
+        help="Ranking criterion of --auto-fit : cross-validated residual, AIC or BIC. Defaults to cv.",
+    )
+
+    parser.add_argument("--no-plots", action="store_true", help="Skip the plot rendering stage.")
+    parser.add_argument(
+        "--preview",
+        action="store_true",
+        help="Render low resolution previews (in PLOTS/preview) instead of the full resolution plots.",
+    )
+
     args = parser.parse_args()
-    main(mat_list=args.matlist)
+    main(
+        mat_list=args.matlist,
+        force=args.force,
+        mpi=args.mpi,
+        jobs=args.jobs,
+        plots=not args.no_plots,
+        preview=args.preview,
+        auto_fit=args.auto_fit,
+        criterion=args.criterion,
+    )